@@ -0,0 +1,126 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from rutas import DATA_OUTPUT
+
+# Nombres de los criterios en el orden de ``calificacion.detalle``
+CRITERIOS = ["comprension", "estructura", "funcionalidad", "estrategias"]
+COLUMNAS = ["curso", "tarea", "numero", "nombre", "entrego", "total"] + CRITERIOS
+
+
+def _archivos_evaluacion(salida_dir: Path) -> List[Path]:
+    return sorted(salida_dir.glob("*/*_evaluaciones.json"))
+
+
+def _clave_cache(archivos: List[Path]) -> str:
+    """Huella de los archivos de evaluación basada en ruta, mtime y tamaño."""
+    h = hashlib.sha1()
+    for archivo in archivos:
+        stat = archivo.stat()
+        h.update(f"{archivo}|{stat.st_mtime_ns}|{stat.st_size}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def _leer_archivos(archivos: List[Path]) -> pd.DataFrame:
+    """Convierte todas las evaluaciones en una tabla columnar."""
+    cursos, tareas, numeros, nombres, entregos, totales, detalles = [], [], [], [], [], [], []
+    for archivo in archivos:
+        with archivo.open("r", encoding="utf-8") as f:
+            evaluaciones = json.load(f)
+        curso = archivo.parent.name
+        tarea_archivo = archivo.name[: -len("_evaluaciones.json")]
+        for e in evaluaciones:
+            calificacion = e.get("calificacion") or {}
+            detalle = list(calificacion.get("detalle", []))[: len(CRITERIOS)]
+            detalle += [0] * (len(CRITERIOS) - len(detalle))
+            cursos.append(curso)
+            tareas.append(e.get("tarea") or tarea_archivo)
+            numeros.append(e.get("numero", 0))
+            nombres.append(e.get("nombre", ""))
+            entregos.append(e.get("resolucion", "").strip().lower() != "no realiza")
+            totales.append(calificacion.get("total", 0))
+            detalles.append(detalle)
+
+    matriz = np.asarray(detalles, dtype=np.int64).reshape(-1, len(CRITERIOS))
+    df = pd.DataFrame({
+        "curso": pd.Categorical(cursos),
+        "tarea": pd.Categorical(tareas),
+        "numero": np.asarray(numeros, dtype=np.int64),
+        "nombre": nombres,
+        "entrego": np.asarray(entregos, dtype=bool),
+        "total": np.asarray(totales, dtype=np.int64),
+    })
+    for i, criterio in enumerate(CRITERIOS):
+        df[criterio] = matriz[:, i]
+    return df[COLUMNAS]
+
+
+def cargar_evaluaciones(salida_dir: str | Path = DATA_OUTPUT, usar_cache: bool = True) -> pd.DataFrame:
+    """Carga todas las ``*_evaluaciones.json`` en un DataFrame.
+
+    Si ``usar_cache`` es verdadero se guarda una copia en Parquet en
+    ``<salida_dir>/.cache`` identificada por los mtimes de los archivos, de
+    modo que mientras no cambien no se vuelve a parsear ningún JSON.
+    """
+    salida_dir = Path(salida_dir)
+    archivos = _archivos_evaluacion(salida_dir)
+    if not usar_cache:
+        return _leer_archivos(archivos)
+
+    cache_dir = salida_dir / ".cache"
+    cache_file = cache_dir / f"evaluaciones_{_clave_cache(archivos)}.parquet"
+    if cache_file.exists():
+        try:
+            return pd.read_parquet(cache_file)
+        except (ImportError, ValueError, OSError):
+            pass
+
+    df = _leer_archivos(archivos)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for viejo in cache_dir.glob("evaluaciones_*.parquet"):
+            viejo.unlink()
+        df.to_parquet(cache_file, index=False)
+    except (ImportError, ValueError, OSError):
+        # Sin pyarrow/fastparquet simplemente no se cachea
+        pass
+    return df
+
+
+def resumen_estudiantes(df: pd.DataFrame) -> pd.DataFrame:
+    """Promedio, mínimo, máximo y entregas de cada estudiante en todas las tareas."""
+    return (
+        df.groupby(["curso", "nombre"], observed=True)
+        .agg(tareas=("tarea", "size"), entregas=("entrego", "sum"),
+             promedio=("total", "mean"), minimo=("total", "min"), maximo=("total", "max"))
+        .reset_index()
+        .sort_values(["curso", "promedio"], ascending=[True, False], ignore_index=True)
+    )
+
+
+def resumen_tareas(df: pd.DataFrame) -> pd.DataFrame:
+    """Estadísticas del total por curso y tarea, considerando solo quienes entregaron."""
+    entregadas = df[df["entrego"]]
+    resumen = (
+        entregadas.groupby(["curso", "tarea"], observed=True)["total"]
+        .agg(["count", "mean", "std", "min", "median", "max"])
+    )
+    tasa = df.groupby(["curso", "tarea"], observed=True)["entrego"].mean().rename("tasa_entrega")
+    return resumen.join(tasa, how="right").fillna({"count": 0}).reset_index()
+
+
+def resumen_criterios(df: pd.DataFrame) -> pd.DataFrame:
+    """Distribución de cada criterio de la rúbrica por curso (solo entregas realizadas)."""
+    largo = df.loc[df["entrego"], ["curso"] + CRITERIOS].melt(
+        id_vars="curso", var_name="criterio", value_name="puntaje"
+    )
+    return (
+        largo.groupby(["curso", "criterio"], observed=True)["puntaje"]
+        .describe()
+        .reset_index()
+    )
@@ -0,0 +1,142 @@
+import copy
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from clientes import obtener_cliente
+from evaluar_chat import evaluar_entregas, nuevo_reporte
+
+CONCURRENCIAS_POR_DEFECTO = (1, 2, 4, 8, 16)
+
+
+def entregas_sinteticas(cantidad: int, consigna: str = "carga") -> List[Dict[str, Any]]:
+    """Entregas de distinto largo para pruebas de carga."""
+    return [
+        {
+            "numero": i,
+            "nombre": f"Estudiante {i}",
+            "resolucion": f"n = int(input())\nprint(n * {i})\n" + "# comentario\n" * (i % 20),
+            "enunciado": "Leer un número y mostrarlo multiplicado.",
+            "tarea": consigna,
+        }
+        for i in range(1, cantidad + 1)
+    ]
+
+
+def _evaluar_una(entrega: Dict[str, Any], client, opciones: Dict[str, Any]) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    reporte = nuevo_reporte()
+    try:
+        evaluar_entregas([entrega], client=client, reporte=reporte, **opciones)
+        error = None
+    except Exception as e:
+        error = type(e).__name__
+    return {"segundos": time.perf_counter() - inicio, "error": error, "llamadas": reporte["llamadas"]}
+
+
+def medir_concurrencia(entregas: List[Dict[str, Any]], client, concurrencia: int,
+                       opciones: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Evalúa las entregas con ``concurrencia`` hilos y resume rendimiento y latencias.
+
+    Cada entrega se evalúa con su propia llamada a ``evaluar_entregas``, de modo
+    que la latencia medida es la de una entrega de punta a punta (reintentos
+    incluidos) y un error no interrumpe al resto.
+    """
+    entregas = copy.deepcopy(entregas)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        mediciones = list(pool.map(lambda e: _evaluar_una(e, client, opciones or {}), entregas))
+    total_s = time.perf_counter() - inicio
+
+    latencias = np.array([m["segundos"] for m in mediciones if m["error"] is None])
+    errores: Dict[str, int] = {}
+    for m in mediciones:
+        if m["error"] is not None:
+            errores[m["error"]] = errores.get(m["error"], 0) + 1
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) if latencias.size else (float("nan"),) * 3
+    return {
+        "concurrencia": concurrencia,
+        "entregas": len(entregas),
+        "exitosas": int(latencias.size),
+        "errores": errores,
+        "llamadas": sum(m["llamadas"] for m in mediciones),
+        "duracion_s": total_s,
+        "entregas_por_s": latencias.size / total_s if total_s else 0.0,
+        "p50_s": float(p50),
+        "p95_s": float(p95),
+        "p99_s": float(p99),
+    }
+
+
+def prueba_carga(entregas: List[Dict[str, Any]], base_url: str,
+                 concurrencias: Iterable[int] = CONCURRENCIAS_POR_DEFECTO,
+                 opciones: Dict[str, Any] | None = None, **config_cliente: Any) -> List[Dict[str, Any]]:
+    """Ejecuta ``medir_concurrencia`` para cada nivel sobre un servidor compatible con OpenAI."""
+    concurrencias = list(concurrencias)
+    config_cliente.setdefault("max_conexiones", max(concurrencias))
+    config_cliente.setdefault("max_keepalive", max(concurrencias))
+    client = obtener_cliente(base_url, **config_cliente)
+    return [medir_concurrencia(entregas, client, c, opciones) for c in concurrencias]
+
+
+def formatear_resultados(resultados: List[Dict[str, Any]]) -> str:
+    """Tabla de texto con una fila por nivel de concurrencia."""
+    lineas = [f"{'conc':>5} {'ok':>6} {'err':>5} {'ent/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7}  errores"]
+    for r in resultados:
+        lineas.append(
+            f"{r['concurrencia']:>5} {r['exitosas']:>6} {r['entregas'] - r['exitosas']:>5} "
+            f"{r['entregas_por_s']:>8.2f} {r['p50_s']:>7.3f} {r['p95_s']:>7.3f} {r['p99_s']:>7.3f}  "
+            f"{r['errores'] or ''}"
+        )
+    return "\n".join(lineas)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prueba de carga de evaluar_entregas contra un servidor local.")
+    parser.add_argument("--entregas", help="Archivo _entregas.json a usar (por defecto, entregas sintéticas)")
+    parser.add_argument("--cantidad", type=int, default=100, help="Entregas sintéticas a generar")
+    parser.add_argument("--concurrencias", default=",".join(map(str, CONCURRENCIAS_POR_DEFECTO)))
+    parser.add_argument("--url", help="Servidor a usar; si se omite se levanta openai_falso en este proceso")
+    parser.add_argument("--latencia-media", type=float, default=0.5)
+    parser.add_argument("--distribucion", default="lognormal")
+    parser.add_argument("--tasa-429", type=float, default=0.0)
+    parser.add_argument("--tasa-malformada", type=float, default=0.0)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--cascada", action="store_true")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Imprimir los resultados en JSON")
+    args = parser.parse_args()
+
+    if args.entregas:
+        with Path(args.entregas).open("r", encoding="utf-8") as f:
+            entregas = [e for e in json.load(f) if e.get("resolucion") != "no realiza"]
+    else:
+        entregas = entregas_sinteticas(args.cantidad)
+
+    url = args.url
+    servidor = None
+    if url is None:
+        from openai_falso import crear_servidor_falso
+
+        servidor = crear_servidor_falso(
+            distribucion=args.distribucion, latencia_media_s=args.latencia_media, tasa_429=args.tasa_429,
+            tasa_malformada=args.tasa_malformada, semilla=args.semilla,
+        )
+        url = servidor.url
+
+    resultados = prueba_carga(entregas, url, [int(c) for c in args.concurrencias.split(",")],
+                              {"cascada": args.cascada, "stream": args.stream})
+    if args.json:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    else:
+        print(formatear_resultados(resultados))
+    if servidor is not None:
+        print(f"Servidor: {servidor.estadisticas}")
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,109 @@
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+from dotenv import load_dotenv
+from openai import DefaultHttpxClient, OpenAI
+
+try:
+    import httpx
+except ImportError:  # versiones recientes de openai dependen de httpx2
+    import httpx2 as httpx
+
+CONFIG_CLIENTE_POR_DEFECTO = {
+    "max_conexiones": 20,
+    "max_keepalive": 20,
+    # Tiempo que una conexión ociosa se mantiene abierta para reutilizarla
+    "keepalive_s": 120.0,
+    "timeout_s": 120.0,
+    "timeout_conexion_s": 10.0,
+    "max_reintentos": 2,
+}
+
+# El calentamiento en segundo plano no reintenta: si la red está lenta o caída, se omite
+TIMEOUT_CALENTAR_S = 5.0
+
+_clientes: Dict[Tuple, OpenAI] = {}
+_lock = threading.Lock()
+_entorno_cargado = False
+
+
+def _cargar_entorno() -> None:
+    """Lee .env una única vez por proceso."""
+    global _entorno_cargado
+    if not _entorno_cargado:
+        load_dotenv()
+        _entorno_cargado = True
+
+
+def _crear_cliente(base_url: str | None, config: Dict[str, Any]) -> OpenAI:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        if base_url is None:
+            raise ValueError(
+                "No se encontró OPENAI_API_KEY. Agrégalo a .env o usa export."
+            )
+        api_key = "local"  # servidores locales compatibles no validan la clave
+
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=config["max_conexiones"],
+            max_keepalive_connections=config["max_keepalive"],
+            keepalive_expiry=config["keepalive_s"],
+        ),
+        timeout=httpx.Timeout(config["timeout_s"], connect=config["timeout_conexion_s"]),
+    )
+    return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                  max_retries=config["max_reintentos"])
+
+
+def calentar(client: OpenAI) -> bool:
+    """Abre la conexión (DNS + TLS) con una solicitud liviana antes de evaluar."""
+    try:
+        client.models.list()
+        return True
+    except Exception:
+        return False
+
+
+def calentar_en_segundo_plano(client: OpenAI) -> threading.Thread:
+    """Calienta la conexión en un hilo aparte, sin reintentos, para no bloquear a quien llama."""
+    rapido = client.with_options(max_retries=0, timeout=TIMEOUT_CALENTAR_S)
+    hilo = threading.Thread(target=calentar, args=(rapido,), name="calentar-openai", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def obtener_cliente(base_url: str | None = None, calentar_conexion: bool = False,
+                    en_segundo_plano: bool = False, **config: Any) -> OpenAI:
+    """Devuelve el cliente compartido del proceso para ``base_url`` y configuración dadas.
+
+    El cliente (y su pool de conexiones keep-alive) se crea la primera vez y se
+    reutiliza en las siguientes llamadas, también desde varios hilos. Con
+    ``calentar_conexion`` la conexión se abre al crearlo; con
+    ``en_segundo_plano`` eso ocurre en otro hilo y la llamada no espera.
+    """
+    _cargar_entorno()
+    base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+    config = {**CONFIG_CLIENTE_POR_DEFECTO, **config}
+    clave = (base_url, tuple(sorted(config.items())))
+    with _lock:
+        client = _clientes.get(clave)
+        if client is not None:
+            return client
+        client = _crear_cliente(base_url, config)
+        _clientes[clave] = client
+    if calentar_conexion:
+        if en_segundo_plano:
+            calentar_en_segundo_plano(client)
+        else:
+            calentar(client)
+    return client
+
+
+def cerrar_clientes() -> None:
+    """Cierra todos los clientes registrados y sus conexiones."""
+    with _lock:
+        for client in _clientes.values():
+            client.close()
+        _clientes.clear()
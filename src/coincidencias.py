@@ -0,0 +1,86 @@
+import json
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from rutas import CONFIG_DIR
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:  # sin rapidfuzz se usa difflib: más lento y menos tolerante a nombres incompletos
+    fuzz = process = None
+
+ALIAS_POR_DEFECTO = CONFIG_DIR / "alias_nombres.json"
+UMBRAL_POR_DEFECTO = 80.0
+
+
+def normalizar(nombre: str) -> str:
+    """Nombre en mayúsculas, sin tildes, sin aclaraciones entre paréntesis y con las palabras ordenadas."""
+    nombre = re.sub(r"\(.*?\)", " ", nombre)
+    nombre = unicodedata.normalize("NFKD", nombre)
+    nombre = "".join(c for c in nombre if not unicodedata.combining(c))
+    palabras = re.sub(r"[^A-Z0-9]+", " ", nombre.upper()).split()
+    return " ".join(sorted(palabras))
+
+
+def cargar_alias(ruta: str | Path = ALIAS_POR_DEFECTO) -> Dict[str, Dict[str, str]]:
+    """Lee los alias confirmados: ``{slug del curso: {AUTOR: nombre_crea}}``."""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return {}
+    with ruta.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_alias(alias: Dict[str, Dict[str, str]], ruta: str | Path = ALIAS_POR_DEFECTO) -> None:
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with ruta.open("w", encoding="utf-8") as f:
+        json.dump(alias, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def confirmar_alias(slug: str, pares: Dict[str, str], ruta: str | Path = ALIAS_POR_DEFECTO) -> Dict[str, Dict[str, str]]:
+    """Agrega pares ``autor -> nombre_crea`` confirmados al archivo de alias."""
+    alias = cargar_alias(ruta)
+    alias.setdefault(slug, {}).update({autor.upper(): nombre for autor, nombre in pares.items()})
+    guardar_alias(alias, ruta)
+    return alias
+
+
+def _similitudes(autores: List[str], nombres: List[str]) -> np.ndarray:
+    """Matriz autores x nombres con puntajes 0-100 (promedio de token_set y token_sort)."""
+    if process is not None:
+        conjunto = process.cdist(autores, nombres, scorer=fuzz.token_set_ratio, workers=-1)
+        orden = process.cdist(autores, nombres, scorer=fuzz.token_sort_ratio, workers=-1)
+        return (conjunto + orden) / 2
+    return np.array([[SequenceMatcher(None, a, n).ratio() * 100 for n in nombres] for a in autores])
+
+
+def sugerir_coincidencias(autores: List[str], nombres_crea: List[str],
+                          umbral: float = UMBRAL_POR_DEFECTO) -> List[Dict[str, Any]]:
+    """Propone un nombre CREA para cada autor sin coincidencia exacta.
+
+    Se puntúan todos los pares de una sola vez y se asignan de mayor a menor
+    puntaje, sin repetir autores ni nombres. Los autores cuyo mejor candidato no
+    alcanza ``umbral`` quedan con ``nombre_crea`` en ``None``.
+    """
+    if not autores:
+        return []
+    sugerencias = {a: {"autor": a, "nombre_crea": None, "puntaje": 0.0} for a in autores}
+    if nombres_crea:
+        matriz = _similitudes([normalizar(a) for a in autores], [normalizar(n) for n in nombres_crea])
+        usados_a, usados_n = set(), set()
+        for plano in np.argsort(-matriz, axis=None, kind="stable"):
+            i, j = divmod(int(plano), len(nombres_crea))
+            if matriz[i, j] < umbral:
+                break
+            if i in usados_a or j in usados_n:
+                continue
+            usados_a.add(i)
+            usados_n.add(j)
+            sugerencias[autores[i]].update(nombre_crea=nombres_crea[j], puntaje=round(float(matriz[i, j]), 1))
+    return [sugerencias[a] for a in autores]
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from rutas import BASE_DIR
+
+DB_POR_DEFECTO = BASE_DIR / "data" / "trabajos.sqlite3"
+# Un trabajo tomado se considera abandonado si su trabajador no lo renueva en este plazo
+LEASE_POR_DEFECTO_S = 300.0
+MAX_INTENTOS = 3
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo TEXT NOT NULL,
+    usuario TEXT NOT NULL,
+    parametros TEXT NOT NULL,
+    clave TEXT NOT NULL UNIQUE,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    resultado TEXT,
+    error TEXT,
+    creado REAL NOT NULL,
+    iniciado REAL,
+    terminado REAL,
+    trabajador TEXT,
+    vence REAL,
+    intentos INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos (estado, creado);
+"""
+
+# Columnas agregadas después de la primera versión del esquema
+COLUMNAS_NUEVAS = {
+    "trabajador": "TEXT",
+    "vence": "REAL",
+    "intentos": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def clave_trabajo(tipo: str, parametros: Dict[str, Any]) -> str:
+    """Huella de un trabajo: dos envíos con el mismo tipo y parámetros son el mismo trabajo."""
+    contenido = json.dumps([tipo, parametros], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class ColaTrabajos:
+    """Cola persistente de trabajos en SQLite, segura para varios hilos y procesos.
+
+    Cada trabajo tomado queda reservado por un plazo (lease) que el trabajador
+    renueva mientras lo procesa; si el trabajador muere, el trabajo vuelve a
+    estar disponible al vencer el plazo, hasta ``max_intentos`` veces.
+    """
+
+    def __init__(self, ruta: str | Path = DB_POR_DEFECTO, recuperar_en_curso: bool = True,
+                 max_intentos: int = MAX_INTENTOS):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.max_intentos = max_intentos
+        self._conn = sqlite3.connect(self.ruta, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self.hay_trabajo = threading.Event()
+        with self._lock:
+            # WAL: los lectores no bloquean a los procesos que toman o terminan trabajos
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(ESQUEMA)
+            existentes = {f["name"] for f in self._conn.execute("PRAGMA table_info(trabajos)")}
+            for columna, tipo in COLUMNAS_NUEVAS.items():
+                if columna not in existentes:
+                    self._conn.execute(f"ALTER TABLE trabajos ADD COLUMN {columna} {tipo}")
+            if recuperar_en_curso:
+                # Trabajos que quedaron a medias si el servicio se detuvo
+                self._conn.execute("UPDATE trabajos SET estado = 'pendiente', iniciado = NULL, trabajador = NULL, "
+                                   "vence = NULL WHERE estado = 'en_curso'")
+
+    def encolar(self, tipo: str, parametros: Dict[str, Any], usuario: str = "anonimo") -> Dict[str, Any]:
+        """Agrega un trabajo; si ya existe uno idéntico no fallido se devuelve ese."""
+        clave = clave_trabajo(tipo, parametros)
+        with self._lock:
+            # Transacción inmediata: otros procesos (p. ej. el modo vigilancia) comparten la base
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                fila = self._conn.execute("SELECT id, estado FROM trabajos WHERE clave = ?", (clave,)).fetchone()
+                if fila is not None and fila["estado"] != "error":
+                    self._conn.execute("COMMIT")
+                    return {"id": fila["id"], "estado": fila["estado"], "duplicado": True}
+                if fila is not None:
+                    # Un trabajo fallido se reintenta al volver a enviarlo
+                    self._conn.execute(
+                        "UPDATE trabajos SET estado = 'pendiente', usuario = ?, error = NULL, creado = ?, "
+                        "iniciado = NULL, terminado = NULL, trabajador = NULL, vence = NULL, intentos = 0 "
+                        "WHERE id = ?", (usuario, time.time(), fila["id"]))
+                    id_trabajo = fila["id"]
+                else:
+                    id_trabajo = self._conn.execute(
+                        "INSERT INTO trabajos (tipo, usuario, parametros, clave, creado) VALUES (?, ?, ?, ?, ?)",
+                        (tipo, usuario, json.dumps(parametros, ensure_ascii=False), clave, time.time()),
+                    ).lastrowid
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.hay_trabajo.set()
+        return {"id": id_trabajo, "estado": "pendiente", "duplicado": False}
+
+    def tomar(self, trabajador: str = "local", lease_s: float = LEASE_POR_DEFECTO_S,
+              tipos: List[str] | None = None) -> Dict[str, Any] | None:
+        """Reserva el próximo trabajo disponible con reparto justo entre usuarios.
+
+        Son disponibles los pendientes y los en curso cuyo plazo venció (su
+        trabajador dejó de renovarlo). Se elige primero al usuario con menos
+        trabajos en curso y, entre sus trabajos, el más antiguo.
+        """
+        ahora = time.time()
+        filtro_tipos = ""
+        argumentos: tuple = (ahora,)
+        if tipos:
+            filtro_tipos = f" AND t.tipo IN ({', '.join('?' for _ in tipos)})"
+            argumentos += tuple(tipos)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Trabajos abandonados demasiadas veces: probablemente hacen caer al trabajador
+                self._conn.execute(
+                    "UPDATE trabajos SET estado = 'error', error = 'Se agotaron los intentos', terminado = ? "
+                    "WHERE estado = 'en_curso' AND vence < ? AND intentos >= ?", (ahora, ahora, self.max_intentos))
+                fila = self._conn.execute(
+                    "SELECT t.* FROM trabajos t WHERE (t.estado = 'pendiente' OR "
+                    "(t.estado = 'en_curso' AND t.vence < ?))" + filtro_tipos + " ORDER BY "
+                    "(SELECT COUNT(*) FROM trabajos r WHERE r.usuario = t.usuario AND r.estado = 'en_curso'), "
+                    "t.creado, t.id LIMIT 1", argumentos,
+                ).fetchone()
+                if fila is not None:
+                    self._conn.execute(
+                        "UPDATE trabajos SET estado = 'en_curso', iniciado = ?, trabajador = ?, vence = ?, "
+                        "intentos = intentos + 1 WHERE id = ?", (ahora, trabajador, ahora + lease_s, fila["id"]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if fila is None:
+            return None
+        trabajo = dict(fila)
+        trabajo["parametros"] = json.loads(trabajo["parametros"])
+        trabajo.update(estado="en_curso", trabajador=trabajador, intentos=trabajo["intentos"] + 1)
+        return trabajo
+
+    def renovar(self, id_trabajo: int, trabajador: str = "local", lease_s: float = LEASE_POR_DEFECTO_S) -> bool:
+        """Extiende el plazo de un trabajo (latido); False si el trabajador ya no lo tiene."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE trabajos SET vence = ? WHERE id = ? AND trabajador = ? AND estado = 'en_curso'",
+                (time.time() + lease_s, id_trabajo, trabajador))
+        return cursor.rowcount == 1
+
+    def terminar(self, id_trabajo: int, resultado: Any = None, error: str | None = None,
+                 trabajador: str | None = None) -> bool:
+        """Registra el resultado (o el error) de un trabajo.
+
+        Con ``trabajador`` solo se registra si ese trabajador todavía lo tiene
+        reservado, de modo que un trabajador que perdió el plazo no pisa el
+        resultado de quien lo retomó. Devuelve si se registró.
+        """
+        consulta = "UPDATE trabajos SET estado = ?, resultado = ?, error = ?, terminado = ?, vence = NULL WHERE id = ?"
+        argumentos: tuple = ("error" if error else "terminado", json.dumps(resultado, ensure_ascii=False),
+                             error, time.time(), id_trabajo)
+        if trabajador is not None:
+            consulta += " AND trabajador = ? AND estado = 'en_curso'"
+            argumentos += (trabajador,)
+        with self._lock:
+            cursor = self._conn.execute(consulta, argumentos)
+        return cursor.rowcount == 1
+
+    def estado(self, id_trabajo: int, con_resultado: bool = False) -> Dict[str, Any] | None:
+        """Devuelve el estado de un trabajo (y su resultado si se pide)."""
+        with self._lock:
+            fila = self._conn.execute("SELECT * FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+            if fila is None:
+                return None
+            pendientes_antes = None
+            if fila["estado"] == "pendiente":
+                pendientes_antes = self._conn.execute(
+                    "SELECT COUNT(*) FROM trabajos WHERE estado = 'pendiente' AND creado < ?", (fila["creado"],)
+                ).fetchone()[0]
+        datos = {k: fila[k] for k in ("id", "tipo", "usuario", "estado", "error", "creado", "iniciado", "terminado",
+                                      "trabajador", "intentos")}
+        if pendientes_antes is not None:
+            datos["posicion"] = pendientes_antes + 1
+        if con_resultado:
+            datos["resultado"] = json.loads(fila["resultado"]) if fila["resultado"] else None
+        return datos
+
+    def listar(self, usuario: str | None = None, limite: int = 100) -> List[Dict[str, Any]]:
+        """Lista los trabajos más recientes, opcionalmente de un usuario."""
+        consulta = "SELECT id, tipo, usuario, estado, creado, terminado FROM trabajos"
+        argumentos: tuple = ()
+        if usuario:
+            consulta += " WHERE usuario = ?"
+            argumentos = (usuario,)
+        with self._lock:
+            filas = self._conn.execute(consulta + " ORDER BY id DESC LIMIT ?", argumentos + (limite,)).fetchall()
+        return [dict(f) for f in filas]
+
+    def buscar(self, tipo: str, estado: str | None = None, **parametros: Any) -> List[Dict[str, Any]]:
+        """Trabajos de un tipo cuyos parámetros tienen los valores dados, con su resultado."""
+        consulta = "SELECT id, estado, parametros, resultado, error FROM trabajos WHERE tipo = ?"
+        argumentos: tuple = (tipo,)
+        if estado is not None:
+            consulta += " AND estado = ?"
+            argumentos += (estado,)
+        for clave, valor in parametros.items():
+            consulta += " AND json_extract(parametros, ?) = ?"
+            argumentos += (f"$.{clave}", valor)
+        with self._lock:
+            filas = self._conn.execute(consulta + " ORDER BY id", argumentos).fetchall()
+        return [
+            {**dict(f), "parametros": json.loads(f["parametros"]),
+             "resultado": json.loads(f["resultado"]) if f["resultado"] else None}
+            for f in filas
+        ]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
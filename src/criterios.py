@@ -0,0 +1,221 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from openai import OpenAI
+
+from ejecucion import pruebas_concluyentes
+from llamadas import MODELO_PRINCIPAL, limpiar_json, registrar_llamada, uso_tokens
+from reglas import cargar_consignas
+from rutas import CONFIG_DIR, DATA_OUTPUT
+
+POR_CRITERIO_POR_DEFECTO = {
+    "modelo": MODELO_PRINCIPAL,
+    # Solicitudes simultáneas (una por criterio y entrega)
+    "workers": 8,
+    # Id de la rúbrica en config/rubricas.json (None = la primera)
+    "rubrica": None,
+    "cache": DATA_OUTPUT / ".cache" / "criterios.sqlite3",
+}
+
+PROMPT_CRITERIO = """
+Eres un asistente educativo experto que evalúa entregas de programación.
+Evalúa ÚNICAMENTE el criterio "{nombre}" (máximo {maximo} puntos): {descripcion}
+
+Escala de referencia:
+{escala}
+
+Recibirás un JSON con "enunciado", "resolucion" y opcionalmente "pruebas" (resultado de ejecutar
+el código contra casos de prueba). Si la resolución incluye enlaces accesibles, analiza el código.
+
+Devuelve SOLO un objeto JSON: {{"puntaje": <entero entre 0 y {maximo}>, "comentario": "<una o dos oraciones>"}}
+"""
+
+
+def cargar_rubrica(id_rubrica: str | None = None, ruta: str | Path = CONFIG_DIR / "rubricas.json") -> Dict[str, Any]:
+    """Devuelve la rúbrica con ese id (o la primera) de ``rubricas.json``."""
+    with Path(ruta).open("r", encoding="utf-8") as f:
+        rubricas = json.load(f)
+    for rubrica in rubricas:
+        if id_rubrica is None or rubrica.get("id") == id_rubrica:
+            return rubrica
+    raise ValueError(f"Rúbrica desconocida: {id_rubrica}")
+
+
+def maximos_rubrica(rubrica: Dict[str, Any]) -> List[int]:
+    """Puntaje máximo de cada criterio, en el orden de ``detalle``."""
+    return [c["maximo"] for c in rubrica["criterios"]]
+
+
+def texto_rubrica(rubrica: Dict[str, Any]) -> str:
+    """Lista numerada de los criterios para el prompt completo."""
+    return "\n".join(f"{i}. {c['nombre']} (máx. {c['maximo']} puntos)"
+                     for i, c in enumerate(rubrica["criterios"], start=1))
+
+
+def _huella(datos: Any) -> str:
+    return hashlib.sha256(json.dumps(datos, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def version_criterio(criterio: Dict[str, Any], modelo: str = MODELO_PRINCIPAL) -> str:
+    """Cambia si se edita el criterio (texto, máximo, escala), el prompt o el modelo."""
+    return _huella([criterio, PROMPT_CRITERIO, modelo])
+
+
+def huella_entrega(enunciado: str, resolucion: str, pruebas: Dict[str, Any] | None = None) -> str:
+    return _huella([enunciado, resolucion, pruebas or None])
+
+
+def mensajes_criterio(criterio: Dict[str, Any], enunciado: str, resolucion: str,
+                      pruebas: Dict[str, Any] | None = None) -> List[Dict[str, str]]:
+    """Mensajes breves para evaluar un solo criterio de la rúbrica."""
+    escala = "\n".join(f"- {n['puntaje']} ({n['nivel']}): {n['descripcion']}" for n in criterio.get("escala", []))
+    sistema = PROMPT_CRITERIO.format(nombre=criterio["nombre"], maximo=criterio["maximo"],
+                                     descripcion=criterio.get("descripcion", ""), escala=escala)
+    datos = {"enunciado": enunciado, "resolucion": resolucion}
+    if pruebas:
+        datos["pruebas"] = pruebas
+    return [{"role": "system", "content": sistema},
+            {"role": "user", "content": json.dumps(datos, ensure_ascii=False, indent=2)}]
+
+
+class CacheCriterios:
+    """Puntajes por (versión del criterio, huella de la entrega) en SQLite."""
+
+    def __init__(self, ruta: str | Path = POR_CRITERIO_POR_DEFECTO["cache"]):
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS criterios (version TEXT NOT NULL, huella TEXT NOT NULL, "
+                "puntaje INTEGER NOT NULL, comentario TEXT NOT NULL, creado REAL NOT NULL, "
+                "PRIMARY KEY (version, huella))"
+            )
+
+    def obtener(self, version: str, huella: str) -> Dict[str, Any] | None:
+        with self._lock:
+            fila = self._conn.execute("SELECT puntaje, comentario FROM criterios WHERE version = ? AND huella = ?",
+                                      (version, huella)).fetchone()
+        return {"puntaje": fila[0], "comentario": fila[1]} if fila else None
+
+    def guardar(self, version: str, huella: str, puntaje: int, comentario: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO criterios VALUES (?, ?, ?, ?, ?)",
+                               (version, huella, puntaje, comentario, time.time()))
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def evaluar_criterio(client: OpenAI, criterio: Dict[str, Any], enunciado: str, resolucion: str,
+                     pruebas: Dict[str, Any] | None = None, modelo: str = MODELO_PRINCIPAL) -> Dict[str, Any]:
+    """Pide al modelo el puntaje de un criterio; lanza ``ValueError`` si no respeta el esquema."""
+    response = client.chat.completions.create(
+        model=modelo,
+        messages=mensajes_criterio(criterio, enunciado, resolucion, pruebas),
+        temperature=0,
+    )
+    datos = json.loads(limpiar_json(response.choices[0].message.content.strip()))
+    puntaje = datos.get("puntaje") if isinstance(datos, dict) else None
+    if not isinstance(puntaje, int) or isinstance(puntaje, bool) or not 0 <= puntaje <= criterio["maximo"]:
+        raise ValueError(f"Puntaje inválido para {criterio['id']}: {puntaje!r}")
+    return {"puntaje": puntaje, "comentario": str(datos.get("comentario", "")),
+            "_uso": uso_tokens(getattr(response, "usage", None), modelo)}
+
+
+def plan_criterios(entregas: List[Dict[str, Any]], rubrica: Dict[str, Any], cache: CacheCriterios,
+                   modelo: str = MODELO_PRINCIPAL) -> Tuple[List[Tuple], List[Tuple]]:
+    """Separa los pares (entrega, criterio) ya calculados de los que hay que pedir al modelo."""
+    consignas = None
+    en_cache, faltantes = [], []
+    for entrega in entregas:
+        enunciado = entrega.get("enunciado", "")
+        if not enunciado:
+            # Como en las reglas: sin enunciado en la entrega se usa el de la consigna
+            consignas = cargar_consignas() if consignas is None else consignas
+            enunciado = consignas.get(entrega.get("tarea", ""), "")
+        huella = huella_entrega(enunciado, entrega.get("resolucion", ""), entrega.get("pruebas"))
+        for i, criterio in enumerate(rubrica["criterios"]):
+            par = (entrega, i, criterio, enunciado, version_criterio(criterio, modelo), huella)
+            guardado = cache.obtener(par[4], huella)
+            if guardado is not None:
+                en_cache.append(par + (guardado,))
+            else:
+                faltantes.append(par)
+    return en_cache, faltantes
+
+
+def ajustar_por_pruebas(rubrica: Dict[str, Any], detalle: List[int], pruebas: Dict[str, Any] | None) -> None:
+    """Fija en ``detalle`` el criterio de Funcionalidad según la proporción de casos aprobados.
+
+    Solo si todos los casos se ejecutaron (ver ``ejecucion.pruebas_concluyentes``).
+    """
+    if not pruebas_concluyentes(pruebas):
+        return
+    for i, criterio in enumerate(rubrica["criterios"]):
+        if criterio["id"] == "funcionalidad":
+            detalle[i] = round(criterio["maximo"] * pruebas["aprobadas"] / pruebas["total"])
+
+
+def evaluar_por_criterios(client: OpenAI, entregas: List[Dict[str, Any]], config: Dict[str, Any],
+                          reporte: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Evalúa cada criterio de la rúbrica con su propia solicitud, en paralelo y con caché.
+
+    Solo se piden al modelo los criterios cuya versión o entrega cambió; el
+    total se recalcula sumando los puntajes. Devuelve las entregas en las que
+    algún criterio no se pudo evaluar, para reintentarlas con el prompt completo.
+    """
+    rubrica = cargar_rubrica(config["rubrica"])
+    propia = not isinstance(config["cache"], CacheCriterios)
+    cache = CacheCriterios(config["cache"]) if propia else config["cache"]
+    modelo = config["modelo"]
+
+    def pedir(par):
+        entrega, _, criterio, enunciado, version, huella = par
+        inicio = time.perf_counter()
+        resultado = evaluar_criterio(client, criterio, enunciado, entrega.get("resolucion", ""),
+                                     entrega.get("pruebas"), modelo)
+        cache.guardar(version, huella, resultado["puntaje"], resultado["comentario"])
+        return resultado, time.perf_counter() - inicio
+
+    try:
+        en_cache, faltantes = plan_criterios(entregas, rubrica, cache, modelo)
+        reporte["criterios_desde_cache"] += len(en_cache)
+        puntajes: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        for entrega, i, *_, guardado in en_cache:
+            puntajes.setdefault(id(entrega), {})[i] = guardado
+        fallidas: Dict[int, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=config["workers"]) as pool:
+            for par, futuro in [(par, pool.submit(pedir, par)) for par in faltantes]:
+                try:
+                    resultado, segundos = futuro.result()
+                except (json.JSONDecodeError, ValueError, IndexError, AttributeError):
+                    fallidas[id(par[0])] = par[0]
+                    continue
+                registrar_llamada(reporte, resultado, modelo, segundos)
+                reporte["criterios_evaluados"] += 1
+                puntajes.setdefault(id(par[0]), {})[par[1]] = resultado
+    finally:
+        if propia:
+            cache.cerrar()
+
+    for entrega in entregas:
+        if id(entrega) in fallidas:
+            reporte["reintentos_individuales"] += 1
+            continue
+        por_criterio = puntajes[id(entrega)]
+        detalle = [por_criterio[i]["puntaje"] for i in range(len(rubrica["criterios"]))]
+        ajustar_por_pruebas(rubrica, detalle, entrega.get("pruebas"))
+        reporte["entregas"] += 1
+        entrega["calificacion"] = {"total": sum(detalle), "detalle": detalle}
+        entrega["comentarios"] = "\n".join(
+            f"{c['nombre']}: {por_criterio[i]['comentario']}" for i, c in enumerate(rubrica["criterios"])
+        )
+    return list(fallidas.values())
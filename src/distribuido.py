@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List
+
+from cola_trabajos import DB_POR_DEFECTO, LEASE_POR_DEFECTO_S, ColaTrabajos
+from flujo_entregas import bloquear_archivo
+from rutas import DATA_OUTPUT
+
+# Tipo de trabajo de una entrega individual: lleva todo lo necesario para evaluarla en otro equipo
+TIPO_ENTREGA = "evaluar_entrega"
+
+
+class ColaRemota:
+    """Cliente HTTP de la cola de ``servicio.py`` con la interfaz de ``ColaTrabajos``.
+
+    Permite que trabajadores en otros equipos tomen trabajos de una única base
+    SQLite sin compartir el archivo por red.
+    """
+
+    def __init__(self, url: str, timeout_s: float = 30.0):
+        self.url = url.rstrip("/")
+        self.timeout_s = timeout_s
+        # Sin notificaciones remotas: los trabajadores sondean cada segundo
+        self.hay_trabajo = threading.Event()
+
+    def _post(self, ruta: str, datos: Dict[str, Any]) -> tuple[int, Any]:
+        solicitud = urllib.request.Request(
+            f"{self.url}{ruta}", data=json.dumps(datos, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(solicitud, timeout=self.timeout_s) as r:
+                return r.status, json.loads(r.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b"{}")
+
+    def encolar(self, tipo: str, parametros: Dict[str, Any], usuario: str = "anonimo") -> Dict[str, Any]:
+        estado, datos = self._post("/trabajos", {"tipo": tipo, "parametros": parametros, "usuario": usuario})
+        if estado >= 400:
+            raise ValueError(datos.get("error", f"Error {estado} al encolar"))
+        return datos
+
+    def tomar(self, trabajador: str = "remoto", lease_s: float = LEASE_POR_DEFECTO_S,
+              tipos: List[str] | None = None) -> Dict[str, Any] | None:
+        try:
+            _, datos = self._post("/trabajos/tomar", {"trabajador": trabajador, "lease_s": lease_s, "tipos": tipos})
+        except (urllib.error.URLError, OSError):
+            return None  # servicio caído o reiniciándose: se reintenta en la próxima vuelta
+        return datos.get("trabajo")
+
+    def renovar(self, id_trabajo: int, trabajador: str = "remoto", lease_s: float = LEASE_POR_DEFECTO_S) -> bool:
+        try:
+            datos = {"trabajador": trabajador, "lease_s": lease_s}
+            return self._post(f"/trabajos/{id_trabajo}/renovar", datos)[0] == 200
+        except (urllib.error.URLError, OSError):
+            return True  # un latido perdido no cancela el trabajo; el plazo decide
+
+    def terminar(self, id_trabajo: int, resultado: Any = None, error: str | None = None,
+                 trabajador: str | None = None) -> bool:
+        datos = {"trabajador": trabajador, "resultado": resultado, "error": error}
+        for intento in range(3):
+            try:
+                return self._post(f"/trabajos/{id_trabajo}/terminar", datos)[0] == 200
+            except (urllib.error.URLError, OSError):
+                time.sleep(2 ** intento)
+        return False
+
+
+def publicar_entregas(cola, archivo: str, opciones: Dict[str, Any] | None = None, usuario: str = "anonimo",
+                      salida_dir: Path = DATA_OUTPUT) -> Dict[str, int]:
+    """Encola un trabajo por cada entrega de un ``_entregas.json`` (ruta relativa a data/output).
+
+    Volver a publicar el mismo archivo no duplica trabajos: solo se encolan las
+    entregas cuyo contenido cambió.
+    """
+    with (Path(salida_dir) / archivo).open("r", encoding="utf-8") as f:
+        evaluaciones = json.load(f)
+    conteo = {"publicadas": 0, "duplicadas": 0, "sin_entrega": 0}
+    for entrega in evaluaciones:
+        if entrega.get("resolucion", "no realiza").strip().lower() == "no realiza":
+            conteo["sin_entrega"] += 1
+            continue
+        parametros = {"archivo": str(archivo), "nombre": entrega.get("nombre"), "entrega": entrega,
+                      "opciones": opciones or {}}
+        encolado = cola.encolar(TIPO_ENTREGA, parametros, usuario)
+        conteo["duplicadas" if encolado["duplicado"] else "publicadas"] += 1
+    return conteo
+
+
+def recolectar(cola: ColaTrabajos, archivo: str, salida_dir: Path = DATA_OUTPUT) -> Dict[str, Any]:
+    """Escribe el ``_evaluaciones.json`` con los resultados terminados de un archivo publicado.
+
+    Se usa el resultado del trabajo cuya entrega coincide con la resolución
+    actual; las entregas sin resultado conservan la evaluación previa. Es
+    idempotente: recolectar dos veces produce el mismo archivo.
+    """
+    entradas = Path(salida_dir) / archivo
+    salida = entradas.with_name(entradas.name.replace("_entregas.json", "_evaluaciones.json"))
+    # Bajo el mismo bloqueo que los trabajos 'evaluar' sobre este archivo
+    with bloquear_archivo(salida):
+        with entradas.open("r", encoding="utf-8") as f:
+            evaluaciones = json.load(f)
+        previas = {}
+        if salida.exists():
+            with salida.open("r", encoding="utf-8") as f:
+                previas = {e.get("nombre"): e for e in json.load(f)}
+
+        resultados = {}
+        errores = {}
+        for trabajo in cola.buscar(TIPO_ENTREGA, archivo=str(archivo)):
+            entrega = trabajo["parametros"]["entrega"]
+            clave = (entrega.get("nombre"), entrega.get("resolucion"))
+            if trabajo["estado"] == "terminado":
+                resultados[clave] = trabajo["resultado"]
+            elif trabajo["estado"] == "error":
+                errores[clave] = trabajo["error"]
+
+        conteo = {"evaluadas": 0, "pendientes": 0, "errores": []}
+        combinadas = []
+        for entrega in evaluaciones:
+            clave = (entrega.get("nombre"), entrega.get("resolucion"))
+            resultado = resultados.get(clave)
+            if resultado is not None:
+                entrega = {**entrega, **{k: v for k, v in resultado.items() if k not in ("nombre", "reporte")}}
+                conteo["evaluadas"] += 1
+            else:
+                if entrega.get("resolucion", "no realiza").strip().lower() != "no realiza":
+                    if clave in errores:
+                        conteo["errores"].append({"nombre": clave[0], "error": errores[clave]})
+                    else:
+                        conteo["pendientes"] += 1
+                entrega = previas.get(entrega.get("nombre"), entrega)
+            combinadas.append(entrega)
+
+        with salida.open("w", encoding="utf-8") as f:
+            json.dump(combinadas, f, ensure_ascii=False, indent=2)
+    conteo["archivo"] = str(salida)
+    return conteo
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluación distribuida sobre la cola de trabajos.")
+    parser.add_argument("--db", default=str(DB_POR_DEFECTO), help="Cola SQLite local")
+    parser.add_argument("--url", help="Usar la cola de un servicio.py remoto (p. ej. http://servidor:8000)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_publicar = sub.add_parser("publicar", help="Encolar cada entrega de un _entregas.json")
+    p_publicar.add_argument("archivo", help="Ruta relativa a data/output, p. ej. <slug>/<consigna>_entregas.json")
+    p_publicar.add_argument("--usuario", default="anonimo")
+    p_publicar.add_argument("--cascada", action="store_true")
+    p_publicar.add_argument("--reglas", action="store_true")
+    p_publicar.add_argument("--stream", action="store_true")
+
+    p_trabajar = sub.add_parser("trabajar", help="Procesar entregas publicadas")
+    p_trabajar.add_argument("--workers", type=int, default=4)
+    p_trabajar.add_argument("--lease", type=float, default=120.0,
+                            help="Segundos sin latido tras los que otro trabajador retoma la entrega")
+
+    p_recolectar = sub.add_parser("recolectar", help="Escribir el _evaluaciones.json con los resultados")
+    p_recolectar.add_argument("archivo")
+
+    args = parser.parse_args()
+    cola = ColaRemota(args.url) if args.url else ColaTrabajos(args.db, recuperar_en_curso=False)
+
+    if args.comando == "publicar":
+        opciones = {"cascada": args.cascada, "reglas": args.reglas, "stream": args.stream}
+        print(publicar_entregas(cola, args.archivo, opciones, args.usuario))
+    elif args.comando == "trabajar":
+        from servicio import Trabajadores
+
+        trabajadores = Trabajadores(cola, args.workers, lease_s=args.lease, tipos=[TIPO_ENTREGA])
+        trabajadores.iniciar()
+        print(f"{args.workers} trabajadores ({trabajadores.prefijo}) esperando entregas...")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            trabajadores.detener()
+    else:
+        if args.url:
+            parser.error("recolectar se ejecuta en el equipo que tiene la base (--db)")
+        print(recolectar(cola, args.archivo))
@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+import requests
+
+from rutas import CONFIG_DIR
+
+LIMITES_POR_DEFECTO = {
+    "cpu_s": 5,
+    "memoria_mb": 256,
+    "tiempo_s": 10,
+    "salida_kb": 256,
+}
+
+MAX_DESCARGA_BYTES = 1_000_000
+MAX_SALIDA_GUARDADA = 20_000
+
+RE_ENLACE = re.compile(r"https?://\S+")
+RE_BLOQUE = re.compile(r"```(?:python|py)?\s*\n(.*?)```", re.DOTALL)
+
+# Lanzador que aplica los límites dentro del hijo antes de ejecutar la entrega
+# (evita preexec_fn, que no es seguro cuando hay varios hilos lanzando procesos)
+LANZADOR = """
+import runpy, sys
+cpu, memoria, salida, script = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]), sys.argv[4]
+try:
+    import resource
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    resource.setrlimit(resource.RLIMIT_AS, (memoria, memoria))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (salida, salida))
+except ImportError:
+    pass
+sys.argv = [script]
+runpy.run_path(script, run_name="__main__")
+"""
+
+
+def cargar_casos(config_dir: str | Path = CONFIG_DIR) -> Dict[str, List[Dict[str, Any]]]:
+    """Carga los casos de prueba de todos los ``casos_*.json`` indexados por consigna."""
+    casos: Dict[str, List[Dict[str, Any]]] = {}
+    for archivo in sorted(Path(config_dir).glob("casos_*.json")):
+        with archivo.open("r", encoding="utf-8") as f:
+            casos.update(json.load(f))
+    return casos
+
+
+def url_codigo(enlace: str) -> str | None:
+    """Convierte un enlace de GitHub/GitLab a la URL del archivo crudo, si apunta a código."""
+    enlace = enlace.rstrip(".,;)")
+    m = re.match(r"https?://github\.com/([^/]+)/([^/]+)/blob/(.+)", enlace)
+    if m:
+        enlace = f"https://raw.githubusercontent.com/{m.group(1)}/{m.group(2)}/{m.group(3)}"
+    elif "gitlab.com" in enlace and "/-/blob/" in enlace:
+        enlace = enlace.replace("/-/blob/", "/-/raw/")
+    ruta = enlace.split("?", 1)[0].lower()
+    if ruta.endswith((".py", ".ipynb")):
+        return enlace
+    return None
+
+
+def codigo_notebook(contenido: str) -> str:
+    """Concatena las celdas de código de un notebook omitiendo comandos mágicos."""
+    notebook = json.loads(contenido)
+    bloques = []
+    for celda in notebook.get("cells", []):
+        if celda.get("cell_type") != "code":
+            continue
+        fuente = celda.get("source", "")
+        fuente = "".join(fuente) if isinstance(fuente, list) else fuente
+        lineas = [l for l in fuente.splitlines() if not l.lstrip().startswith(("!", "%"))]
+        bloques.append("\n".join(lineas))
+    return "\n\n".join(bloques)
+
+
+def _descargar(url: str) -> str | None:
+    try:
+        respuesta = requests.get(url, timeout=10)
+        if respuesta.status_code != 200 or len(respuesta.content) > MAX_DESCARGA_BYTES:
+            return None
+        texto = respuesta.text
+        return codigo_notebook(texto) if url.split("?", 1)[0].lower().endswith(".ipynb") else texto
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def extraer_codigo(resolucion: str, descargar: bool = True) -> List[str]:
+    """Obtiene los programas Python de una resolución: bloques de código y enlaces a .py/.ipynb."""
+    programas = [b.strip() for b in RE_BLOQUE.findall(resolucion) if b.strip()]
+    if descargar:
+        urls = dict.fromkeys(u for u in map(url_codigo, RE_ENLACE.findall(resolucion)) if u)
+        for url in urls:
+            codigo = _descargar(url)
+            if codigo and codigo.strip():
+                programas.append(codigo)
+    return programas
+
+
+def ejecutar_aislado(codigo: str, entrada: str = "", limites: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Ejecuta código en un subproceso con límites de CPU, memoria y tiempo.
+
+    No aísla el sistema de archivos ni la red: el código corre con los permisos
+    del usuario actual.
+    """
+    limites = {**LIMITES_POR_DEFECTO, **(limites or {})}
+    with tempfile.TemporaryDirectory(prefix="evaluador_") as tmp:
+        script = Path(tmp) / "entrega.py"
+        script.write_text(codigo, encoding="utf-8")
+        try:
+            proceso = subprocess.run(
+                [sys.executable, "-I", "-c", LANZADOR, str(limites["cpu_s"]),
+                 str(limites["memoria_mb"] * 1024 * 1024), str(limites["salida_kb"] * 1024), str(script)],
+                input=entrada,
+                capture_output=True,
+                text=True,
+                cwd=tmp,
+                env={"PATH": os.environ.get("PATH", ""), "PYTHONIOENCODING": "utf-8"},
+                timeout=limites["tiempo_s"],
+                start_new_session=True,
+            )
+        except subprocess.TimeoutExpired as e:
+            salida = e.stdout.decode("utf-8", "replace") if isinstance(e.stdout, bytes) else (e.stdout or "")
+            return {"codigo_salida": None, "stdout": salida[:MAX_SALIDA_GUARDADA], "stderr": "",
+                    "error": "tiempo agotado"}
+
+    error = None
+    if proceso.returncode != 0:
+        ultima = proceso.stderr.strip().splitlines()[-1:] or [f"código {proceso.returncode}"]
+        error = ultima[0]
+    return {"codigo_salida": proceso.returncode, "stdout": proceso.stdout[:MAX_SALIDA_GUARDADA],
+            "stderr": proceso.stderr[-2000:], "error": error}
+
+
+def _verificar(caso: Dict[str, Any], ejecucion: Dict[str, Any]) -> bool:
+    patrones = caso.get("salida_regex", [])
+    if isinstance(patrones, str):
+        patrones = [patrones]
+    # DOTALL: los patrones suelen abarcar varias líneas ("apio.*brocoli" con un producto por línea)
+    return all(re.search(p, ejecucion["stdout"], re.MULTILINE | re.IGNORECASE | re.DOTALL) for p in patrones)
+
+
+def ejecutar_pruebas(programas: List[str], casos: List[Dict[str, Any]],
+                     limites: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Corre los programas de una entrega contra los casos de prueba de su consigna.
+
+    Un caso se aprueba si al menos uno de los programas lo cumple. Los casos que
+    comparten ``entrada`` se verifican con una única ejecución. ``ejecutadas``
+    cuenta los casos en los que algún programa terminó sin error.
+    """
+    if not programas:
+        return {"aprobadas": 0, "total": len(casos), "casos": [], "error": "no se encontró código ejecutable"}
+
+    corridas_por_entrada: Dict[str, List[Dict[str, Any]]] = {}
+    for entrada in dict.fromkeys(c.get("entrada", "") for c in casos):
+        corridas_por_entrada[entrada] = [ejecutar_aislado(p, entrada, limites) for p in programas]
+
+    resultados = []
+    for caso in casos:
+        corridas = corridas_por_entrada[caso.get("entrada", "")]
+        ok = any(_verificar(caso, c) for c in corridas)
+        errores = [c["error"] for c in corridas if c["error"]]
+        resultados.append({"nombre": caso.get("nombre", ""), "ok": ok, "ejecutado": len(errores) < len(corridas),
+                           "error": None if ok or not errores else errores[0]})
+    return {"aprobadas": sum(r["ok"] for r in resultados), "ejecutadas": sum(r["ejecutado"] for r in resultados),
+            "total": len(resultados), "casos": resultados}
+
+
+def pruebas_concluyentes(pruebas: Dict[str, Any] | None) -> bool:
+    """Indica si las pruebas alcanzan para fijar la Funcionalidad sin consultar al modelo.
+
+    Solo lo son si todos los casos se ejecutaron sin error: una excepción (por
+    ejemplo, el programa pide otra entrada) no prueba que la lógica esté mal y
+    en ese caso el resultado solo se envía al modelo como evidencia.
+    """
+    if not pruebas or not pruebas.get("total") or pruebas.get("error"):
+        return False
+    return pruebas.get("ejecutadas") == pruebas["total"]
+
+
+def adjuntar_pruebas(evaluaciones: List[Dict[str, Any]], casos: Dict[str, List[Dict[str, Any]]] | None = None,
+                     limites: Dict[str, Any] | None = None, workers: int | None = None,
+                     descargar: bool = True) -> List[Dict[str, Any]]:
+    """Ejecuta las pruebas de cada entrega y guarda el resultado en ``entrega["pruebas"]``.
+
+    Cada entrega se atiende desde un pool de hilos: el trabajo real ocurre en
+    subprocesos (uno por ejecución), así que los hilos solo esperan.
+    """
+    casos = cargar_casos() if casos is None else casos
+    pendientes = [e for e in evaluaciones
+                  if e.get("tarea") in casos and e.get("resolucion", "").strip().lower() != "no realiza"]
+
+    def probar(entrega):
+        programas = extraer_codigo(entrega.get("resolucion", ""), descargar)
+        return ejecutar_pruebas(programas, casos[entrega["tarea"]], limites)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for entrega, pruebas in zip(pendientes, pool.map(probar, pendientes)):
+            entrega["pruebas"] = pruebas
+    return evaluaciones
@@ -1,140 +1,802 @@
 import json
-import os
+import time
+import types
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List
 
-from dotenv import load_dotenv
 from openai import OpenAI
 
-SYSTEM_PROMPT = """
+from clientes import obtener_cliente
+from criterios import (
+    POR_CRITERIO_POR_DEFECTO,
+    ajustar_por_pruebas,
+    cargar_rubrica,
+    evaluar_por_criterios,
+    maximos_rubrica,
+    texto_rubrica,
+)
+from ejecucion import adjuntar_pruebas, pruebas_concluyentes
+from flujo_entregas import EscritorEntregas, en_bloques, leer_entregas
+from json_incremental import FueraDeEsquema, ParserJSONIncremental
+from llamadas import MODELO_PRINCIPAL, MODELO_RAPIDO, limpiar_json, registrar_llamada, uso_tokens
+from reglas import clasificar
+
+PLANTILLA_PROMPT = """
 Eres un asistente educativo experto de la aplicación App-Local para evaluar entregas de programación.
 
 Recibirás un objeto JSON con los siguientes campos:
 - "nombre": nombre del estudiante
 - "enunciado": consigna completa a evaluar (texto literal)
 - "resolucion": texto enviado por el estudiante, que puede contener enlaces a código (por ejemplo, GitHub o Colab).
+- "pruebas" (opcional): resultado de ejecutar localmente el código del estudiante contra casos de prueba de la consigna. Úsalo como evidencia objetiva para el criterio de Funcionalidad y Exactitud.
 
 Debes:
 - Comparar cuidadosamente la resolución del estudiante con el enunciado recibido.
 - Si la resolución incluye enlaces, accede al código real en ellos (si es accesible) y analiza su contenido como parte de la evaluación. Si algún enlace no es accesible, acláralo en el comentario.
 - Evalúa aplicando la siguiente rúbrica:
 
-1. Comprensión del Problema (máx. 8 puntos)
-2. Estructura y Organización del Código (máx. 6 puntos)
-3. Funcionalidad y Exactitud (máx. 6 puntos)
-4. Uso de Estrategias y Eficiencia (máx. 4 puntos)
+{rubrica}
 
 Asigna un puntaje único a cada criterio, suma el total y justifica la calificación con un comentario claro y breve.
 
 Devuelve SIEMPRE solo un objeto JSON bajo este JSON Schema:
 
-{
+{{
   "type": "object",
-  "properties": {
-    "nombre": {"type": "string"},
-    "calificacion": {
+  "properties": {{
+    "nombre": {{"type": "string"}},
+    "calificacion": {{
       "type": "object",
-      "properties": {
-        "total": {"type": "integer"},
-        "detalle": {
+      "properties": {{
+        "total": {{"type": "integer"}},
+        "detalle": {{
           "type": "array",
-          "items": {"type": "integer"},
-          "minItems": 4,
-          "maxItems": 4
-        }
-      },
+          "items": {{"type": "integer"}},
+          "minItems": {criterios},
+          "maxItems": {criterios}
+        }}
+      }},
       "required": ["total", "detalle"]
-    },
-    "comentarios": {"type": "string"}
-  },
+    }},
+    "comentarios": {{"type": "string"}}
+  }},
   "required": ["nombre", "calificacion", "comentarios"]
-}
+}}
 
 No agregues texto antes ni después del JSON.
 """
 
-def _load_client() -> OpenAI:
-    """Crea una instancia del cliente OpenAI a partir de la API key."""
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError(
-            "No se encontró OPENAI_API_KEY. Agrégalo a .env o usa export."
-        )
-    return OpenAI(api_key=api_key)
-
-def evaluar_con_chat(client: OpenAI, nombre: str, enunciado: str, resolucion: str) -> Dict[str, Any]:
-    """Envía una entrega al modelo de chat y devuelve el resultado."""
+PLANTILLA_PROMPT_LOTE = """
+Eres un asistente educativo experto de la aplicación App-Local para evaluar entregas de programación.
+
+Recibirás un objeto JSON con los siguientes campos:
+- "enunciado": consigna completa a evaluar (texto literal), común a todas las entregas
+- "entregas": lista de entregas, cada una con "nombre" (nombre del estudiante), "resolucion" (texto enviado por el estudiante, que puede contener enlaces a código) y opcionalmente "pruebas" (resultado de ejecutar localmente su código contra casos de prueba).
+
+Evalúa CADA entrega por separado e independientemente de las demás:
+- Compara la resolución con el enunciado. Si incluye enlaces, accede al código real (si es accesible); si no lo es, acláralo en el comentario.
+- Aplica la siguiente rúbrica:
+
+{rubrica}
+
+Asigna un puntaje único a cada criterio, suma el total y justifica la calificación con un comentario claro y breve.
+
+Devuelve SIEMPRE solo un objeto JSON con un resultado por entrega, usando exactamente el mismo "nombre" recibido:
+
+{{
+  "type": "object",
+  "properties": {{
+    "resultados": {{
+      "type": "array",
+      "items": {{
+        "type": "object",
+        "properties": {{
+          "nombre": {{"type": "string"}},
+          "calificacion": {{
+            "type": "object",
+            "properties": {{
+              "total": {{"type": "integer"}},
+              "detalle": {{"type": "array", "items": {{"type": "integer"}}, "minItems": {criterios}, "maxItems": {criterios}}}
+            }},
+            "required": ["total", "detalle"]
+          }},
+          "comentarios": {{"type": "string"}}
+        }},
+        "required": ["nombre", "calificacion", "comentarios"]
+      }}
+    }}
+  }},
+  "required": ["resultados"]
+}}
+
+No agregues texto antes ni después del JSON.
+"""
+
+# Rúbrica del prompt completo (la primera de config/rubricas.json)
+RUBRICA = cargar_rubrica()
+
+# Puntaje máximo de cada criterio en el orden de "detalle"
+MAXIMOS_CRITERIOS = maximos_rubrica(RUBRICA)
+
+def prompt_sistema(rubrica: Dict[str, Any], lote: bool = False) -> str:
+    """Prompt completo (individual o de lote) con los criterios y máximos de ``rubrica``."""
+    plantilla = PLANTILLA_PROMPT_LOTE if lote else PLANTILLA_PROMPT
+    return plantilla.format(rubrica=texto_rubrica(rubrica), criterios=len(rubrica["criterios"]))
+
+SYSTEM_PROMPT = prompt_sistema(RUBRICA)
+SYSTEM_PROMPT_LOTE = prompt_sistema(RUBRICA, lote=True)
+
+CASCADA_POR_DEFECTO = {
+    "modelo_rapido": MODELO_RAPIDO,
+    "modelo_principal": MODELO_PRINCIPAL,
+    # Se escala si el modelo rápido declara menos confianza que esto
+    "confianza_minima": 0.7,
+    # Totales a +/- margen_borde del umbral de aprobación se consideran dudosos
+    "umbral_aprobacion": 12,
+    "margen_borde": 2,
+}
+
+EMPAQUETADO_POR_DEFECTO = {
+    # Solo se empaquetan entregas cuya resolución no supere estos tokens
+    "max_tokens_entrega": 400,
+    # Presupuesto de tokens de entrada por solicitud (prompt de sistema + enunciado + entregas)
+    "presupuesto_tokens": 6000,
+    "max_por_lote": 8,
+}
+
+# Entregas por bloque al procesar archivos en streaming cuando las opciones se benefician
+# de evaluar varias juntas (reglas y ejecución en paralelo, empaquetado)
+BLOQUE_PARALELO = 32
+
+INSTRUCCION_CONFIANZA = (
+    '\n\nAgrega además al JSON el campo "confianza": un número entre 0 y 1 que indique '
+    "qué tan seguro estás de la calificación asignada."
+)
+
+INSTRUCCION_CONFIANZA_LOTE = (
+    '\n\nAgrega además a cada resultado el campo "confianza": un número entre 0 y 1 que indique '
+    "qué tan seguro estás de la calificación asignada."
+)
+
+def contar_tokens(texto: str, modelo: str = MODELO_PRINCIPAL) -> int:
+    """Cuenta tokens con tiktoken si está instalado; si no, estima ~4 caracteres por token."""
+    try:
+        import tiktoken
+    except ImportError:
+        return (len(texto) + 3) // 4
+    try:
+        codificador = tiktoken.encoding_for_model(modelo)
+    except KeyError:
+        codificador = tiktoken.get_encoding("o200k_base")
+    return len(codificador.encode(texto))
+
+def _calificacion_estructural(calificacion: Any) -> bool:
+    return isinstance(calificacion, dict) and isinstance(calificacion.get("total"), int) \
+        and isinstance(calificacion.get("detalle"), list)
+
+def _completar_en_streaming(client: OpenAI, modelo: str, messages: List[Dict[str, str]],
+                            al_calificar: Callable[[Dict[str, Any]], None] | None = None) -> Dict[str, Any]:
+    """Pide la respuesta en streaming y la parsea a medida que llega.
+
+    Llama a ``al_calificar`` en cuanto se completa ``calificacion`` y corta la
+    generación (lanzando ``FueraDeEsquema``) si el modelo escribe demasiado
+    texto antes del JSON o una calificación sin la estructura esperada.
+    """
+    inicio = time.perf_counter()
+    ttft = None
+    usage = None
+    parser = ParserJSONIncremental(claves=("calificacion",))
+    stream = client.chat.completions.create(
+        model=modelo,
+        messages=messages,
+        temperature=0,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    try:
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if not delta:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - inicio
+            nuevas = parser.alimentar(delta)
+            if parser.completo and len(parser.sobrante) > 50:
+                # Tras el JSON solo se espera el cierre del bloque y el uso; el resto se corta
+                break
+            if "calificacion" in nuevas:
+                if not _calificacion_estructural(nuevas["calificacion"]):
+                    raise FueraDeEsquema("calificacion sin la estructura esperada", parser.buffer, 0)
+                if al_calificar is not None:
+                    al_calificar(nuevas["calificacion"])
+    except FueraDeEsquema as e:
+        # La solicitud cortada también consumió tokens: se adjuntan para el reporte
+        e.uso = {**uso_tokens(_uso_estimado(usage, messages, parser.buffer, modelo), modelo),
+                 "ttft_s": ttft, "latencia_s": time.perf_counter() - inicio}
+        raise
+    finally:
+        cerrar = getattr(stream, "close", None)
+        if cerrar is not None:
+            cerrar()
+
+    resultado = parser.resultado()
+    resultado.setdefault("calificacion", {"total": 0, "detalle": [0, 0, 0, 0]})
+    resultado.setdefault("comentarios", "Evaluación completada")
+    usage = _uso_estimado(usage, messages, parser.buffer, modelo)
+    resultado["_uso"] = {**uso_tokens(usage, modelo), "ttft_s": ttft, "latencia_s": time.perf_counter() - inicio}
+    return resultado
+
+def _uso_estimado(usage, messages: List[Dict[str, str]], recibido: str, modelo: str):
+    """Sin chunk de uso (corte anticipado) los tokens se estiman con el contador local."""
+    if usage is not None:
+        return usage
+    return types.SimpleNamespace(
+        prompt_tokens=sum(contar_tokens(m["content"], modelo) for m in messages),
+        completion_tokens=contar_tokens(recibido, modelo),
+    )
+
+def mensajes_entrega(nombre: str, enunciado: str, resolucion: str, con_confianza: bool = False,
+                     pruebas: Dict[str, Any] | None = None,
+                     rubrica: Dict[str, Any] | None = None) -> List[Dict[str, str]]:
+    """Mensajes que se envían al modelo para evaluar una entrega (con ``RUBRICA`` si no se indica otra)."""
     input_json = {
         "nombre": nombre,
         "enunciado": enunciado,
         "resolucion": resolucion
     }
+    if pruebas:
+        input_json["pruebas"] = pruebas
 
     user_prompt = (
         "Evalúa la siguiente entrega usando el enunciado, la rúbrica y la resolución. "
         "Devuelve solo el JSON requerido.\n\nDatos de la entrega:\n"
         f"{json.dumps(input_json, ensure_ascii=False, indent=2)}"
     )
+    if con_confianza:
+        user_prompt += INSTRUCCION_CONFIANZA
+    sistema = SYSTEM_PROMPT if rubrica is None else prompt_sistema(rubrica)
+    return [{"role": "system", "content": sistema}, {"role": "user", "content": user_prompt}]
+
+def mensajes_lote(enunciado: str, entregas: List[Dict[str, Any]],
+                  con_confianza: bool = False) -> List[Dict[str, str]]:
+    """Mensajes que se envían al modelo para evaluar varias entregas juntas."""
+    input_json = {"enunciado": enunciado, "entregas": entregas}
+    user_prompt = (
+        "Evalúa cada una de las siguientes entregas usando el enunciado, la rúbrica y su resolución. "
+        "Devuelve solo el JSON requerido.\n\nDatos de las entregas:\n"
+        f"{json.dumps(input_json, ensure_ascii=False, indent=2)}"
+    )
+    if con_confianza:
+        user_prompt += INSTRUCCION_CONFIANZA_LOTE
+    return [{"role": "system", "content": SYSTEM_PROMPT_LOTE}, {"role": "user", "content": user_prompt}]
+
+def _load_client() -> OpenAI:
+    """Devuelve el cliente OpenAI compartido del proceso (ver ``clientes.obtener_cliente``)."""
+    return obtener_cliente()
+
+def evaluar_con_chat(client: OpenAI, nombre: str, enunciado: str, resolucion: str,
+                     modelo: str = MODELO_PRINCIPAL, con_confianza: bool = False,
+                     pruebas: Dict[str, Any] | None = None, stream: bool = False,
+                     al_calificar: Callable[[Dict[str, Any]], None] | None = None,
+                     rubrica: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Envía una entrega al modelo de chat y devuelve el resultado.
+
+    Con ``stream`` la respuesta se procesa a medida que llega (ver
+    ``_completar_en_streaming``); si el streaming se corta por salirse del
+    esquema, la entrega se vuelve a pedir sin streaming. El consumo de tokens
+    se devuelve en la clave ``_uso``.
+    """
+    messages = mensajes_entrega(nombre, enunciado, resolucion, con_confianza, pruebas, rubrica)
+    if stream:
+        try:
+            return _completar_en_streaming(client, modelo, messages, al_calificar)
+        except FueraDeEsquema as e:
+            # La respuesta completa suele ser válida (p. ej. texto antes del bloque JSON)
+            resultado = evaluar_con_chat(client, nombre, enunciado, resolucion, modelo, con_confianza, pruebas,
+                                         rubrica=rubrica)
+            resultado["_uso"]["abortadas"] = [e.uso]
+            if al_calificar is not None:
+                al_calificar(resultado["calificacion"])
+            return resultado
 
     response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": user_prompt}],
+        model=modelo,
+        messages=messages,
         temperature=0,
     )
     final_msg = response.choices[0].message.content.strip()
 
-    clean_msg = final_msg
-    if "```json" in clean_msg:
-        clean_msg = clean_msg.split("```json")[1].split("```", 1)[0].strip()
-    elif "```" in clean_msg:
-        clean_msg = clean_msg.split("```", 1)[1].split("```", 1)[0].strip()
-
-    resultado = json.loads(clean_msg)
+    resultado = json.loads(limpiar_json(final_msg))
     resultado.setdefault("calificacion", {"total": 0, "detalle": [0, 0, 0, 0]})
     resultado.setdefault("comentarios", "Evaluación completada")
+    resultado["_uso"] = uso_tokens(getattr(response, "usage", None), modelo)
+    return resultado
+
+def evaluar_lote_con_chat(client: OpenAI, enunciado: str, entregas: List[Dict[str, Any]],
+                          modelo: str = MODELO_PRINCIPAL, con_confianza: bool = False) -> Dict[str, Any]:
+    """Evalúa varias entregas de la misma consigna en una sola solicitud.
+
+    ``entregas`` es una lista de diccionarios con ``nombre``, ``resolucion`` y
+    opcionalmente ``pruebas``. Devuelve ``{"resultados": {nombre: resultado}, "_uso": ...}``;
+    los resultados que no respetan el esquema se descartan.
+    """
+    response = client.chat.completions.create(
+        model=modelo,
+        messages=mensajes_lote(enunciado, entregas, con_confianza),
+        temperature=0,
+    )
+    uso = uso_tokens(getattr(response, "usage", None), modelo)
+    try:
+        datos = json.loads(limpiar_json(response.choices[0].message.content.strip()))
+    except json.JSONDecodeError:
+        return {"resultados": {}, "_uso": uso}
+
+    items = datos.get("resultados", []) if isinstance(datos, dict) else datos
+    esperados = {e["nombre"] for e in entregas}
+    resultados = {}
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and item.get("nombre") in esperados and not validar_resultado(item):
+            resultados.setdefault(item["nombre"], item)
+    return {"resultados": resultados, "_uso": uso}
+
+def validar_resultado(resultado: Dict[str, Any], maximos: List[int] | None = None) -> List[str]:
+    """Devuelve la lista de violaciones del esquema de calificación (vacía si es válido).
+
+    ``maximos`` son los de la rúbrica usada (``MAXIMOS_CRITERIOS`` por defecto).
+    """
+    maximos = MAXIMOS_CRITERIOS if maximos is None else maximos
+    errores = []
+    calificacion = resultado.get("calificacion")
+    if not isinstance(calificacion, dict):
+        return ["calificacion ausente"]
+    total = calificacion.get("total")
+    detalle = calificacion.get("detalle")
+    if not isinstance(total, int):
+        errores.append("total no entero")
+    if not isinstance(detalle, list) or len(detalle) != len(maximos) \
+            or not all(isinstance(d, int) for d in detalle):
+        errores.append("detalle inválido")
+    else:
+        if any(d < 0 or d > m for d, m in zip(detalle, maximos)):
+            errores.append("puntaje fuera de rango")
+        if isinstance(total, int) and total != sum(detalle):
+            errores.append("total distinto de la suma del detalle")
+    if not isinstance(resultado.get("comentarios"), str):
+        errores.append("comentarios ausentes")
+    return errores
+
+def _heuristica_local(resolucion: str) -> str | None:
+    """Clasifica la resolución sin IA: "vacia", "con_codigo" o None si no es concluyente."""
+    texto = resolucion.lower()
+    tiene_enlaces = "http://" in texto or "https://" in texto
+    if tiene_enlaces and any(s in texto for s in ("github", "gitlab", "colab", ".ipynb", ".py")):
+        return "con_codigo"
+    if any(s in resolucion for s in ("def ", "print(", "import ", "for ", "while ")):
+        return "con_codigo"
+    if not tiene_enlaces and len(resolucion.strip()) < 80:
+        return "vacia"
+    return None
+
+def motivos_escalado(resultado: Dict[str, Any], resolucion: str, config: Dict[str, Any],
+                     rubrica: Dict[str, Any] | None = None) -> List[str]:
+    """Decide si la evaluación del modelo rápido debe repetirse con el modelo principal."""
+    maximos = MAXIMOS_CRITERIOS if rubrica is None else maximos_rubrica(rubrica)
+    motivos = validar_resultado(resultado, maximos)
+    if motivos:
+        return motivos
+
+    confianza = resultado.get("confianza")
+    if not isinstance(confianza, (int, float)) or confianza < config["confianza_minima"]:
+        motivos.append("confianza baja")
+
+    total = resultado["calificacion"]["total"]
+    if abs(total - config["umbral_aprobacion"]) <= config["margen_borde"]:
+        motivos.append("total en el borde")
+
+    heuristica = _heuristica_local(resolucion)
+    if heuristica == "vacia" and total > sum(maximos) / 2:
+        motivos.append("nota alta para una entrega casi vacía")
+    elif heuristica == "con_codigo" and total == 0:
+        motivos.append("nota cero para una entrega con código")
+    return motivos
+
+def nuevo_reporte() -> Dict[str, Any]:
+    """Crea el diccionario de métricas de una corrida de evaluación."""
+    return {
+        "entregas": 0,
+        "llamadas": 0,
+        "llamadas_por_modelo": {},
+        "latencias_por_modelo_s": {},
+        "latencia_total_s": 0.0,
+        "ttft_s": [],
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "costo_usd": 0.0,
+        "costo_solo_principal_usd": 0.0,
+        "escaladas": 0,
+        "motivos_escalado": {},
+        "sin_entrega": 0,
+        "omitidas_por_reglas": 0,
+        "reglas_aplicadas": {},
+        "lotes": 0,
+        "entregas_en_lotes": 0,
+        "reintentos_individuales": 0,
+        "entregas_modelo_rapido": 0,
+        "criterios_evaluados": 0,
+        "criterios_desde_cache": 0,
+    }
+
+def resumir_reporte(reporte: Dict[str, Any]) -> Dict[str, Any]:
+    """Calcula la tasa de escalado y los ahorros estimados de costo y tiempo."""
+    latencias = reporte["latencias_por_modelo_s"]
+    rapidas = [t for m, ts in latencias.items() if m != MODELO_PRINCIPAL for t in ts]
+    principales = latencias.get(MODELO_PRINCIPAL, [])
+    # Con lotes una llamada al modelo rápido cubre varias entregas
+    evaluadas_rapido = reporte["entregas_modelo_rapido"] or len(rapidas)
+    resumen = {
+        "tasa_escalado": reporte["escaladas"] / evaluadas_rapido if evaluadas_rapido else 0.0,
+        "ahorro_usd": reporte["costo_solo_principal_usd"] - reporte["costo_usd"],
+    }
+    if reporte["ttft_s"]:
+        resumen["ttft_promedio_s"] = sum(reporte["ttft_s"]) / len(reporte["ttft_s"])
+    if rapidas and principales:
+        # Tiempo ahorrado por cada entrega resuelta solo con el modelo rápido
+        no_escaladas = evaluadas_rapido - reporte["escaladas"]
+        promedio_principal = sum(principales) / len(principales)
+        promedio_rapido = sum(rapidas) / evaluadas_rapido
+        resumen["ahorro_latencia_s"] = no_escaladas * (promedio_principal - promedio_rapido) \
+            - reporte["escaladas"] * promedio_rapido
+    return resumen
+
+def _registrar_escalado(reporte: Dict[str, Any], motivos: List[str], contrafactual: float) -> None:
+    # Sin cascada esta entrega habría costado solo la llamada al modelo principal
+    reporte["costo_solo_principal_usd"] -= contrafactual
+    reporte["escaladas"] += 1
+    for motivo in motivos:
+        reporte["motivos_escalado"][motivo] = reporte["motivos_escalado"].get(motivo, 0) + 1
+
+def _evaluar_cascada(client: OpenAI, nombre: str, enunciado: str, resolucion: str,
+                     config: Dict[str, Any], reporte: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    """Evalúa con el modelo rápido y escala al principal solo si salta algún disparador."""
+    reporte["entregas_modelo_rapido"] += 1
+    inicio = time.perf_counter()
+    try:
+        resultado = evaluar_con_chat(client, nombre, enunciado, resolucion,
+                                     modelo=config["modelo_rapido"], con_confianza=True, **extra)
+        contrafactual = registrar_llamada(reporte, resultado, config["modelo_rapido"], time.perf_counter() - inicio)
+        motivos = motivos_escalado(resultado, resolucion, config, extra.get("rubrica"))
+    except (json.JSONDecodeError, IndexError, AttributeError):
+        contrafactual = registrar_llamada(reporte, {}, config["modelo_rapido"], time.perf_counter() - inicio)
+        motivos = ["respuesta no es JSON"]
+
+    if not motivos:
+        resultado.pop("confianza", None)
+        return resultado
+
+    _registrar_escalado(reporte, motivos, contrafactual)
+    inicio = time.perf_counter()
+    resultado = evaluar_con_chat(client, nombre, enunciado, resolucion, modelo=config["modelo_principal"], **extra)
+    registrar_llamada(reporte, resultado, config["modelo_principal"], time.perf_counter() - inicio)
     return resultado
 
-def evaluar_entregas(evaluaciones: List[Dict[str, Any]], client: OpenAI | None = None) -> List[Dict[str, Any]]:
-    """Evalúa una lista de entregas utilizando OpenAI."""
+def aplicar_pruebas(calificacion: Dict[str, Any], pruebas: Dict[str, Any] | None,
+                    rubrica: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Fija el criterio de Funcionalidad según la proporción de casos de prueba aprobados.
+
+    Solo se aplica si todos los casos se ejecutaron (ver
+    ``ejecucion.pruebas_concluyentes``); si no (p. ej. enlaces de Colab privados
+    o un programa que falla al leer la entrada) se conserva el puntaje asignado
+    por el modelo, que recibió las pruebas como evidencia.
+    """
+    rubrica = RUBRICA if rubrica is None else rubrica
+    if not pruebas_concluyentes(pruebas):
+        return calificacion
+    detalle = list(calificacion.get("detalle", []))
+    if len(detalle) != len(rubrica["criterios"]):
+        return calificacion
+    ajustar_por_pruebas(rubrica, detalle, pruebas)
+    return {"total": sum(detalle), "detalle": detalle}
+
+def _datos_lote(entrega: Dict[str, Any]) -> Dict[str, Any]:
+    datos = {"nombre": entrega.get("nombre", ""), "resolucion": entrega.get("resolucion", "")}
+    if entrega.get("pruebas"):
+        datos["pruebas"] = entrega["pruebas"]
+    return datos
+
+def armar_lotes(entregas: List[Dict[str, Any]], config: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+    """Agrupa entregas cortas de la misma consigna respetando el presupuesto de tokens.
+
+    Las entregas largas (o de una consigna con un solo candidato) quedan en
+    lotes de un elemento y se evalúan de forma individual.
+    """
+    base = contar_tokens(SYSTEM_PROMPT_LOTE)
+    por_consigna: Dict[tuple, List[Dict[str, Any]]] = {}
+    lotes: List[List[Dict[str, Any]]] = []
+    for entrega in entregas:
+        if contar_tokens(entrega.get("resolucion", "")) > config["max_tokens_entrega"]:
+            lotes.append([entrega])
+            continue
+        clave = (entrega.get("tarea", ""), entrega.get("enunciado", ""))
+        por_consigna.setdefault(clave, []).append(entrega)
+
+    for (_, enunciado), grupo in por_consigna.items():
+        actual: List[Dict[str, Any]] = []
+        usados = base + contar_tokens(enunciado)
+        for entrega in grupo:
+            costo = contar_tokens(json.dumps(_datos_lote(entrega), ensure_ascii=False, indent=2))
+            if actual and (usados + costo > config["presupuesto_tokens"] or len(actual) >= config["max_por_lote"]):
+                lotes.append(actual)
+                actual, usados = [], base + contar_tokens(enunciado)
+            actual.append(entrega)
+            usados += costo
+        if actual:
+            lotes.append(actual)
+    return lotes
+
+def _evaluar_empaquetadas(client: OpenAI, entregas: List[Dict[str, Any]], config: Dict[str, Any],
+                          reporte: Dict[str, Any], cascada: Dict[str, Any] | None = None,
+                          ) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Evalúa los lotes de varias entregas.
+
+    Con ``cascada`` los lotes se envían al modelo rápido y cada resultado dudoso
+    se escala. Devuelve las entregas a evaluar individualmente (faltantes o
+    inválidas) y las escaladas, que van directo al modelo principal.
+    """
+    modelo = cascada["modelo_rapido"] if cascada else MODELO_PRINCIPAL
+    individuales, escaladas = [], []
+    for lote in armar_lotes(entregas, config):
+        if len(lote) == 1:
+            individuales.extend(lote)
+            continue
+        inicio = time.perf_counter()
+        respuesta = evaluar_lote_con_chat(client, lote[0].get("enunciado", ""), [_datos_lote(e) for e in lote],
+                                          modelo=modelo, con_confianza=cascada is not None)
+        contrafactual = registrar_llamada(reporte, respuesta, modelo, time.perf_counter() - inicio)
+        reporte["lotes"] += 1
+        for entrega in lote:
+            resultado = respuesta["resultados"].get(entrega.get("nombre", ""))
+            if resultado is None:
+                # Faltante o inválido: se reintenta como solicitud individual
+                reporte["reintentos_individuales"] += 1
+                individuales.append(entrega)
+                continue
+            if cascada is not None:
+                reporte["entregas_modelo_rapido"] += 1
+                motivos = motivos_escalado(resultado, entrega.get("resolucion", ""), cascada)
+                if motivos:
+                    _registrar_escalado(reporte, motivos, contrafactual / len(lote))
+                    escaladas.append(entrega)
+                    continue
+            reporte["entregas"] += 1
+            reporte["entregas_en_lotes"] += 1
+            entrega["calificacion"] = aplicar_pruebas(resultado["calificacion"], entrega.get("pruebas"))
+            entrega["comentarios"] = resultado.get("comentarios", "")
+    return individuales, escaladas
+
+def evaluar_entregas(evaluaciones: List[Dict[str, Any]], client: OpenAI | None = None,
+                     cascada: bool | Dict[str, Any] = False,
+                     reporte: Dict[str, Any] | None = None,
+                     ejecutar_codigo: bool = False,
+                     reglas: bool | Dict[str, Any] = False,
+                     empaquetar: bool | Dict[str, Any] = False,
+                     stream: bool = False,
+                     al_calificar: Callable[[str, Dict[str, Any]], None] | None = None,
+                     por_criterio: bool | Dict[str, Any] = False) -> List[Dict[str, Any]]:
+    """Evalúa una lista de entregas utilizando OpenAI.
+
+    Con ``cascada`` (True o un diccionario que sobrescribe ``CASCADA_POR_DEFECTO``)
+    cada entrega se evalúa primero con un modelo económico y solo se reenvía al
+    modelo principal cuando el resultado es dudoso. Con ``ejecutar_codigo`` el
+    código de cada entrega se corre antes en un subproceso con límites (sin
+    aislamiento de archivos ni red) contra los casos de ``config/casos_*.json``;
+    el resultado se envía al modelo y, si todos los casos se ejecutaron, fija
+    el puntaje de Funcionalidad. Con ``reglas`` (True para usar
+    ``config/reglas.json`` o un diccionario de configuración) las entregas
+    triviales se resuelven localmente sin llamar a la API. Con ``empaquetar``
+    (True o un diccionario que sobrescribe ``EMPAQUETADO_POR_DEFECTO``) las
+    entregas cortas de una misma consigna se evalúan de a varias por
+    solicitud (con ``cascada``, al modelo rápido). Con ``stream`` las
+    respuestas individuales se reciben en streaming y
+    ``al_calificar(nombre, calificacion)`` se llama apenas el modelo emite la
+    calificación (en los lotes, al recibir la respuesta completa; por criterio, al completarse todos). Con ``por_criterio`` (True o un diccionario
+    que sobrescribe ``criterios.POR_CRITERIO_POR_DEFECTO``) cada criterio de
+    ``config/rubricas.json`` se evalúa con su propia solicitud, en paralelo y
+    con caché, de modo que al editar un criterio solo se recalcula ese; las
+    entregas que fallan se evalúan con el prompt completo. Si se pasa
+    ``reporte`` (ver ``nuevo_reporte``) se acumulan en él las métricas de la
+    corrida, incluidas las llamadas ahorradas.
+    """
     if client is None:
         client = _load_client()
+    if reporte is None:
+        reporte = nuevo_reporte()
+    config = None
+    if cascada:
+        config = {**CASCADA_POR_DEFECTO, **(cascada if isinstance(cascada, dict) else {})}
+    decisiones = [None] * len(evaluaciones)
+    if reglas:
+        decisiones = clasificar(evaluaciones, reglas if isinstance(reglas, dict) else None)
+    if ejecutar_codigo:
+        adjuntar_pruebas([e for e, d in zip(evaluaciones, decisiones) if not d or d["accion"] != "calificar"])
 
-    for entrega in evaluaciones:
+    pendientes = []
+    for entrega, decision in zip(evaluaciones, decisiones):
         if entrega.get("resolucion", "").strip().lower() == "no realiza":
             entrega.setdefault("calificacion", {"total": 0, "detalle": [0, 0, 0, 0]})
             entrega.setdefault("comentarios", "")
+            reporte["sin_entrega"] += 1
             continue
+        if decision is not None:
+            aplicadas = reporte["reglas_aplicadas"]
+            aplicadas[decision["regla"]] = aplicadas.get(decision["regla"], 0) + 1
+            if decision["accion"] == "calificar":
+                # Resuelta localmente: no se llama a la API
+                entrega["calificacion"] = decision["calificacion"]
+                entrega["comentarios"] = decision["comentarios"]
+                entrega["regla"] = decision["regla"]
+                reporte["omitidas_por_reglas"] += 1
+                continue
+            entrega.setdefault("marcas", []).append(decision["regla"])
+        pendientes.append(entrega)
+
+    escaladas: List[Dict[str, Any]] = []
+    if empaquetar:
+        config_lote = {**EMPAQUETADO_POR_DEFECTO, **(empaquetar if isinstance(empaquetar, dict) else {})}
+        individuales, escaladas = _evaluar_empaquetadas(client, pendientes, config_lote, reporte, config)
+        if stream and al_calificar is not None:
+            sin_resolver = {id(e) for e in individuales + escaladas}
+            for entrega in pendientes:
+                if id(entrega) not in sin_resolver:
+                    al_calificar(entrega.get("nombre", ""), entrega["calificacion"])
+        pendientes = individuales
+
+    rubrica = None
+    if por_criterio and pendientes:
+        config_criterios = {**POR_CRITERIO_POR_DEFECTO, **(por_criterio if isinstance(por_criterio, dict) else {})}
+        resueltas = pendientes
+        pendientes = evaluar_por_criterios(client, pendientes, config_criterios, reporte)
+        if stream and al_calificar is not None:
+            # Como en los lotes: la nota se anuncia al completarse todos sus criterios
+            fallidas = {id(e) for e in pendientes}
+            for entrega in resueltas:
+                if id(entrega) not in fallidas:
+                    al_calificar(entrega.get("nombre", ""), entrega["calificacion"])
+        if config_criterios["rubrica"] is not None:
+            # Las que vuelven al prompt completo se evalúan con la misma rúbrica
+            rubrica = cargar_rubrica(config_criterios["rubrica"])
+
+    directas = {id(e) for e in escaladas}
+    for entrega in pendientes + escaladas:
         # Extrae nombre, enunciado y resolucion de cada entrega
         nombre = entrega.get("nombre", "")
         enunciado = entrega.get("enunciado", "")
         resolucion = entrega.get("resolucion", "")
-        resultado = evaluar_con_chat(client, nombre, enunciado, resolucion)
-        entrega["calificacion"] = resultado.get("calificacion", {"total": 0, "detalle": [0, 0, 0, 0]})
+        extra: Dict[str, Any] = {"pruebas": entrega["pruebas"]} if entrega.get("pruebas") else {}
+        if rubrica is not None:
+            extra["rubrica"] = rubrica
+        # La nota emitida en streaming solo se anuncia si es la definitiva: con cascada puede
+        # escalarse y con pruebas concluyentes cambia la Funcionalidad; ahí se avisa al final
+        avisar_al_final = stream and al_calificar is not None and (
+            (config is not None and id(entrega) not in directas) or pruebas_concluyentes(entrega.get("pruebas")))
+        if stream:
+            extra["stream"] = True
+            if al_calificar is not None and not avisar_al_final:
+                extra["al_calificar"] = lambda calificacion, nombre=nombre: al_calificar(nombre, calificacion)
+        reporte["entregas"] += 1
+        if id(entrega) in directas:
+            # Escalada desde un lote del modelo rápido: no se repite la evaluación rápida
+            inicio = time.perf_counter()
+            resultado = evaluar_con_chat(client, nombre, enunciado, resolucion,
+                                         modelo=config["modelo_principal"], **extra)
+            registrar_llamada(reporte, resultado, config["modelo_principal"], time.perf_counter() - inicio)
+        elif config is not None:
+            resultado = _evaluar_cascada(client, nombre, enunciado, resolucion, config, reporte, **extra)
+        else:
+            inicio = time.perf_counter()
+            resultado = evaluar_con_chat(client, nombre, enunciado, resolucion, **extra)
+            registrar_llamada(reporte, resultado, MODELO_PRINCIPAL, time.perf_counter() - inicio)
+        calificacion = resultado.get("calificacion", {"total": 0, "detalle": [0, 0, 0, 0]})
+        entrega["calificacion"] = aplicar_pruebas(calificacion, entrega.get("pruebas"), rubrica)
         entrega["comentarios"] = resultado.get("comentarios", "")
+        if avisar_al_final:
+            al_calificar(nombre, entrega["calificacion"])
     return evaluaciones
 
-def evaluate_file(archivo_entrada: str | Path, archivo_salida: str | Path) -> None:
-    """Procesa un archivo de entregas y guarda las evaluaciones."""
+def evaluate_file(archivo_entrada: str | Path, archivo_salida: str | Path, bloque: int | None = None,
+                  **opciones: Any) -> Dict[str, Any]:
+    """Procesa un archivo de entregas, guarda las evaluaciones y devuelve el reporte.
+
+    Entrada y salida pueden ser arreglos JSON o JSONL (``.jsonl``). Las
+    entregas se leen, evalúan y escriben en streaming de a ``bloque`` (1 por
+    defecto, ``BLOQUE_PARALELO`` con reglas, ejecución, empaquetado o evaluación
+    por criterio), por lo
+    que la memoria no depende del tamaño del archivo. ``opciones`` se pasan a
+    ``evaluar_entregas`` (``cascada``, ``reglas``, ...).
+    """
     entrada = Path(archivo_entrada)
     salida = Path(archivo_salida)
     if not entrada.exists():
         raise FileNotFoundError(f"No se encontró el archivo de entrada: {entrada}")
+    if bloque is None:
+        agrupan = opciones.get("reglas") or opciones.get("ejecutar_codigo") or opciones.get("empaquetar") \
+            or opciones.get("por_criterio")
+        bloque = BLOQUE_PARALELO if agrupan else 1
 
-    with entrada.open("r", encoding="utf-8") as f:
-        evaluaciones = json.load(f)
+    client = opciones.pop("client", None) or _load_client()
+    reporte = nuevo_reporte()
+    # La salida se reemplaza solo si se evaluaron todas las entregas (ver EscritorEntregas)
+    with EscritorEntregas(salida) as escritor:
+        for evaluaciones in en_bloques(leer_entregas(entrada), bloque):
+            evaluar_entregas(evaluaciones, client=client, reporte=reporte, **opciones)
+            for entrega in evaluaciones:
+                escritor.escribir(entrega)
+    return reporte
 
-    evaluar_entregas(evaluaciones)
+if __name__ == "__main__":
+    import argparse
 
-    salida.parent.mkdir(parents=True, exist_ok=True)
-    with salida.open("w", encoding="utf-8") as f:
-        json.dump(evaluaciones, f, ensure_ascii=False, indent=2)
+    parser = argparse.ArgumentParser(description="Evalúa un archivo de entregas con OpenAI.")
+    parser.add_argument("archivo_entrada", help="Arreglo JSON o JSONL (.jsonl) de entregas")
+    parser.add_argument("archivo_salida", nargs="?", help="Con extensión .jsonl se escribe una evaluación por línea")
+    parser.add_argument("--bloque", type=int,
+                        help=f"Entregas evaluadas juntas (1 por defecto, {BLOQUE_PARALELO} con reglas, "
+                             "ejecución, empaquetado o --por-criterio)")
+    parser.add_argument("--cascada", action="store_true",
+                        help=f"Evaluar primero con {MODELO_RAPIDO} y escalar a {MODELO_PRINCIPAL} si hay dudas")
+    parser.add_argument("--ejecutar", action="store_true",
+                        help="Ejecutar el código de cada entrega contra los casos de config/casos_*.json")
+    parser.add_argument("--reglas", action="store_true",
+                        help="Resolver localmente las entregas triviales según config/reglas.json")
+    parser.add_argument("--empaquetar", action="store_true",
+                        help="Evaluar varias entregas cortas de la misma consigna por solicitud")
+    parser.add_argument("--stream", action="store_true",
+                        help="Recibir las respuestas en streaming y mostrar cada nota apenas se emite")
+    parser.add_argument("--por-criterio", action="store_true",
+                        help="Evaluar cada criterio de config/rubricas.json por separado, con caché por criterio")
+    parser.add_argument("--calentar", action="store_true",
+                        help="Abrir la conexión con la API antes de empezar a evaluar")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Estimar solicitudes, tokens, costo y tiempo sin llamar a la API")
+    args = parser.parse_args()
 
-if __name__ == "__main__":
-    import sys
+    if args.dry_run:
+        from planificador import formatear_plan, planificar_archivos
 
-    if len(sys.argv) != 3:
-        msg = "Uso: python evaluar_chat.py archivo_entrada.json archivo_salida.json"
-        raise SystemExit(msg)
+        print(formatear_plan(planificar_archivos(
+            [args.archivo_entrada], cascada=args.cascada, reglas=args.reglas, empaquetar=args.empaquetar,
+            por_criterio=args.por_criterio,
+        )))
+        raise SystemExit(0)
+    if args.archivo_salida is None:
+        parser.error("falta archivo_salida")
 
-    evaluate_file(sys.argv[1], sys.argv[2])
+    if args.calentar:
+        obtener_cliente(calentar_conexion=True)
+    reporte = evaluate_file(
+        args.archivo_entrada, args.archivo_salida, bloque=args.bloque, cascada=args.cascada,
+        ejecutar_codigo=args.ejecutar, reglas=args.reglas, empaquetar=args.empaquetar, stream=args.stream,
+        por_criterio=args.por_criterio,
+        al_calificar=(lambda nombre, c: print(f"{nombre}: {c['total']}")) if args.stream else None,
+    )
+    resumen = resumir_reporte(reporte)
+    print(f"Entregas evaluadas: {reporte['entregas']} | llamadas: {reporte['llamadas_por_modelo']}")
+    print(f"Costo: {reporte['costo_usd']:.4f} USD | latencia acumulada: {reporte['latencia_total_s']:.1f} s")
+    if args.stream and "ttft_promedio_s" in resumen:
+        print(f"Tiempo promedio al primer token: {resumen['ttft_promedio_s']:.2f} s")
+    if args.empaquetar:
+        print(f"Lotes: {reporte['lotes']} con {reporte['entregas_en_lotes']} entregas | "
+              f"reintentos individuales: {reporte['reintentos_individuales']}")
+    if args.por_criterio:
+        print(f"Criterios evaluados: {reporte['criterios_evaluados']} | "
+              f"reutilizados de la caché: {reporte['criterios_desde_cache']}")
+    if args.reglas:
+        print(f"Llamadas ahorradas por reglas: {reporte['omitidas_por_reglas']} | "
+              f"reglas aplicadas: {reporte['reglas_aplicadas']}")
+    if args.cascada:
+        print(f"Escaladas: {reporte['escaladas']} ({resumen['tasa_escalado']:.0%}) | "
+              f"ahorro estimado: {resumen['ahorro_usd']:.4f} USD, "
+              f"{resumen.get('ahorro_latencia_s', 0.0):.1f} s | motivos: {reporte['motivos_escalado']}")
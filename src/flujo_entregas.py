@@ -0,0 +1,122 @@
+import json
+import os
+import textwrap
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+try:
+    import ijson
+except ImportError:  # sin ijson los arreglos JSON se cargan completos en memoria
+    ijson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializan los hilos del mismo proceso
+    fcntl = None
+
+EXTENSIONES_JSONL = (".jsonl", ".ndjson")
+
+_bloqueos: Dict[Path, threading.Lock] = {}
+_bloqueos_lock = threading.Lock()
+
+
+def es_jsonl(ruta: str | Path) -> bool:
+    return Path(ruta).suffix.lower() in EXTENSIONES_JSONL
+
+
+def leer_entregas(ruta: str | Path) -> Iterator[Dict[str, Any]]:
+    """Recorre las entregas de un archivo JSONL (una por línea) o de un arreglo JSON.
+
+    Los arreglos JSON se leen en streaming con ``ijson`` si está instalado.
+    """
+    ruta = Path(ruta)
+    if es_jsonl(ruta):
+        with ruta.open("r", encoding="utf-8") as f:
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+    elif ijson is not None:
+        with ruta.open("rb") as f:
+            yield from ijson.items(f, "item", use_float=True)
+    else:
+        with ruta.open("r", encoding="utf-8") as f:
+            yield from json.load(f)
+
+
+@contextmanager
+def bloquear_archivo(ruta: str | Path) -> Iterator[None]:
+    """Serializa las lecturas-modificaciones-escrituras de un archivo.
+
+    Bloquea entre hilos del proceso y, donde existe ``fcntl``, también entre
+    procesos mediante un ``.<nombre>.lock`` junto al archivo.
+    """
+    ruta = Path(ruta).resolve()
+    with _bloqueos_lock:
+        bloqueo = _bloqueos.setdefault(ruta, threading.Lock())
+    with bloqueo:
+        if fcntl is None:
+            yield
+            return
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        with ruta.with_name(f".{ruta.name}.lock").open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def en_bloques(entregas: Iterable[Dict[str, Any]], tamano: int) -> Iterator[List[Dict[str, Any]]]:
+    """Agrupa un iterable de entregas en listas de hasta ``tamano`` elementos."""
+    iterador = iter(entregas)
+    while bloque := list(islice(iterador, tamano)):
+        yield bloque
+
+
+class EscritorEntregas:
+    """Escribe entregas de a una en JSONL o como arreglo JSON, a medida que se evalúan.
+
+    Se escribe en ``.<nombre>.tmp<ext>`` junto al destino y solo al terminar sin
+    error se reemplaza ``ruta``: una corrida interrumpida deja intacta la salida
+    anterior (y la entrada, si son el mismo archivo). Cada entrega se vuelca al
+    disco apenas se escribe, por lo que el temporal puede seguirse en vivo
+    (``tail -f`` en JSONL). El arreglo JSON queda con el mismo formato que
+    ``json.dump(..., indent=2)``.
+    """
+
+    def __init__(self, ruta: str | Path):
+        self.ruta = Path(ruta)
+        self.temporal = self.ruta.with_name(f".{self.ruta.stem}.tmp{self.ruta.suffix}")
+        self.jsonl = es_jsonl(self.ruta)
+        self.escritas = 0
+        self._archivo = None
+
+    def __enter__(self) -> "EscritorEntregas":
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._archivo = self.temporal.open("w", encoding="utf-8")
+        if not self.jsonl:
+            self._archivo.write("[")
+        return self
+
+    def escribir(self, entrega: Dict[str, Any]) -> None:
+        if self.jsonl:
+            self._archivo.write(json.dumps(entrega, ensure_ascii=False) + "\n")
+        else:
+            separador = ",\n" if self.escritas else "\n"
+            self._archivo.write(separador + textwrap.indent(json.dumps(entrega, ensure_ascii=False, indent=2), "  "))
+        self._archivo.flush()
+        self.escritas += 1
+
+    def __exit__(self, tipo: Any, *exc: Any) -> None:
+        if tipo is not None:
+            # Con error el resultado parcial se descarta en lugar de cerrarse como si estuviera completo
+            self._archivo.close()
+            self.temporal.unlink(missing_ok=True)
+            return
+        if not self.jsonl:
+            self._archivo.write("\n]" if self.escritas else "]")
+        self._archivo.close()
+        os.replace(self.temporal, self.ruta)
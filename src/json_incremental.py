@@ -0,0 +1,107 @@
+import json
+import re
+from typing import Any, Dict, Iterable
+
+# Caracteres de texto libre tolerados antes del JSON ("Claro, aquí está la evaluación: ...")
+MAX_PROSA = 400
+
+RE_BLOQUE = re.compile(r"```[^\n`]*\n")
+
+
+class FueraDeEsquema(json.JSONDecodeError):
+    """La salida del modelo dejó de ser el objeto JSON esperado."""
+
+
+class ParserJSONIncremental:
+    """Parser de un objeto JSON que llega en fragmentos (respuestas en streaming).
+
+    Devuelve cada clave de primer nivel de ``claves`` apenas su valor queda
+    completo, sin esperar al resto del objeto. Saltea el texto libre y el
+    bloque ```json``` que el modelo a veces escribe antes del ``{``; si pasan
+    ``max_prosa`` caracteres sin que empiece el JSON lanza ``FueraDeEsquema``.
+    """
+
+    def __init__(self, claves: Iterable[str] = (), max_prosa: int = MAX_PROSA):
+        self.claves = set(claves)
+        self.max_prosa = max_prosa
+        self.buffer = ""
+        self.completo = False
+        self._inicio = None  # posición del "{" de primer nivel
+        self._pos = 0
+        self._profundidad = 0
+        self._en_cadena = False
+        self._escape = False
+        self._inicio_cadena = 0
+        self._ultima_cadena = None
+        self._clave = None
+        self._inicio_valor = None
+        self._emitidas: Dict[str, Any] = {}
+
+    def _buscar_inicio(self) -> bool:
+        llave = self.buffer.find("{")
+        bloque = RE_BLOQUE.search(self.buffer)
+        if bloque is not None and (llave < 0 or bloque.start() < llave):
+            # Dentro de un bloque de código el JSON empieza en la primera llave
+            llave = self.buffer.find("{", bloque.end())
+        if llave < 0:
+            if len(self.buffer) > self.max_prosa:
+                raise FueraDeEsquema("Texto antes del JSON", self.buffer, 0)
+            return False
+        self._inicio = llave
+        self._pos = self._inicio
+        return True
+
+    def alimentar(self, fragmento: str) -> Dict[str, Any]:
+        """Agrega un fragmento y devuelve las claves vigiladas que se completaron con él."""
+        self.buffer += fragmento
+        nuevas: Dict[str, Any] = {}
+        if self.completo or (self._inicio is None and not self._buscar_inicio()):
+            return nuevas
+
+        while self._pos < len(self.buffer) and not self.completo:
+            c = self.buffer[self._pos]
+            if self._en_cadena:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._en_cadena = False
+                    if self._profundidad == 1 and self._clave is None:
+                        self._ultima_cadena = json.loads(self.buffer[self._inicio_cadena:self._pos + 1])
+            elif c == '"':
+                self._en_cadena = True
+                self._inicio_cadena = self._pos
+            elif c in "{[":
+                self._profundidad += 1
+            elif c in "}]":
+                if self._profundidad == 1:
+                    self._cerrar_valor(self._pos, nuevas)
+                    self.completo = True
+                self._profundidad -= 1
+            elif c == ":" and self._profundidad == 1:
+                self._clave = self._ultima_cadena
+                self._inicio_valor = self._pos + 1
+            elif c == "," and self._profundidad == 1:
+                self._cerrar_valor(self._pos, nuevas)
+            self._pos += 1
+        return nuevas
+
+    def _cerrar_valor(self, fin: int, nuevas: Dict[str, Any]) -> None:
+        if self._clave is not None and self._clave in self.claves and self._clave not in self._emitidas:
+            valor = json.loads(self.buffer[self._inicio_valor:fin])
+            self._emitidas[self._clave] = valor
+            nuevas[self._clave] = valor
+        self._clave = None
+        self._inicio_valor = None
+
+    @property
+    def sobrante(self) -> str:
+        """Texto recibido después de cerrar el objeto de primer nivel."""
+        return self.buffer[self._pos:] if self.completo else ""
+
+    def resultado(self) -> Dict[str, Any]:
+        """Devuelve el objeto completo (lanza ``json.JSONDecodeError`` si no terminó)."""
+        if self._inicio is None:
+            raise FueraDeEsquema("No se recibió ningún objeto JSON", self.buffer, 0)
+        return json.loads(self.buffer[self._inicio:self._pos])
@@ -0,0 +1,67 @@
+from typing import Any, Dict
+
+MODELO_PRINCIPAL = "gpt-4o"
+MODELO_RAPIDO = "gpt-4o-mini"
+
+# Precio en USD por millón de tokens (entrada, salida)
+PRECIOS_MODELOS = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+
+def limpiar_json(final_msg: str) -> str:
+    """Quita los bloques de markdown que el modelo a veces agrega alrededor del JSON."""
+    clean_msg = final_msg
+    if "```json" in clean_msg:
+        clean_msg = clean_msg.split("```json")[1].split("```", 1)[0].strip()
+    elif "```" in clean_msg:
+        clean_msg = clean_msg.split("```", 1)[1].split("```", 1)[0].strip()
+    return clean_msg
+
+
+def uso_tokens(usage, modelo: str) -> Dict[str, Any]:
+    """Tokens consumidos por una respuesta, en el formato de la clave ``_uso``."""
+    return {
+        "modelo": modelo,
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
+
+def costo(modelo: str, prompt_tokens: int, completion_tokens: int) -> float:
+    precio_entrada, precio_salida = PRECIOS_MODELOS.get(modelo, PRECIOS_MODELOS[MODELO_PRINCIPAL])
+    return (prompt_tokens * precio_entrada + completion_tokens * precio_salida) / 1_000_000
+
+
+def registrar_llamada(reporte: Dict[str, Any], resultado: Dict[str, Any], modelo: str, segundos: float) -> float:
+    """Acumula en el reporte las llamadas, latencia, tokens y costo de una evaluación.
+
+    Las solicitudes en streaming cortadas antes de reintentar (``_uso["abortadas"]``)
+    se registran como llamadas aparte. Devuelve lo que habría costado todo con
+    el modelo principal.
+    """
+    datos = resultado.pop("_uso", None) or {}
+    contrafactual = 0.0
+    for abortada in datos.get("abortadas", []):
+        contrafactual += _acumular(reporte, abortada, modelo, abortada["latencia_s"])
+        segundos -= abortada["latencia_s"]
+    return contrafactual + _acumular(reporte, datos, modelo, max(segundos, 0.0))
+
+
+def _acumular(reporte: Dict[str, Any], datos: Dict[str, Any], modelo: str, segundos: float) -> float:
+    prompt_tokens = datos.get("prompt_tokens", 0)
+    completion_tokens = datos.get("completion_tokens", 0)
+    por_modelo = reporte["llamadas_por_modelo"]
+    por_modelo[modelo] = por_modelo.get(modelo, 0) + 1
+    reporte["llamadas"] += 1
+    reporte["latencia_total_s"] += segundos
+    reporte["latencias_por_modelo_s"].setdefault(modelo, []).append(segundos)
+    if datos.get("ttft_s") is not None:
+        reporte["ttft_s"].append(datos["ttft_s"])
+    reporte["prompt_tokens"] += prompt_tokens
+    reporte["completion_tokens"] += completion_tokens
+    reporte["costo_usd"] += costo(modelo, prompt_tokens, completion_tokens)
+    contrafactual = costo(MODELO_PRINCIPAL, prompt_tokens, completion_tokens)
+    reporte["costo_solo_principal_usd"] += contrafactual
+    return contrafactual
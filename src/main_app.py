@@ -2,10 +2,13 @@ import streamlit as st
 import json
 import os
 from pathlib import Path
-from bs4 import BeautifulSoup
 import pandas as pd
 from datetime import datetime
 
+from rutas import DATA_INPUT, DATA_OUTPUT, CONFIG_DIR, archivo_consignas
+from scraper import asignar_entregas, extraer_por_autor, construir_evaluaciones
+from coincidencias import cargar_alias, confirmar_alias, sugerir_coincidencias
+
 # Configuración de la página
 st.set_page_config(
     page_title="Sistema de Evaluación Automática",
@@ -13,12 +16,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# Rutas principales
-BASE_DIR = Path(__file__).parent.parent
-DATA_INPUT = BASE_DIR / "data" / "input"
-DATA_OUTPUT = BASE_DIR / "data" / "output"
-CONFIG_DIR = BASE_DIR / "config"
-
 # Crear directorios si no existen
 DATA_INPUT.mkdir(parents=True, exist_ok=True)
 DATA_OUTPUT.mkdir(parents=True, exist_ok=True)
@@ -46,51 +43,17 @@ def save_json(data, filepath):
         st.error(f"Error guardando {filepath}: {e}")
         return False
 
-def scrap_schoology(html_content, nombres_crea):
-    """Extrae entregas del HTML de Schoology"""
-    entregas = {}
-    
+def emparejar_schoology(html_content, nombres_crea, alias=None):
+    """Extrae entregas del HTML de Schoology y devuelve también los autores sin coincidencia"""
     try:
-        soup = BeautifulSoup(html_content, "html.parser")
-        cards = soup.find_all("div", class_="discussion-card")
-        
-        for card in cards:
-            nombre_tag = card.find("span", class_="comment-author")
-            if not nombre_tag:
-                continue
-                
-            nombre = nombre_tag.get_text(strip=True)
-            
-            # Buscar coincidencia con los nombres CREA
-            for nombre_crea in nombres_crea:
-                if nombre_crea.upper() == nombre.upper():
-                    # Extraer contenido
-                    cuerpo = card.find("div", class_="comment-body-wrapper")
-                    if cuerpo:
-                        textos = [p.get_text(" ", strip=True) for p in cuerpo.find_all("p")]
-                        links = [a["href"] for a in cuerpo.find_all("a", href=True)
-                                if not a["href"].startswith(("/user/", "/comment/", "/discussion/", "/likes/", "/course/"))]
-                        texto_entrega = " ".join(textos)
-                    else:
-                        texto_entrega = ""
-                        links = []
-                    
-                    # Adjuntos
-                    adjuntos = card.find_all("div", class_="attachments-link-summary")
-                    links_adjuntos = [adj.get_text(" ", strip=True) for adj in adjuntos]
-                    
-                    # Unir todo
-                    all_links = list(dict.fromkeys(links + links_adjuntos))
-                    if all_links:
-                        texto_entrega += ("\nAdjuntos:\n" if texto_entrega else "Adjuntos:\n") + "\n".join(all_links)
-                    
-                    entregas[nombre_crea] = texto_entrega.strip()
-                    break
-                    
+        return asignar_entregas(extraer_por_autor(html_content), nombres_crea, alias)
     except Exception as e:
         st.error(f"Error procesando HTML: {e}")
-        
-    return entregas
+        return {}, []
+
+def scrap_schoology(html_content, nombres_crea, alias=None):
+    """Extrae entregas del HTML de Schoology"""
+    return emparejar_schoology(html_content, nombres_crea, alias)[0]
 
 def main():
     st.title("📝 Sistema de Evaluación Automática")
@@ -202,12 +165,7 @@ def main():
     curso_slug = curso_seleccionado.get("slug", "")
     
     # Mapeo de slugs a archivos de consignas
-    if "programacion1" in curso_slug.lower():
-        consignas_file = CONFIG_DIR / "consignas_p1.json"
-    elif "programacion2" in curso_slug.lower():
-        consignas_file = CONFIG_DIR / "consignas_p2.json"
-    else:
-        consignas_file = CONFIG_DIR / "consignas_p1.json"  # Default
+    consignas_file = archivo_consignas(curso_slug)
     
     consignas_data = load_json(consignas_file)
     if not consignas_data:
@@ -235,31 +193,25 @@ def main():
     # PASO 5: Procesar entregas
     st.header("5️⃣ Procesar Entregas")
     
-    if st.button("🚀 Procesar Entregas", type="primary"):
+    # Tras confirmar alias se vuelve a procesar automáticamente
+    if st.button("🚀 Procesar Entregas", type="primary") or st.session_state.pop("reprocesar", False):
         with st.spinner("Procesando entregas..."):
             # Extraer nombres CREA
             nombres_crea = [est["nombre_crea"] for est in estudiantes]
             
-            # Scrapear entregas
-            entregas = scrap_schoology(html_content, nombres_crea)
+            # Scrapear entregas (coincidencia exacta o alias ya confirmados)
+            entregas, sin_coincidencia = emparejar_schoology(
+                html_content, nombres_crea, cargar_alias().get(curso_slug, {})
+            )
+            
+            # Sugerencias aproximadas para los autores que no coincidieron
+            nombres_libres = [n for n in nombres_crea if n not in entregas]
+            st.session_state.sin_coincidencia = sugerir_coincidencias(sin_coincidencia, nombres_libres)
+            st.session_state.nombres_sin_entrega = nombres_libres
+            st.session_state.sin_coincidencia_slug = curso_slug
             
             # Generar estructura de evaluaciones
-            evaluaciones = []
-            for i, estudiante in enumerate(estudiantes, 1):
-                nombre_crea = estudiante["nombre_crea"]
-                
-                evaluacion = {
-                    "numero": i,
-                    "nombre": nombre_crea,
-                    "resolucion": entregas.get(nombre_crea, "no realiza"),
-                    "tarea": consigna_seleccionada_key,
-                    "calificacion": {
-                        "total": 0,
-                        "detalle": [0, 0, 0, 0]
-                    },
-                    "comentarios": ""
-                }
-                evaluaciones.append(evaluacion)
+            evaluaciones = construir_evaluaciones(estudiantes, entregas, consigna_seleccionada_key)
             
             # Guardar archivo de entregas
             output_dir = DATA_OUTPUT / curso_seleccionado.get("slug", "default")
@@ -303,6 +255,43 @@ def main():
             else:
                 st.error("❌ Error guardando las entregas")
     
+    # Autores de Schoology que no coinciden con ningún nombre CREA
+    pendientes = st.session_state.get("sin_coincidencia")
+    if pendientes and st.session_state.get("sin_coincidencia_slug") == curso_slug:
+        st.subheader("🔎 Autores sin coincidencia exacta")
+        st.warning(
+            f"{len(pendientes)} autores del HTML no coinciden con la lista del curso y sus entregas "
+            "figuran como 'no realiza'. Revisa las sugerencias y confirma las correctas."
+        )
+        df_pendientes = pd.DataFrame(pendientes)
+        df_pendientes.insert(0, "confirmar", df_pendientes["nombre_crea"].notna())
+        editado = st.data_editor(
+            df_pendientes,
+            column_config={
+                "confirmar": st.column_config.CheckboxColumn("Confirmar"),
+                "autor": "Autor en Schoology",
+                "nombre_crea": st.column_config.SelectboxColumn(
+                    "Nombre CREA", options=st.session_state.nombres_sin_entrega
+                ),
+                "puntaje": st.column_config.NumberColumn("Similitud", format="%.0f"),
+            },
+            disabled=["autor", "puntaje"],
+            hide_index=True,
+            use_container_width=True,
+        )
+        if st.button("💾 Confirmar coincidencias"):
+            pares = {
+                fila.autor: fila.nombre_crea
+                for fila in editado.itertuples()
+                if fila.confirmar and isinstance(fila.nombre_crea, str)
+            }
+            if pares:
+                confirmar_alias(curso_slug, pares)
+                st.session_state.reprocesar = True
+                st.rerun()
+            else:
+                st.info("No hay coincidencias marcadas para confirmar")
+
     # PASO 6: Evaluar con IA (opcional)
     if 'entregas_procesadas' in st.session_state:
         st.markdown("---")
@@ -310,11 +299,81 @@ def main():
 
         st.info("Puedes evaluar automáticamente las entregas utilizando OpenAI GPT.")
 
+        # Cliente compartido del proceso: se crea una vez y la conexión se abre en segundo plano,
+        # sin bloquear el primer render aunque la red esté lenta o caída
+        try:
+            from clientes import obtener_cliente
+            obtener_cliente(calentar_conexion=True, en_segundo_plano=True)
+        except ValueError as e:
+            st.warning(f"⚠️ {e}")
+
+        cascada = st.checkbox(
+            "⚡ Modo cascada (modelo económico primero, escalar solo entregas dudosas)",
+            value=False
+        )
+        usar_reglas = st.checkbox(
+            "📏 Resolver localmente entregas triviales (reglas de config/reglas.json)",
+            value=False
+        )
+        empaquetar = st.checkbox(
+            "📦 Evaluar varias entregas cortas por solicitud",
+            value=False
+        )
+        por_criterio = st.checkbox(
+            "🧩 Evaluar cada criterio de la rúbrica por separado (al editarla solo se recalcula lo cambiado)",
+            value=False
+        )
+        stream = st.checkbox(
+            "📡 Mostrar cada nota apenas el modelo la genera (streaming)",
+            value=True
+        )
+        ejecutar_codigo = st.checkbox(
+            "🧪 Ejecutar el código de las entregas contra los casos de prueba de la consigna",
+            value=False
+        )
+
+        # Plan estimado con las opciones elegidas, sin llamar a la API
+        with st.expander("🧮 Estimación de costo y tiempo", expanded=True):
+            from planificador import planificar
+
+            plan = planificar(
+                st.session_state.entregas_procesadas, cascada=cascada, reglas=usar_reglas, empaquetar=empaquetar,
+                por_criterio=por_criterio
+            )
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Solicitudes", plan["solicitudes"])
+            with col2:
+                st.metric("Tokens de entrada", plan["prompt_tokens"])
+            with col3:
+                st.metric("Costo estimado (USD)", f"{plan['costo_usd']:.4f}")
+            with col4:
+                st.metric("Tiempo estimado", f"{plan['segundos_estimados'] / 60:.1f} min")
+            st.caption(
+                f"A evaluar: {plan['a_evaluar']} · Sin entrega: {plan['sin_entrega']} · "
+                f"Resueltas por reglas: {plan['omitidas_por_reglas']} · Lotes: {plan['lotes']} · "
+                f"Tokens desde caché: {plan['prompt_tokens_cacheados']} "
+                f"({plan['solicitudes_con_cache']} solicitudes) · Criterios en caché: "
+                f"{plan['criterios_desde_cache']} · Limita: {plan['limitante']}"
+            )
+
         if st.button("🤖 Ejecutar Evaluación", type="primary"):
             with st.spinner("Evaluando entregas con OpenAI..."):
-                from evaluar_chat import evaluar_entregas
+                from evaluar_chat import evaluar_entregas, nuevo_reporte, resumir_reporte
 
-                evaluaciones = evaluar_entregas(st.session_state.entregas_procesadas)
+                reporte = nuevo_reporte()
+                en_vivo = st.empty()
+                notas = []
+
+                def al_calificar(nombre, calificacion):
+                    notas.append(f"- 👤 {nombre}: **{calificacion['total']}**")
+                    en_vivo.markdown("\n".join(notas))
+
+                evaluaciones = evaluar_entregas(
+                    st.session_state.entregas_procesadas, cascada=cascada, reporte=reporte,
+                    ejecutar_codigo=ejecutar_codigo, reglas=usar_reglas, empaquetar=empaquetar,
+                    stream=stream, al_calificar=al_calificar, por_criterio=por_criterio
+                )
                 st.session_state.entregas_procesadas = evaluaciones
 
                 archivo_eval = Path(st.session_state.archivo_entregas).with_name(
@@ -323,6 +382,38 @@ def main():
                 save_json(evaluaciones, archivo_eval)
                 st.success(f"✅ Evaluación completada. Archivo guardado en: {archivo_eval}")
 
+                # Métricas de la corrida
+                resumen = resumir_reporte(reporte)
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Llamadas a la API", reporte["llamadas"])
+                with col2:
+                    st.metric("Costo estimado (USD)", f"{reporte['costo_usd']:.4f}")
+                with col3:
+                    st.metric("Latencia acumulada", f"{reporte['latencia_total_s']:.1f} s")
+                if "ttft_promedio_s" in resumen:
+                    st.caption(f"Tiempo promedio hasta el primer token: {resumen['ttft_promedio_s']:.2f} s")
+                if empaquetar:
+                    st.info(
+                        f"Lotes enviados: {reporte['lotes']} con {reporte['entregas_en_lotes']} entregas · "
+                        f"Reintentos individuales: {reporte['reintentos_individuales']}"
+                    )
+                if por_criterio:
+                    st.info(
+                        f"Criterios evaluados: {reporte['criterios_evaluados']} · "
+                        f"Reutilizados de la caché: {reporte['criterios_desde_cache']}"
+                    )
+                if usar_reglas:
+                    st.info(
+                        f"Llamadas ahorradas por reglas: {reporte['omitidas_por_reglas']} · "
+                        f"Reglas aplicadas: {reporte['reglas_aplicadas']}"
+                    )
+                if cascada:
+                    st.info(
+                        f"Escaladas al modelo principal: {reporte['escaladas']} "
+                        f"({resumen['tasa_escalado']:.0%}) · Ahorro estimado: {resumen['ahorro_usd']:.4f} USD"
+                    )
+
         # Botón para descargar entregas actuales
         entregas_json = json.dumps(st.session_state.entregas_procesadas, ensure_ascii=False, indent=2)
 
@@ -0,0 +1,312 @@
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict
+from urllib.parse import urlparse
+
+from evaluar_chat import MAXIMOS_CRITERIOS
+
+CONFIG_FALSA_POR_DEFECTO = {
+    # Latencia de cada respuesta: "fija", "uniforme", "exponencial" o "lognormal"
+    "distribucion": "lognormal",
+    "latencia_media_s": 0.5,
+    "latencia_sigma": 0.5,
+    "latencia_min_s": 0.0,
+    "latencia_max_s": 30.0,
+    # Proporción de solicitudes que reciben un 429 o una salida fuera de esquema
+    "tasa_429": 0.0,
+    "reintentar_en_ms": 50,
+    "tasa_malformada": 0.0,
+    # "sintetico" genera respuestas; "grabar" reenvía a ``upstream`` y guarda; "reproducir" usa lo grabado
+    "modo": "sintetico",
+    "grabaciones": None,
+    "upstream": "https://api.openai.com/v1",
+    "semilla": None,
+}
+
+
+def clave_solicitud(cuerpo: Dict[str, Any]) -> str:
+    """Huella de una solicitud de chat (modelo y mensajes) para grabar y reproducir."""
+    contenido = json.dumps([cuerpo.get("model"), cuerpo.get("messages")], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def _datos_entrega(cuerpo: Dict[str, Any]) -> Dict[str, Any]:
+    """Recupera el JSON de datos que ``evaluar_chat`` incluye en el mensaje del usuario."""
+    for mensaje in reversed(cuerpo.get("messages", [])):
+        if mensaje.get("role") != "user":
+            continue
+        contenido = mensaje.get("content", "")
+        inicio = contenido.find("{")
+        try:
+            return json.JSONDecoder().raw_decode(contenido[inicio:])[0] if inicio >= 0 else {}
+        except json.JSONDecodeError:
+            return {}
+    return {}
+
+
+def _calificacion_sintetica(resolucion: str) -> Dict[str, Any]:
+    """Calificación determinística a partir del texto de la entrega."""
+    semilla = int(hashlib.sha256(resolucion.encode("utf-8")).hexdigest(), 16)
+    detalle = []
+    for maximo in MAXIMOS_CRITERIOS:
+        detalle.append(semilla % (maximo + 1))
+        semilla //= maximo + 1
+    return {"total": sum(detalle), "detalle": detalle}
+
+
+def respuesta_sintetica(cuerpo: Dict[str, Any]) -> str:
+    """Contenido válido según el esquema que espera ``evaluar_chat`` (individual o por lotes)."""
+    datos = _datos_entrega(cuerpo)
+    if "entregas" in datos:
+        resultados = [
+            {"nombre": e.get("nombre", ""), "calificacion": _calificacion_sintetica(e.get("resolucion", "")),
+             "comentarios": "Evaluación simulada"}
+            for e in datos["entregas"]
+        ]
+        return json.dumps({"resultados": resultados}, ensure_ascii=False)
+    return json.dumps({
+        "calificacion": _calificacion_sintetica(datos.get("resolucion", "")),
+        "comentarios": "Evaluación simulada",
+        "confianza": 0.9,
+    }, ensure_ascii=False)
+
+
+def _completion(modelo: str, contenido: str, prompt_tokens: int) -> Dict[str, Any]:
+    completion_tokens = max(1, len(contenido) // 4)
+    return {
+        "id": f"chatcmpl-falso-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": modelo,
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": contenido}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+class ManejadorFalso(BaseHTTPRequestHandler):
+    """Implementa ``POST /v1/chat/completions`` y ``GET /v1/models``."""
+
+    server: "ServidorFalso"
+    protocol_version = "HTTP/1.1"  # keep-alive, como la API real
+
+    def _responder(self, estado: int, datos: Any, encabezados: Dict[str, str] | None = None) -> None:
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for clave, valor in (encabezados or {}).items():
+            self.send_header(clave, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _responder_stream(self, completion: Dict[str, Any]) -> None:
+        """Envía la respuesta como eventos SSE en fragmentos, con un último evento de uso."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        contenido = completion["choices"][0]["message"]["content"]
+        base = {"id": completion["id"], "object": "chat.completion.chunk",
+                "created": completion["created"], "model": completion["model"]}
+        fragmentos = [contenido[i:i + 16] for i in range(0, len(contenido), 16)]
+        for i, fragmento in enumerate(fragmentos):
+            delta = {"content": fragmento, **({"role": "assistant"} if i == 0 else {})}
+            self._evento({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        self._evento({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self._evento({**base, "choices": [], "usage": completion["usage"]})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _evento(self, datos: Dict[str, Any]) -> None:
+        self.wfile.write(f"data: {json.dumps(datos, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path.rstrip("/") in ("/v1/models", "/models"):
+            return self._responder(200, {"object": "list", "data": [{"id": "falso", "object": "model"}]})
+        self._responder(404, {"error": {"message": "Ruta no encontrada", "type": "invalid_request_error"}})
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+            return self._responder(404, {"error": {"message": "Ruta no encontrada", "type": "invalid_request_error"}})
+        largo = int(self.headers.get("Content-Length", 0))
+        cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+        servidor = self.server
+        servidor.contar("solicitudes")
+
+        if servidor.sortear("tasa_429"):
+            servidor.contar("rechazadas_429")
+            return self._responder(
+                429,
+                {"error": {"message": "Rate limit reached (simulado)", "type": "rate_limit_error",
+                           "code": "rate_limit_exceeded"}},
+                {"retry-after-ms": str(servidor.config["reintentar_en_ms"])},
+            )
+
+        time.sleep(servidor.latencia())
+        try:
+            completion = servidor.completar(cuerpo, self.headers.get("Authorization"))
+        except KeyError:
+            return self._responder(404, {"error": {"message": "Solicitud sin grabación", "type": "not_found"}})
+
+        if servidor.sortear("tasa_malformada"):
+            servidor.contar("malformadas")
+            contenido = completion["choices"][0]["message"]["content"]
+            # Texto antes del JSON y objeto truncado: los dos desvíos habituales del modelo
+            malformado = "Claro, aquí está la evaluación:\n" + contenido[: len(contenido) // 2]
+            completion = {**completion, "choices": [{**completion["choices"][0],
+                                                     "message": {"role": "assistant", "content": malformado}}]}
+
+        if cuerpo.get("stream"):
+            return self._responder_stream(completion)
+        self._responder(200, completion)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class ServidorFalso(ThreadingHTTPServer):
+    """Servidor local compatible con la API de chat de OpenAI para pruebas de carga."""
+
+    daemon_threads = True
+
+    def __init__(self, direccion, config: Dict[str, Any] | None = None):
+        super().__init__(direccion, ManejadorFalso)
+        self.config = {**CONFIG_FALSA_POR_DEFECTO, **(config or {})}
+        self._azar = random.Random(self.config["semilla"])
+        # Las fallas sortean aparte de las latencias para que su cantidad dependa solo de la semilla
+        self._azar_fallas = random.Random(self.config["semilla"])
+        self._lock = threading.Lock()
+        self.estadisticas = {"solicitudes": 0, "rechazadas_429": 0, "malformadas": 0}
+        self.grabaciones: Dict[str, Dict[str, Any]] = {}
+        if self.config["modo"] == "reproducir":
+            self.grabaciones = cargar_grabaciones(self.config["grabaciones"])
+
+    @property
+    def url(self) -> str:
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}/v1"
+
+    def contar(self, clave: str) -> None:
+        with self._lock:
+            self.estadisticas[clave] += 1
+
+    def sortear(self, tasa: str) -> bool:
+        # Una tasa nula no sortea: con una sola tasa activa, la cantidad de fallas no depende
+        # del orden en que llegan las solicitudes concurrentes
+        if not self.config[tasa]:
+            return False
+        with self._lock:
+            return self._azar_fallas.random() < self.config[tasa]
+
+    def latencia(self) -> float:
+        """Sortea la latencia de una respuesta según la distribución configurada."""
+        c = self.config
+        media = c["latencia_media_s"]
+        with self._lock:
+            if c["distribucion"] == "fija":
+                valor = media
+            elif c["distribucion"] == "uniforme":
+                valor = self._azar.uniform(c["latencia_min_s"], 2 * media - c["latencia_min_s"])
+            elif c["distribucion"] == "exponencial":
+                valor = self._azar.expovariate(1 / media) if media > 0 else 0.0
+            elif c["distribucion"] == "lognormal":
+                # Parámetros elegidos para que la media sea latencia_media_s (cola larga a la derecha)
+                sigma = c["latencia_sigma"]
+                valor = self._azar.lognormvariate(0, sigma) * media / math.exp(sigma ** 2 / 2) \
+                    if media > 0 else 0.0
+            else:
+                raise ValueError(f"Distribución desconocida: {c['distribucion']}")
+        return min(max(valor, c["latencia_min_s"]), c["latencia_max_s"])
+
+    def completar(self, cuerpo: Dict[str, Any], autorizacion: str | None) -> Dict[str, Any]:
+        """Obtiene la respuesta según el modo: sintética, reenviada y grabada, o reproducida."""
+        modo = self.config["modo"]
+        modelo = cuerpo.get("model", "falso")
+        if modo == "reproducir":
+            return self.grabaciones[clave_solicitud(cuerpo)]
+        if modo == "grabar":
+            completion = self._reenviar(cuerpo, autorizacion)
+            guardar_grabacion(self.config["grabaciones"], clave_solicitud(cuerpo), completion, self._lock)
+            return completion
+        prompt_tokens = sum(len(m.get("content", "")) for m in cuerpo.get("messages", [])) // 4
+        return _completion(modelo, respuesta_sintetica(cuerpo), prompt_tokens)
+
+    def _reenviar(self, cuerpo: Dict[str, Any], autorizacion: str | None) -> Dict[str, Any]:
+        # Se pide sin streaming para grabar la respuesta completa; al reproducir se re-fragmenta
+        datos = {k: v for k, v in cuerpo.items() if k not in ("stream", "stream_options")}
+        solicitud = urllib.request.Request(
+            self.config["upstream"].rstrip("/") + "/chat/completions",
+            data=json.dumps(datos).encode("utf-8"),
+            headers={"Content-Type": "application/json", **({"Authorization": autorizacion} if autorizacion else {})},
+        )
+        with urllib.request.urlopen(solicitud, timeout=120) as r:
+            return json.loads(r.read())
+
+
+def cargar_grabaciones(ruta: str | Path | None) -> Dict[str, Dict[str, Any]]:
+    """Lee un archivo JSONL de grabaciones ``{"clave", "respuesta"}``."""
+    grabaciones: Dict[str, Dict[str, Any]] = {}
+    if ruta is None or not Path(ruta).exists():
+        return grabaciones
+    with Path(ruta).open("r", encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                registro = json.loads(linea)
+                grabaciones[registro["clave"]] = registro["respuesta"]
+    return grabaciones
+
+
+def guardar_grabacion(ruta: str | Path | None, clave: str, respuesta: Dict[str, Any],
+                      lock: threading.Lock) -> None:
+    if ruta is None:
+        raise ValueError("El modo 'grabar' necesita la ruta de 'grabaciones'")
+    with lock:
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        with Path(ruta).open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"clave": clave, "respuesta": respuesta}, ensure_ascii=False) + "\n")
+
+
+def crear_servidor_falso(host: str = "127.0.0.1", puerto: int = 0, **config: Any) -> ServidorFalso:
+    """Crea el servidor (``puerto=0`` elige uno libre) y lo atiende en un hilo de fondo."""
+    servidor = ServidorFalso((host, puerto), config)
+    threading.Thread(target=servidor.serve_forever, name="openai-falso", daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor local compatible con la API de chat de OpenAI.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8100)
+    parser.add_argument("--distribucion", default="lognormal", choices=["fija", "uniforme", "exponencial", "lognormal"])
+    parser.add_argument("--latencia-media", type=float, default=0.5)
+    parser.add_argument("--tasa-429", type=float, default=0.0)
+    parser.add_argument("--tasa-malformada", type=float, default=0.0)
+    parser.add_argument("--modo", default="sintetico", choices=["sintetico", "grabar", "reproducir"])
+    parser.add_argument("--grabaciones", help="Archivo JSONL de respuestas grabadas")
+    parser.add_argument("--semilla", type=int)
+    args = parser.parse_args()
+
+    servidor = ServidorFalso((args.host, args.puerto), {
+        "distribucion": args.distribucion, "latencia_media_s": args.latencia_media, "tasa_429": args.tasa_429,
+        "tasa_malformada": args.tasa_malformada, "modo": args.modo, "grabaciones": args.grabaciones,
+        "semilla": args.semilla,
+    })
+    print(f"OpenAI falso en {servidor.url} (usar OPENAI_BASE_URL={servidor.url})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
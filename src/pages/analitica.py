@@ -0,0 +1,41 @@
+import streamlit as st
+
+from analitica import cargar_evaluaciones, resumen_criterios, resumen_estudiantes, resumen_tareas
+
+st.set_page_config(
+    page_title="Analítica de Calificaciones",
+    page_icon="📊",
+    layout="wide"
+)
+
+st.title("📊 Analítica de Calificaciones")
+st.markdown("---")
+
+df = cargar_evaluaciones()
+if df.empty:
+    st.warning("⚠️ Todavía no hay archivos de evaluaciones en data/output")
+    st.stop()
+
+# Filtro por curso
+cursos = sorted(df["curso"].unique())
+cursos_sel = st.multiselect("Cursos:", cursos, default=cursos)
+df = df[df["curso"].isin(cursos_sel)]
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric("Evaluaciones", len(df))
+with col2:
+    st.metric("Tareas", df["tarea"].nunique())
+with col3:
+    st.metric("Promedio general", f"{df.loc[df['entrego'], 'total'].mean():.1f}")
+
+st.header("👤 Por estudiante")
+st.dataframe(resumen_estudiantes(df), use_container_width=True, hide_index=True)
+
+st.header("📝 Por tarea")
+st.dataframe(resumen_tareas(df), use_container_width=True, hide_index=True)
+
+st.header("📐 Por criterio")
+criterios = resumen_criterios(df)
+st.dataframe(criterios, use_container_width=True, hide_index=True)
+st.bar_chart(criterios.pivot(index="criterio", columns="curso", values="mean"))
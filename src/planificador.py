@@ -0,0 +1,253 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from evaluar_chat import (
+    CASCADA_POR_DEFECTO,
+    EMPAQUETADO_POR_DEFECTO,
+    MODELO_PRINCIPAL,
+    _datos_lote,
+    armar_lotes,
+    contar_tokens,
+    mensajes_entrega,
+    mensajes_lote,
+)
+from flujo_entregas import leer_entregas
+from llamadas import costo
+from reglas import cargar_reglas, clasificar
+
+# Tokens de salida esperados por solicitud individual y por entrega dentro de un lote
+COMPLETION_INDIVIDUAL = 200
+COMPLETION_POR_ENTREGA_EN_LOTE = 150
+COMPLETION_POR_CRITERIO = 60
+
+# Latencia aproximada: espera fija más generación a esta velocidad
+VELOCIDAD_MODELOS = {
+    "gpt-4o": {"latencia_base_s": 0.6, "tokens_por_s": 60.0},
+    "gpt-4o-mini": {"latencia_base_s": 0.4, "tokens_por_s": 100.0},
+}
+
+# Límites por modelo de la cuenta (nivel 1 de OpenAI para gpt-4o)
+LIMITES_POR_DEFECTO = {"rpm": 500, "tpm": 30000}
+
+# Caché de prompts de OpenAI: desde 1024 tokens, en bloques de 128, a mitad de precio
+MIN_TOKENS_CACHE = 1024
+BLOQUE_CACHE = 128
+DESCUENTO_CACHE = 0.5
+
+# Proporción de entregas que la cascada reenvía al modelo principal si no se indica otra
+TASA_ESCALADO_ESPERADA = 0.3
+
+
+def _texto(mensajes: List[Dict[str, str]]) -> str:
+    return "\n".join(m["content"] for m in mensajes)
+
+
+def _tokens_cacheados(texto: str, anterior: str | None) -> int:
+    """Tokens del prefijo compartido con la solicitud anterior que la API sirve desde caché."""
+    if anterior is None:
+        return 0
+    prefijo = contar_tokens(os.path.commonprefix([texto, anterior]))
+    if prefijo < MIN_TOKENS_CACHE:
+        return 0
+    return prefijo // BLOQUE_CACHE * BLOQUE_CACHE
+
+
+def _latencia(modelo: str, completion_tokens: int) -> float:
+    velocidad = VELOCIDAD_MODELOS.get(modelo, VELOCIDAD_MODELOS[MODELO_PRINCIPAL])
+    return velocidad["latencia_base_s"] + completion_tokens / velocidad["tokens_por_s"]
+
+
+def planificar(evaluaciones: List[Dict[str, Any]], cascada: bool | Dict[str, Any] = False,
+               reglas: bool | Dict[str, Any] = False, empaquetar: bool | Dict[str, Any] = False,
+               por_criterio: bool | Dict[str, Any] = False, concurrencia: int = 1,
+               limites: Dict[str, int] | None = None,
+               tasa_escalado: float = TASA_ESCALADO_ESPERADA, **otras_opciones: Any) -> Dict[str, Any]:
+    """Estima solicitudes, tokens, costo y tiempo de evaluar las entregas, sin llamar a la API.
+
+    Los tokens de entrada se cuentan sobre los mismos mensajes que enviaría
+    ``evaluar_entregas`` con esas opciones; los de salida y la latencia son
+    estimaciones. Las reglas se aplican sin verificar enlaces, de modo que las
+    entregas que solo tienen enlaces rotos figuran como a evaluar. Con
+    ``por_criterio`` se consulta la caché de criterios y solo se cuentan los
+    criterios que habría que pedir al modelo. Acepta las
+    demás opciones de ``evaluar_entregas`` (``stream``, ...) y las ignora
+    porque no cambian los tokens enviados.
+    """
+    limites = {**LIMITES_POR_DEFECTO, **(limites or {})}
+    plan: Dict[str, Any] = {
+        "entregas": len(evaluaciones),
+        "sin_entrega": 0,
+        "omitidas_por_reglas": 0,
+        "a_evaluar": 0,
+        "solicitudes": 0,
+        "solicitudes_por_modelo": {},
+        "lotes": 0,
+        "prompt_tokens": 0,
+        "prompt_tokens_cacheados": 0,
+        "solicitudes_con_cache": 0,
+        "completion_tokens_estimados": 0,
+        "costo_usd": 0.0,
+        "criterios_desde_cache": 0,
+    }
+    tokens_por_modelo: Dict[str, int] = {}
+    latencia_total = 0.0
+    anterior: Dict[str, str] = {}
+
+    def sumar(modelo: str, mensajes: List[Dict[str, str]], completion: int, peso: float = 1.0,
+              simultaneas: int = 1) -> None:
+        nonlocal latencia_total
+        texto = _texto(mensajes)
+        prompt = sum(contar_tokens(m["content"], modelo) for m in mensajes)
+        cacheados = _tokens_cacheados(texto, anterior.get(modelo))
+        anterior[modelo] = texto
+        plan["solicitudes"] += peso
+        plan["solicitudes_por_modelo"][modelo] = plan["solicitudes_por_modelo"].get(modelo, 0) + peso
+        plan["prompt_tokens"] += round(prompt * peso)
+        plan["prompt_tokens_cacheados"] += round(cacheados * peso)
+        plan["solicitudes_con_cache"] += peso if cacheados else 0
+        plan["completion_tokens_estimados"] += round(completion * peso)
+        plan["costo_usd"] += peso * costo(modelo, prompt - cacheados * DESCUENTO_CACHE, completion)
+        tokens_por_modelo[modelo] = tokens_por_modelo.get(modelo, 0) + round((prompt + completion) * peso)
+        latencia_total += peso * _latencia(modelo, completion) / max(1, simultaneas)
+
+    decisiones: List[Any] = [None] * len(evaluaciones)
+    if reglas:
+        config_reglas = cargar_reglas() if reglas is True else dict(reglas)
+        decisiones = clasificar(evaluaciones, {**config_reglas, "verificar_enlaces": False})
+
+    pendientes = []
+    for entrega, decision in zip(evaluaciones, decisiones):
+        if entrega.get("resolucion", "").strip().lower() == "no realiza":
+            plan["sin_entrega"] += 1
+        elif decision is not None and decision["accion"] == "calificar":
+            plan["omitidas_por_reglas"] += 1
+        else:
+            pendientes.append(entrega)
+    plan["a_evaluar"] = len(pendientes)
+
+    config_cascada = None
+    if cascada:
+        config_cascada = {**CASCADA_POR_DEFECTO, **(cascada if isinstance(cascada, dict) else {})}
+
+    individuales = pendientes
+    if empaquetar:
+        config_lote = {**EMPAQUETADO_POR_DEFECTO, **(empaquetar if isinstance(empaquetar, dict) else {})}
+        individuales = []
+        for lote in armar_lotes(pendientes, config_lote):
+            if len(lote) == 1:
+                individuales.extend(lote)
+                continue
+            plan["lotes"] += 1
+            datos_lote = [_datos_lote(e) for e in lote]
+            if config_cascada is None:
+                sumar(MODELO_PRINCIPAL, mensajes_lote(lote[0].get("enunciado", ""), datos_lote),
+                      COMPLETION_POR_ENTREGA_EN_LOTE * len(lote))
+                continue
+            sumar(config_cascada["modelo_rapido"], mensajes_lote(lote[0].get("enunciado", ""), datos_lote, True),
+                  COMPLETION_POR_ENTREGA_EN_LOTE * len(lote))
+            # Las entregas dudosas del lote se escalan de a una al modelo principal
+            for entrega in lote:
+                datos = (entrega.get("nombre", ""), entrega.get("enunciado", ""), entrega.get("resolucion", ""))
+                sumar(config_cascada["modelo_principal"],
+                      mensajes_entrega(*datos, pruebas=entrega.get("pruebas") or None),
+                      COMPLETION_INDIVIDUAL, peso=tasa_escalado)
+
+    if por_criterio and individuales:
+        from criterios import (
+            POR_CRITERIO_POR_DEFECTO,
+            CacheCriterios,
+            cargar_rubrica,
+            mensajes_criterio,
+            plan_criterios,
+        )
+
+        config_criterios = {**POR_CRITERIO_POR_DEFECTO, **(por_criterio if isinstance(por_criterio, dict) else {})}
+        rubrica = cargar_rubrica(config_criterios["rubrica"])
+        if isinstance(config_criterios["cache"], CacheCriterios):
+            en_cache, faltantes = plan_criterios(individuales, rubrica, config_criterios["cache"],
+                                                 config_criterios["modelo"])
+        else:
+            cache = CacheCriterios(config_criterios["cache"])
+            try:
+                en_cache, faltantes = plan_criterios(individuales, rubrica, cache, config_criterios["modelo"])
+            finally:
+                cache.cerrar()
+        plan["criterios_desde_cache"] = len(en_cache)
+        for entrega, _, criterio, enunciado, *_ in faltantes:
+            mensajes = mensajes_criterio(criterio, enunciado, entrega.get("resolucion", ""), entrega.get("pruebas"))
+            # Los criterios se piden de a config_criterios["workers"] en paralelo
+            sumar(config_criterios["modelo"], mensajes, COMPLETION_POR_CRITERIO,
+                  simultaneas=config_criterios["workers"])
+        individuales = []
+
+    for entrega in individuales:
+        datos = (entrega.get("nombre", ""), entrega.get("enunciado", ""), entrega.get("resolucion", ""))
+        pruebas = entrega.get("pruebas") or None
+        if config_cascada is None:
+            sumar(MODELO_PRINCIPAL, mensajes_entrega(*datos, pruebas=pruebas), COMPLETION_INDIVIDUAL)
+            continue
+        sumar(config_cascada["modelo_rapido"], mensajes_entrega(*datos, con_confianza=True, pruebas=pruebas),
+              COMPLETION_INDIVIDUAL)
+        # Solo una parte se escala: se pondera por la tasa esperada
+        sumar(config_cascada["modelo_principal"], mensajes_entrega(*datos, pruebas=pruebas),
+              COMPLETION_INDIVIDUAL, peso=tasa_escalado)
+
+    # El tiempo lo fija lo más lento entre la latencia repartida y los límites de cada modelo
+    tiempos = {"latencia": latencia_total / max(1, concurrencia)}
+    for modelo, solicitudes in plan["solicitudes_por_modelo"].items():
+        tiempos[f"rpm {modelo}"] = solicitudes / limites["rpm"] * 60
+        tiempos[f"tpm {modelo}"] = tokens_por_modelo[modelo] / limites["tpm"] * 60
+    plan["limitante"] = max(tiempos, key=tiempos.get)
+    plan["segundos_estimados"] = tiempos[plan["limitante"]]
+    plan["solicitudes"] = round(plan["solicitudes"])
+    plan["solicitudes_con_cache"] = round(plan["solicitudes_con_cache"])
+    plan["solicitudes_por_modelo"] = {m: round(n) for m, n in plan["solicitudes_por_modelo"].items()}
+    return plan
+
+
+def planificar_archivos(rutas: Iterable[str | Path], **opciones: Any) -> Dict[str, Any]:
+    """Plan conjunto para varios ``_entregas.json`` (o JSONL)."""
+    rutas = list(rutas)
+    evaluaciones = [entrega for ruta in rutas for entrega in leer_entregas(ruta)]
+    return {"archivos": len(rutas), **planificar(evaluaciones, **opciones)}
+
+
+def formatear_plan(plan: Dict[str, Any]) -> str:
+    """Resumen de texto del plan para la línea de comandos."""
+    minutos, segundos = divmod(round(plan["segundos_estimados"]), 60)
+    return "\n".join([
+        f"Entregas: {plan['entregas']} | sin entrega: {plan['sin_entrega']} | "
+        f"resueltas por reglas: {plan['omitidas_por_reglas']} | a evaluar: {plan['a_evaluar']}",
+        f"Solicitudes: {plan['solicitudes']} {plan['solicitudes_por_modelo']} | lotes: {plan['lotes']}",
+        f"Tokens de entrada: {plan['prompt_tokens']} ({plan['prompt_tokens_cacheados']} desde caché en "
+        f"{plan['solicitudes_con_cache']} solicitudes) | de salida estimados: {plan['completion_tokens_estimados']}"
+        + (f" | criterios en caché: {plan['criterios_desde_cache']}" if plan["criterios_desde_cache"] else ""),
+        f"Costo estimado: {plan['costo_usd']:.4f} USD | tiempo estimado: {minutos} min {segundos} s "
+        f"(limita: {plan['limitante']})",
+    ])
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Estima costo y tiempo de una evaluación sin llamar a la API.")
+    parser.add_argument("archivos", nargs="+", help="Archivos _entregas.json o .jsonl")
+    parser.add_argument("--cascada", action="store_true")
+    parser.add_argument("--reglas", action="store_true")
+    parser.add_argument("--empaquetar", action="store_true")
+    parser.add_argument("--por-criterio", action="store_true")
+    parser.add_argument("--concurrencia", type=int, default=1, help="Solicitudes simultáneas (trabajadores)")
+    parser.add_argument("--rpm", type=int, default=LIMITES_POR_DEFECTO["rpm"])
+    parser.add_argument("--tpm", type=int, default=LIMITES_POR_DEFECTO["tpm"])
+    parser.add_argument("--tasa-escalado", type=float, default=TASA_ESCALADO_ESPERADA)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    plan = planificar_archivos(
+        args.archivos, cascada=args.cascada, reglas=args.reglas, empaquetar=args.empaquetar,
+        por_criterio=args.por_criterio, concurrencia=args.concurrencia, limites={"rpm": args.rpm, "tpm": args.tpm},
+        tasa_escalado=args.tasa_escalado,
+    )
+    print(json.dumps(plan, ensure_ascii=False, indent=2) if args.json else formatear_plan(plan))
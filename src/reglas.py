@@ -0,0 +1,144 @@
+import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Any, Dict, List
+
+import requests
+
+from rutas import CONFIG_DIR
+
+RE_ENLACE = re.compile(r"https?://\S+")
+
+REGLAS_POR_DEFECTO = {
+    # Texto (sin enlaces) por debajo de esta longitud se considera vacío
+    "longitud_minima": 30,
+    # Proporción de similitud a partir de la cual la entrega es una copia del enunciado
+    "similitud_enunciado": 0.8,
+    "verificar_enlaces": True,
+    "timeout_enlaces_s": 5,
+    "reglas_regex": [],
+}
+
+
+def cargar_reglas(ruta: str | Path = CONFIG_DIR / "reglas.json") -> Dict[str, Any]:
+    """Carga la configuración del motor de reglas completando los valores por defecto."""
+    ruta = Path(ruta)
+    config = {}
+    if ruta.exists():
+        with ruta.open("r", encoding="utf-8") as f:
+            config = json.load(f)
+    return {**REGLAS_POR_DEFECTO, **config}
+
+
+def cargar_consignas(config_dir: str | Path = CONFIG_DIR) -> Dict[str, str]:
+    """Une todas las consignas de ``consignas_*.json`` en un único diccionario."""
+    consignas: Dict[str, str] = {}
+    for archivo in sorted(Path(config_dir).glob("consignas_*.json")):
+        with archivo.open("r", encoding="utf-8") as f:
+            consignas.update(json.load(f))
+    return consignas
+
+
+def _normalizar(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", texto))
+
+
+def _separar(resolucion: str) -> tuple[str, List[str]]:
+    """Separa el texto libre de los enlaces de una resolución."""
+    enlaces = list(dict.fromkeys(e.rstrip(".,;)") for e in RE_ENLACE.findall(resolucion)))
+    texto = RE_ENLACE.sub(" ", resolucion).replace("Adjuntos:", " ")
+    return " ".join(texto.split()), enlaces
+
+
+def enlace_accesible(url: str, timeout: float = 5) -> bool:
+    """Comprueba si un enlace responde sin error."""
+    try:
+        respuesta = requests.head(url, allow_redirects=True, timeout=timeout)
+        if respuesta.status_code in (403, 405):
+            # Algunos sitios no aceptan HEAD
+            respuesta = requests.get(url, allow_redirects=True, timeout=timeout, stream=True)
+            respuesta.close()
+        return respuesta.status_code < 400
+    except requests.RequestException:
+        return False
+
+
+def _decision(regla: str, accion: str, comentario: str, detalle: List[int] | None = None) -> Dict[str, Any]:
+    detalle = list(detalle or [0, 0, 0, 0])
+    return {
+        "regla": regla,
+        "accion": accion,
+        "calificacion": {"total": sum(detalle), "detalle": detalle},
+        "comentarios": comentario,
+    }
+
+
+def evaluar_reglas(entrega: Dict[str, Any], config: Dict[str, Any], enunciado: str = "") -> Dict[str, Any] | None:
+    """Aplica las reglas locales a una entrega.
+
+    Devuelve ``None`` si ninguna regla se dispara. Si no, un diccionario con la
+    regla, la ``accion`` ("calificar" resuelve la entrega sin IA, "marcar" solo
+    la señala) y la calificación y comentarios a asignar.
+    """
+    resolucion = entrega.get("resolucion", "")
+
+    # Reglas configurables por expresión regular (p. ej. "lo subo más tarde"). Las que solo
+    # marcan no cortan la evaluación: una entrega vacía y marcada se sigue calificando local
+    marca = None
+    for regla in config.get("reglas_regex", []):
+        if re.search(regla["patron"], resolucion, re.IGNORECASE):
+            decision = _decision(regla.get("id", regla["patron"]), regla.get("accion", "calificar"),
+                                 regla.get("comentario", ""), regla.get("detalle"))
+            if decision["accion"] == "calificar":
+                return decision
+            marca = marca or decision
+
+    texto, enlaces = _separar(resolucion)
+    if not enlaces and len(texto) < config["longitud_minima"]:
+        return _decision("vacia", "calificar", "La entrega no contiene contenido evaluable.")
+
+    inaccesibles = None
+
+    def todos_inaccesibles() -> bool:
+        # Sin verificar enlaces no se puede descartar que alguno lleve a la resolución
+        nonlocal inaccesibles
+        if inaccesibles is None:
+            inaccesibles = config["verificar_enlaces"] and \
+                not any(enlace_accesible(e, config["timeout_enlaces_s"]) for e in enlaces)
+        return inaccesibles
+
+    if enunciado and texto and (not enlaces or todos_inaccesibles()):
+        similitud = SequenceMatcher(None, _normalizar(texto), _normalizar(enunciado), autojunk=False).ratio()
+        if similitud >= config["similitud_enunciado"]:
+            return _decision("copia_enunciado", "calificar",
+                             "La entrega reproduce el enunciado sin aportar una resolución.")
+
+    if enlaces and len(texto) < config["longitud_minima"] and todos_inaccesibles():
+        return _decision("enlaces_inaccesibles", "calificar",
+                         "La entrega solo contiene enlaces y ninguno es accesible.")
+    return marca
+
+
+def clasificar(evaluaciones: List[Dict[str, Any]], config: Dict[str, Any] | None = None,
+               consignas: Dict[str, str] | None = None, workers: int | None = None) -> List[Dict[str, Any] | None]:
+    """Aplica las reglas a todas las entregas en paralelo (la verificación de enlaces es I/O).
+
+    El resultado está alineado con ``evaluaciones``.
+    """
+    config = cargar_reglas() if config is None else {**REGLAS_POR_DEFECTO, **config}
+    consignas = cargar_consignas() if consignas is None else consignas
+
+    def aplicar(entrega):
+        if entrega.get("resolucion", "").strip().lower() == "no realiza":
+            return None
+        enunciado = entrega.get("enunciado") or consignas.get(entrega.get("tarea", ""), "")
+        return evaluar_reglas(entrega, config, enunciado)
+
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        return list(pool.map(aplicar, evaluaciones))
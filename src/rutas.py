@@ -0,0 +1,16 @@
+from pathlib import Path
+
+# Rutas principales del proyecto
+BASE_DIR = Path(__file__).parent.parent
+DATA_INPUT = BASE_DIR / "data" / "input"
+DATA_OUTPUT = BASE_DIR / "data" / "output"
+CONFIG_DIR = BASE_DIR / "config"
+
+
+def archivo_consignas(curso_slug: str) -> Path:
+    """Devuelve el archivo de consignas que corresponde al slug del curso."""
+    slug = (curso_slug or "").lower()
+    if "programacion2" in slug:
+        return CONFIG_DIR / "consignas_p2.json"
+    # programacion1 y cualquier otro curso usan las consignas de P1 por defecto
+    return CONFIG_DIR / "consignas_p1.json"
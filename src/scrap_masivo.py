@@ -0,0 +1,133 @@
+import fnmatch
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from coincidencias import cargar_alias
+from rutas import CONFIG_DIR, DATA_OUTPUT
+from scraper import construir_evaluaciones, extraer_entregas
+
+EXTENSIONES_HTML = (".html", ".htm", ".txt")
+
+
+def listar_archivos(entrada: str | Path) -> List[Path]:
+    """Devuelve los archivos HTML de un directorio o de un patrón glob."""
+    ruta = Path(entrada)
+    if ruta.is_dir():
+        archivos = [p for p in ruta.iterdir() if p.is_file() and p.suffix.lower() in EXTENSIONES_HTML]
+    else:
+        archivos = [Path(p) for p in glob.glob(str(entrada)) if Path(p).is_file()]
+    return sorted(archivos)
+
+
+def resolver_destino(archivo: Path, mapeo: Dict[str, Dict[str, str]]) -> Optional[Tuple[str, str]]:
+    """Busca el curso y la consigna de un archivo según el mapeo de patrones."""
+    for patron, destino in mapeo.items():
+        if fnmatch.fnmatch(archivo.name, patron):
+            return str(destino["curso"]), destino["consigna"]
+    return None
+
+
+def buscar_curso(cursos: List[Dict[str, Any]], clave: str) -> Optional[Dict[str, Any]]:
+    """Encuentra un curso por slug o por id."""
+    for curso in cursos:
+        if curso.get("slug") == clave or str(curso.get("id")) == clave:
+            return curso
+    return None
+
+
+def _procesar_archivo(ruta: str, nombres_crea: List[str], alias: Dict[str, str]) -> Dict[str, str]:
+    """Lee y parsea un archivo HTML (se ejecuta en un proceso hijo)."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        return extraer_entregas(f.read(), nombres_crea, alias)
+
+
+def fusionar_entregas(existentes: List[Dict[str, Any]], nuevas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Combina entregas nuevas con las ya guardadas sin perder resoluciones previas."""
+    previas = {e.get("nombre"): e for e in existentes}
+    for entrega in nuevas:
+        previa = previas.get(entrega["nombre"])
+        if previa and entrega["resolucion"] == "no realiza" and previa.get("resolucion", "no realiza") != "no realiza":
+            entrega["resolucion"] = previa["resolucion"]
+    return nuevas
+
+
+def guardar_entregas(entregas_file: Path, evaluaciones: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Escribe un ``_entregas.json`` fusionándolo con el contenido previo si existe."""
+    if entregas_file.exists():
+        with entregas_file.open("r", encoding="utf-8") as f:
+            evaluaciones = fusionar_entregas(json.load(f), evaluaciones)
+
+    entregas_file.parent.mkdir(parents=True, exist_ok=True)
+    with entregas_file.open("w", encoding="utf-8") as f:
+        json.dump(evaluaciones, f, ensure_ascii=False, indent=2)
+    return evaluaciones
+
+
+def scrap_lote(entrada: str | Path, mapeo: Dict[str, Dict[str, str]], cursos: List[Dict[str, Any]],
+               workers: int | None = None, salida_dir: str | Path = DATA_OUTPUT,
+               alias: Dict[str, Dict[str, str]] | None = None) -> Dict[Path, List[Dict[str, Any]]]:
+    """Procesa en paralelo todas las exportaciones y actualiza los ``_entregas.json``.
+
+    ``mapeo`` asocia patrones de nombre de archivo (fnmatch) con
+    ``{"curso": slug o id, "consigna": clave}``. Devuelve un diccionario con
+    la ruta de cada archivo escrito y su contenido. ``alias`` son los alias de
+    nombres confirmados por curso (por defecto, los de ``config/alias_nombres.json``).
+    """
+    salida_dir = Path(salida_dir)
+    alias = cargar_alias() if alias is None else alias
+    trabajos: List[Tuple[Path, Dict[str, Any], str]] = []
+    for archivo in listar_archivos(entrada):
+        destino = resolver_destino(archivo, mapeo)
+        if destino is None:
+            continue
+        curso = buscar_curso(cursos, destino[0])
+        if curso is None:
+            raise ValueError(f"Curso desconocido en el mapeo: {destino[0]}")
+        trabajos.append((archivo, curso, destino[1]))
+
+    # Parseo en paralelo: BeautifulSoup es CPU-bound y no libera el GIL
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futuros = [
+            pool.submit(_procesar_archivo, str(archivo), [e["nombre_crea"] for e in curso.get("estudiantes", [])],
+                        alias.get(curso.get("slug", "default"), {}))
+            for archivo, curso, _ in trabajos
+        ]
+        resultados = [f.result() for f in futuros]
+
+    # Agrupar por curso y consigna (varias exportaciones pueden ir al mismo destino)
+    agrupadas: Dict[Tuple[str, str], Dict[str, str]] = {}
+    cursos_por_slug: Dict[str, Dict[str, Any]] = {}
+    for (archivo, curso, consigna), entregas in zip(trabajos, resultados):
+        slug = curso.get("slug", "default")
+        cursos_por_slug[slug] = curso
+        agrupadas.setdefault((slug, consigna), {}).update(entregas)
+
+    escritos: Dict[Path, List[Dict[str, Any]]] = {}
+    for (slug, consigna), entregas in agrupadas.items():
+        evaluaciones = construir_evaluaciones(cursos_por_slug[slug].get("estudiantes", []), entregas, consigna)
+        entregas_file = salida_dir / slug / f"{consigna}_entregas.json"
+        escritos[entregas_file] = guardar_entregas(entregas_file, evaluaciones)
+    return escritos
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Procesa en lote exportaciones HTML de Schoology.")
+    parser.add_argument("entrada", help="Directorio o patrón glob con los archivos HTML")
+    parser.add_argument("mapeo", help='JSON {"patron": {"curso": "slug o id", "consigna": "clave"}}')
+    parser.add_argument("--workers", type=int, default=None, help="Procesos a usar (por defecto, todos los núcleos)")
+    args = parser.parse_args()
+
+    with open(args.mapeo, "r", encoding="utf-8") as f:
+        mapeo = json.load(f)
+    with (CONFIG_DIR / "estudiantes.json").open("r", encoding="utf-8") as f:
+        cursos = json.load(f)
+
+    for ruta, evaluaciones in scrap_lote(args.entrada, mapeo, cursos, workers=args.workers).items():
+        entregaron = sum(1 for e in evaluaciones if e["resolucion"] != "no realiza")
+        print(f"{ruta}: {entregaron}/{len(evaluaciones)} entregas")
@@ -0,0 +1,94 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+from bs4 import BeautifulSoup
+
+PREFIJOS_IGNORADOS = ("/user/", "/comment/", "/discussion/", "/likes/", "/course/")
+
+
+def _texto_card(card) -> str:
+    """Arma el texto de la entrega (cuerpo + enlaces + adjuntos) de una tarjeta."""
+    cuerpo = card.find("div", class_="comment-body-wrapper")
+    if cuerpo:
+        textos = [p.get_text(" ", strip=True) for p in cuerpo.find_all("p")]
+        links = [a["href"] for a in cuerpo.find_all("a", href=True)
+                 if not a["href"].startswith(PREFIJOS_IGNORADOS)]
+        texto_entrega = " ".join(textos)
+    else:
+        texto_entrega = ""
+        links = []
+
+    # Adjuntos
+    adjuntos = card.find_all("div", class_="attachments-link-summary")
+    links_adjuntos = [adj.get_text(" ", strip=True) for adj in adjuntos]
+
+    # Unir todo
+    all_links = list(dict.fromkeys(links + links_adjuntos))
+    if all_links:
+        texto_entrega += ("\nAdjuntos:\n" if texto_entrega else "Adjuntos:\n") + "\n".join(all_links)
+    return texto_entrega.strip()
+
+
+def extraer_por_autor(html_content: str) -> Dict[str, str]:
+    """Extrae las entregas del HTML de Schoology indexadas por el autor tal como aparece."""
+    entregas: Dict[str, str] = {}
+    soup = BeautifulSoup(html_content, "html.parser")
+    for card in soup.find_all("div", class_="discussion-card"):
+        nombre_tag = card.find("span", class_="comment-author")
+        if not nombre_tag:
+            continue
+        entregas[nombre_tag.get_text(strip=True)] = _texto_card(card)
+    return entregas
+
+
+def asignar_entregas(por_autor: Dict[str, str], nombres_crea: Iterable[str],
+                     alias: Dict[str, str] | None = None) -> Tuple[Dict[str, str], List[str]]:
+    """Asocia cada autor con su nombre CREA por coincidencia exacta o por alias confirmado.
+
+    ``alias`` relaciona el autor en mayúsculas con el nombre CREA. Devuelve las
+    entregas por nombre CREA y los autores que quedaron sin asociar.
+    """
+    por_nombre: Dict[str, str] = {}
+    for nombre_crea in nombres_crea:
+        por_nombre.setdefault(nombre_crea.upper(), nombre_crea)
+    alias = alias or {}
+    entregas: Dict[str, str] = {}
+    sin_coincidencia: List[str] = []
+    for autor, texto in por_autor.items():
+        clave = autor.upper()
+        nombre_crea = por_nombre.get(clave)
+        if nombre_crea is None and alias.get(clave, "").upper() in por_nombre:
+            nombre_crea = por_nombre[alias[clave].upper()]
+        if nombre_crea is None:
+            sin_coincidencia.append(autor)
+            continue
+        entregas[nombre_crea] = texto
+    return entregas, sin_coincidencia
+
+
+def extraer_entregas(html_content: str, nombres_crea: Iterable[str],
+                     alias: Dict[str, str] | None = None) -> Dict[str, str]:
+    """Extrae las entregas del HTML de Schoology indexadas por nombre CREA.
+
+    No depende de Streamlit, por lo que puede ejecutarse en procesos hijos.
+    """
+    return asignar_entregas(extraer_por_autor(html_content), nombres_crea, alias)[0]
+
+
+def construir_evaluaciones(estudiantes: List[Dict[str, Any]], entregas: Dict[str, str],
+                           consigna: str) -> List[Dict[str, Any]]:
+    """Genera la estructura de evaluaciones de un curso para una consigna."""
+    evaluaciones = []
+    for i, estudiante in enumerate(estudiantes, 1):
+        nombre_crea = estudiante["nombre_crea"]
+        evaluaciones.append({
+            "numero": i,
+            "nombre": nombre_crea,
+            "resolucion": entregas.get(nombre_crea, "no realiza"),
+            "tarea": consigna,
+            "calificacion": {
+                "total": 0,
+                "detalle": [0, 0, 0, 0]
+            },
+            "comentarios": ""
+        })
+    return evaluaciones
@@ -0,0 +1,318 @@
+import json
+import os
+import re
+import socket
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+from coincidencias import cargar_alias
+from cola_trabajos import DB_POR_DEFECTO, LEASE_POR_DEFECTO_S, ColaTrabajos
+from flujo_entregas import bloquear_archivo
+from rutas import CONFIG_DIR, DATA_OUTPUT
+from scrap_masivo import buscar_curso, guardar_entregas
+from scraper import construir_evaluaciones, extraer_entregas
+
+# Opciones de evaluar_entregas que se aceptan desde la API. ``ejecutar_codigo`` queda fuera:
+# la API no tiene autenticación y correr el código de las entregas no aísla archivos ni red
+OPCIONES_EVALUACION = {"cascada", "reglas", "empaquetar", "stream", "por_criterio"}
+
+
+def _ruta_en_salida(archivo: str) -> Path:
+    """Resuelve una ruta relativa a data/output impidiendo salir de esa carpeta."""
+    ruta = (DATA_OUTPUT / archivo).resolve()
+    if not ruta.is_relative_to(DATA_OUTPUT.resolve()):
+        raise ValueError(f"Ruta fuera de data/output: {archivo}")
+    return ruta
+
+
+def trabajo_scrap(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Procesa un HTML de Schoology y actualiza el ``_entregas.json`` del curso."""
+    with (CONFIG_DIR / "estudiantes.json").open("r", encoding="utf-8") as f:
+        cursos = json.load(f)
+    curso = buscar_curso(cursos, str(parametros["curso"]))
+    if curso is None:
+        raise ValueError(f"Curso desconocido: {parametros['curso']}")
+    consigna = str(parametros["consigna"])
+    if not consigna or "/" in consigna or "\\" in consigna or ".." in consigna:
+        raise ValueError(f"Consigna inválida: {consigna!r}")
+    estudiantes = curso.get("estudiantes", [])
+
+    slug = curso.get("slug", "default")
+    entregas = extraer_entregas(parametros["html"], [e["nombre_crea"] for e in estudiantes],
+                                cargar_alias().get(slug, {}))
+    archivo = _ruta_en_salida(f"{slug}/{consigna}_entregas.json")
+    evaluaciones = guardar_entregas(archivo, construir_evaluaciones(estudiantes, entregas, consigna))
+    return {
+        "archivo": str(archivo.relative_to(DATA_OUTPUT.resolve())),
+        "total": len(evaluaciones),
+        "entregaron": sum(1 for e in evaluaciones if e["resolucion"] != "no realiza"),
+    }
+
+
+def _opciones_evaluacion(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    opciones = {k: v for k, v in parametros.get("opciones", {}).items() if k in OPCIONES_EVALUACION}
+    if "por_criterio" in opciones:
+        # Solo activar/desactivar: la ruta de la caché no se acepta desde la red
+        opciones["por_criterio"] = bool(opciones["por_criterio"])
+    return opciones
+
+
+def _sin_evaluar(entrega: Dict[str, Any]) -> Dict[str, Any]:
+    """Quita la calificación provisoria (0) de una entrega que todavía no se evaluó.
+
+    Así ``vigilar.entregas_nuevas`` la sigue considerando pendiente. Las que no
+    se entregaron conservan su 0, que es la nota definitiva.
+    """
+    if entrega.get("resolucion", "").strip().lower() == "no realiza":
+        return entrega
+    return {k: v for k, v in entrega.items() if k not in ("calificacion", "comentarios")}
+
+
+def trabajo_evaluar(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Evalúa un ``_entregas.json`` de data/output con OpenAI.
+
+    Con ``solo`` (lista de nombres) se evalúan únicamente esas entregas y el
+    resto conserva la evaluación ya guardada en ``_evaluaciones.json``. Los
+    trabajos sobre un mismo archivo se serializan para no pisarse resultados.
+    """
+    from evaluar_chat import evaluar_entregas, nuevo_reporte
+
+    opciones = _opciones_evaluacion(parametros)
+    if "archivo" not in parametros:
+        raise ValueError("Falta 'archivo': solo se evalúan _entregas.json de data/output")
+    archivo = _ruta_en_salida(parametros["archivo"])
+    salida = archivo.with_name(archivo.name.replace("_entregas.json", "_evaluaciones.json"))
+
+    with bloquear_archivo(salida):
+        with archivo.open("r", encoding="utf-8") as f:
+            evaluaciones = json.load(f)
+        a_evaluar = evaluaciones
+        if "solo" in parametros:
+            solo = set(parametros["solo"])
+            previas = {}
+            if salida.exists():
+                with salida.open("r", encoding="utf-8") as f:
+                    previas = {e.get("nombre"): e for e in json.load(f)}
+            a_evaluar = [e for e in evaluaciones if e.get("nombre") in solo]
+            evaluaciones = [e if e.get("nombre") in solo else previas.get(e.get("nombre")) or _sin_evaluar(e)
+                            for e in evaluaciones]
+
+        reporte = nuevo_reporte()
+        evaluar_entregas(a_evaluar, reporte=reporte, **opciones)
+
+        with salida.open("w", encoding="utf-8") as f:
+            json.dump(evaluaciones, f, ensure_ascii=False, indent=2)
+    return {"evaluaciones": a_evaluar, "reporte": reporte, "archivo": str(salida.relative_to(DATA_OUTPUT.resolve()))}
+
+
+def trabajo_evaluar_entrega(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Evalúa una sola entrega (unidad de trabajo distribuida, ver ``distribuido.py``)."""
+    from evaluar_chat import evaluar_entregas, nuevo_reporte
+
+    opciones = _opciones_evaluacion(parametros)
+    entrega = dict(parametros["entrega"])
+    reporte = nuevo_reporte()
+    evaluar_entregas([entrega], reporte=reporte, **opciones)
+    return {
+        "nombre": entrega.get("nombre"),
+        "calificacion": entrega.get("calificacion"),
+        "comentarios": entrega.get("comentarios", ""),
+        **{k: entrega[k] for k in ("regla", "marcas", "pruebas") if k in entrega},
+        "reporte": reporte,
+    }
+
+
+def _versionar(tipo: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Agrega la versión del archivo a evaluar para que un re-scrape genere un trabajo nuevo."""
+    if tipo == "evaluar" and "archivo" in parametros:
+        try:
+            stat = _ruta_en_salida(parametros["archivo"]).stat()
+            return {**parametros, "version_archivo": f"{stat.st_mtime_ns}-{stat.st_size}"}
+        except (OSError, ValueError):
+            pass
+    return parametros
+
+
+MANEJADORES: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "scrap": trabajo_scrap,
+    "evaluar": trabajo_evaluar,
+    "evaluar_entrega": trabajo_evaluar_entrega,
+}
+
+
+class Trabajadores:
+    """Pool de hilos que vacía la cola de trabajos.
+
+    ``cola`` puede ser una ``ColaTrabajos`` local o cualquier objeto con la
+    misma interfaz (``tomar``, ``renovar``, ``terminar``, ``hay_trabajo``),
+    como ``distribuido.ColaRemota``. Mientras procesa un trabajo cada hilo
+    renueva su plazo cada ``latido_s`` segundos.
+    """
+
+    def __init__(self, cola: ColaTrabajos, cantidad: int = 2,
+                 manejadores: Dict[str, Callable[[Dict[str, Any]], Any]] | None = None,
+                 lease_s: float = LEASE_POR_DEFECTO_S, latido_s: float | None = None,
+                 tipos: List[str] | None = None):
+        self.cola = cola
+        self.cantidad = cantidad
+        self.manejadores = MANEJADORES if manejadores is None else manejadores
+        self.lease_s = lease_s
+        self.latido_s = latido_s if latido_s is not None else lease_s / 3
+        self.tipos = tipos
+        self.prefijo = f"{socket.gethostname()}-{os.getpid()}"
+        self._detener = threading.Event()
+        self._hilos = []
+
+    def iniciar(self) -> None:
+        for i in range(self.cantidad):
+            hilo = threading.Thread(target=self._trabajar, args=(f"{self.prefijo}-{i}",),
+                                    name=f"trabajador-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self) -> None:
+        self._detener.set()
+        self.cola.hay_trabajo.set()
+        for hilo in self._hilos:
+            hilo.join()
+
+    def _latir(self, id_trabajo: int, trabajador: str, fin: threading.Event) -> None:
+        while not fin.wait(self.latido_s):
+            if not self.cola.renovar(id_trabajo, trabajador, self.lease_s):
+                return
+
+    def _trabajar(self, trabajador: str) -> None:
+        while not self._detener.is_set():
+            trabajo = self.cola.tomar(trabajador, self.lease_s, self.tipos)
+            if trabajo is None:
+                self.cola.hay_trabajo.wait(timeout=1)
+                self.cola.hay_trabajo.clear()
+                continue
+            fin = threading.Event()
+            latido = threading.Thread(target=self._latir, args=(trabajo["id"], trabajador, fin), daemon=True)
+            latido.start()
+            try:
+                resultado = self.manejadores[trabajo["tipo"]](trabajo["parametros"])
+                self.cola.terminar(trabajo["id"], resultado, trabajador=trabajador)
+            except Exception as e:
+                traceback.print_exc()
+                self.cola.terminar(trabajo["id"], error=f"{type(e).__name__}: {e}", trabajador=trabajador)
+            finally:
+                fin.set()
+                latido.join()
+
+
+class ManejadorHTTP(BaseHTTPRequestHandler):
+    """API JSON: POST /trabajos, GET /trabajos, GET /trabajos/<id>[/resultado].
+
+    Para trabajadores remotos: POST /trabajos/tomar, /trabajos/<id>/renovar y
+    /trabajos/<id>/terminar.
+    """
+
+    server: "ServidorEvaluacion"
+
+    def _responder(self, estado: int, datos: Any) -> None:
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_POST(self) -> None:
+        ruta = urlparse(self.path).path.rstrip("/")
+        try:
+            largo = int(self.headers.get("Content-Length", 0))
+            datos = json.loads(self.rfile.read(largo) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            return self._responder(400, {"error": "JSON inválido"})
+        if ruta == "/trabajos/tomar":
+            trabajo = self.server.cola.tomar(datos.get("trabajador") or "remoto",
+                                             float(datos.get("lease_s", LEASE_POR_DEFECTO_S)), datos.get("tipos"))
+            return self._responder(200, {"trabajo": trabajo})
+        m = re.fullmatch(r"/trabajos/(\d+)/(renovar|terminar)", ruta)
+        if m:
+            trabajador = datos.get("trabajador") or "remoto"
+            if m.group(2) == "renovar":
+                ok = self.server.cola.renovar(int(m.group(1)), trabajador,
+                                              float(datos.get("lease_s", LEASE_POR_DEFECTO_S)))
+            else:
+                ok = self.server.cola.terminar(int(m.group(1)), datos.get("resultado"), datos.get("error"),
+                                               trabajador=trabajador)
+            return self._responder(200 if ok else 409, {"ok": ok})
+        if ruta != "/trabajos":
+            return self._responder(404, {"error": "Ruta no encontrada"})
+        tipo = datos.get("tipo")
+        if tipo not in self.server.manejadores:
+            return self._responder(400, {"error": f"Tipo de trabajo desconocido: {tipo}"})
+        if not isinstance(datos.get("parametros"), dict):
+            return self._responder(400, {"error": "Falta el objeto 'parametros'"})
+        opciones = datos["parametros"].get("opciones")
+        if isinstance(opciones, dict) and opciones.get("ejecutar_codigo"):
+            return self._responder(400, {"error": "La ejecución de código no está disponible desde la API"})
+        parametros = _versionar(tipo, datos["parametros"])
+        encolado = self.server.cola.encolar(tipo, parametros, datos.get("usuario") or "anonimo")
+        self._responder(200 if encolado["duplicado"] else 202, encolado)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path.rstrip("/") == "/trabajos":
+            usuario = parse_qs(url.query).get("usuario", [None])[0]
+            return self._responder(200, self.server.cola.listar(usuario))
+        m = re.fullmatch(r"/trabajos/(\d+)(/resultado)?/?", url.path)
+        if not m:
+            return self._responder(404, {"error": "Ruta no encontrada"})
+        datos = self.server.cola.estado(int(m.group(1)), con_resultado=bool(m.group(2)))
+        if datos is None:
+            return self._responder(404, {"error": "Trabajo no encontrado"})
+        if m.group(2) and datos["estado"] not in ("terminado", "error"):
+            return self._responder(409, {"error": "El trabajo todavía no terminó", "estado": datos["estado"]})
+        self._responder(200, datos)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class ServidorEvaluacion(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, cola: ColaTrabajos, manejadores=None):
+        super().__init__(direccion, ManejadorHTTP)
+        self.cola = cola
+        self.manejadores = MANEJADORES if manejadores is None else manejadores
+
+
+def crear_servicio(host: str = "127.0.0.1", puerto: int = 8000, workers: int = 2,
+                   db: str | Path = DB_POR_DEFECTO, manejadores=None) -> tuple[ServidorEvaluacion, Trabajadores]:
+    """Crea el servidor HTTP y arranca el pool de trabajadores sobre la cola persistente."""
+    # Los trabajos en curso de otros procesos se recuperan al vencer su plazo
+    cola = ColaTrabajos(db, recuperar_en_curso=False)
+    trabajadores = Trabajadores(cola, workers, manejadores)
+    trabajadores.iniciar()
+    return ServidorEvaluacion((host, puerto), cola, manejadores), trabajadores
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de scraping y evaluación.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Trabajos que se procesan en paralelo en este proceso (0 = solo trabajadores remotos)")
+    parser.add_argument("--db", default=str(DB_POR_DEFECTO), help="Archivo SQLite de la cola de trabajos")
+    args = parser.parse_args()
+
+    servidor, trabajadores = crear_servicio(args.host, args.puerto, args.workers, args.db)
+    print(f"Servicio escuchando en http://{args.host}:{args.puerto} con {args.workers} trabajadores")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        trabajadores.detener()
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from coincidencias import cargar_alias
+from cola_trabajos import DB_POR_DEFECTO, ColaTrabajos
+from rutas import CONFIG_DIR, DATA_INPUT, DATA_OUTPUT
+from scrap_masivo import EXTENSIONES_HTML, buscar_curso, guardar_entregas, resolver_destino
+from scraper import construir_evaluaciones, extraer_entregas
+
+# Convención de nombres: <curso>__<consigna>.html (curso = slug o id de estudiantes.json)
+SEPARADOR = "__"
+
+
+def destino_por_nombre(archivo: Path, mapeo: Dict[str, Dict[str, str]] | None = None) -> Optional[Tuple[str, str]]:
+    """Curso y consigna de un archivo: primero el mapeo explícito, luego la convención de nombres."""
+    if mapeo:
+        destino = resolver_destino(archivo, mapeo)
+        if destino is not None:
+            return destino
+    if SEPARADOR not in archivo.stem:
+        return None
+    curso, consigna = archivo.stem.split(SEPARADOR, 1)
+    return (curso, consigna) if curso and consigna else None
+
+
+def _cargar_lista(ruta: Path) -> List[Dict[str, Any]]:
+    if not ruta.exists():
+        return []
+    with ruta.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def entregas_nuevas(entregas: List[Dict[str, Any]], evaluadas: List[Dict[str, Any]]) -> List[str]:
+    """Nombres cuya resolución todavía no fue evaluada (nueva, modificada o sin calificación)."""
+    resoluciones_evaluadas = {e.get("nombre"): e.get("resolucion") for e in evaluadas if "calificacion" in e}
+    return [
+        e["nombre"] for e in entregas
+        if e["resolucion"] != "no realiza" and resoluciones_evaluadas.get(e["nombre"]) != e["resolucion"]
+    ]
+
+
+def en_trabajos_pendientes(cola: ColaTrabajos, archivo: str) -> Optional[Set[str]]:
+    """Nombres ya incluidos en trabajos ``evaluar`` pendientes de ``archivo`` (None = todos).
+
+    Un trabajo pendiente lee el ``_entregas.json`` al empezar, así que evaluará
+    la versión recién guardada; los que ya están en curso no cuentan.
+    """
+    nombres: Set[str] = set()
+    for trabajo in cola.buscar("evaluar", estado="pendiente", archivo=archivo):
+        if "solo" not in trabajo["parametros"]:
+            return None
+        nombres.update(trabajo["parametros"]["solo"])
+    return nombres
+
+
+def procesar_archivo(archivo: Path, cursos: List[Dict[str, Any]], cola: ColaTrabajos | None,
+                     mapeo: Dict[str, Dict[str, str]] | None = None, salida_dir: Path = DATA_OUTPUT,
+                     opciones: Dict[str, Any] | None = None, usuario: str = "vigilancia") -> Dict[str, Any] | None:
+    """Re-scrapea una exportación, actualiza su ``_entregas.json`` y encola solo lo nuevo."""
+    destino = destino_por_nombre(archivo, mapeo)
+    if destino is None:
+        return None
+    curso = buscar_curso(cursos, destino[0])
+    if curso is None:
+        raise ValueError(f"Curso desconocido para {archivo.name}: {destino[0]}")
+    consigna = destino[1]
+    estudiantes = curso.get("estudiantes", [])
+
+    html = archivo.read_text(encoding="utf-8")
+    slug = curso.get("slug", "default")
+    entregas = extraer_entregas(html, [e["nombre_crea"] for e in estudiantes], cargar_alias().get(slug, {}))
+    entregas_file = salida_dir / slug / f"{consigna}_entregas.json"
+    evaluaciones = guardar_entregas(entregas_file, construir_evaluaciones(estudiantes, entregas, consigna))
+
+    evaluadas = _cargar_lista(entregas_file.with_name(f"{consigna}_evaluaciones.json"))
+    nuevas = entregas_nuevas(evaluaciones, evaluadas)
+    archivo_cola = str(Path(slug) / entregas_file.name)
+    if cola is not None:
+        en_cola = en_trabajos_pendientes(cola, archivo_cola)
+        nuevas = [] if en_cola is None else [n for n in nuevas if n not in en_cola]
+    resultado: Dict[str, Any] = {"archivo": str(entregas_file), "nuevas": nuevas, "trabajo": None}
+    if nuevas and cola is not None:
+        resoluciones = {e["nombre"]: e["resolucion"] for e in evaluaciones if e["nombre"] in nuevas}
+        huella = hashlib.sha256(json.dumps(resoluciones, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        parametros = {
+            "archivo": archivo_cola,
+            "solo": sorted(nuevas),
+            # La huella evita encolar dos veces las mismas resoluciones
+            "huella": huella,
+            "opciones": opciones or {},
+        }
+        resultado["trabajo"] = cola.encolar("evaluar", parametros, usuario)
+    return resultado
+
+
+class Vigilante:
+    """Detecta archivos nuevos o modificados en una carpeta con antirrebote.
+
+    Un archivo se procesa cuando su tamaño y fecha de modificación dejan de
+    cambiar durante ``espera_s`` segundos (el navegador suele guardarlo en varias
+    escrituras). Si ``watchdog`` está instalado se usan eventos del sistema
+    (inotify) para despertar antes; si no, se sondea cada ``intervalo_s``.
+    """
+
+    def __init__(self, carpeta: Path, espera_s: float = 2.0, intervalo_s: float = 1.0):
+        self.carpeta = Path(carpeta)
+        self.espera_s = espera_s
+        self.intervalo_s = intervalo_s
+        self._vistos: Dict[Path, Tuple[int, int]] = {}
+        self._cambios: Dict[Path, Tuple[Tuple[int, int], float]] = {}
+
+    def revisar(self, ahora: float | None = None) -> List[Path]:
+        """Devuelve los archivos que cambiaron y ya están estables."""
+        ahora = time.monotonic() if ahora is None else ahora
+        listos = []
+        for archivo in sorted(self.carpeta.iterdir()):
+            if not archivo.is_file() or archivo.suffix.lower() not in EXTENSIONES_HTML:
+                continue
+            stat = archivo.stat()
+            firma = (stat.st_mtime_ns, stat.st_size)
+            if self._vistos.get(archivo) == firma:
+                continue
+            pendiente = self._cambios.get(archivo)
+            if pendiente is None or pendiente[0] != firma:
+                self._cambios[archivo] = (firma, ahora)
+            elif ahora - pendiente[1] >= self.espera_s:
+                del self._cambios[archivo]
+                self._vistos[archivo] = firma
+                listos.append(archivo)
+        return listos
+
+    def ejecutar(self, al_cambiar) -> None:
+        """Bucle principal: llama a ``al_cambiar(archivo)`` por cada archivo listo."""
+        import threading
+
+        despertar = threading.Event()
+        observador = None
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+
+            class _Manejador(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    despertar.set()
+
+            observador = Observer()
+            observador.schedule(_Manejador(), str(self.carpeta), recursive=False)
+            observador.start()
+        except ImportError:
+            pass
+
+        try:
+            while True:
+                for archivo in self.revisar():
+                    al_cambiar(archivo)
+                # Con cambios pendientes hay que volver a mirar al vencer la espera
+                despertar.wait(timeout=self.intervalo_s if observador is None or self._cambios else 30)
+                despertar.clear()
+        finally:
+            if observador is not None:
+                observador.stop()
+                observador.join()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vigila data/input y procesa automáticamente las exportaciones.")
+    parser.add_argument("--carpeta", default=str(DATA_INPUT))
+    parser.add_argument("--mapeo", help="JSON opcional de patrones a curso/consigna (ver scrap_masivo)")
+    parser.add_argument("--db", default=str(DB_POR_DEFECTO), help="Cola de trabajos compartida con servicio.py")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Evaluar también desde este proceso con N trabajadores (0 = solo encolar)")
+    parser.add_argument("--espera", type=float, default=2.0, help="Segundos sin cambios antes de procesar")
+    parser.add_argument("--cascada", action="store_true")
+    parser.add_argument("--reglas", action="store_true")
+    args = parser.parse_args()
+
+    mapeo = None
+    if args.mapeo:
+        with open(args.mapeo, "r", encoding="utf-8") as f:
+            mapeo = json.load(f)
+    with (CONFIG_DIR / "estudiantes.json").open("r", encoding="utf-8") as f:
+        cursos = json.load(f)
+
+    cola = ColaTrabajos(args.db, recuperar_en_curso=False)
+    if args.workers:
+        from servicio import Trabajadores
+
+        Trabajadores(cola, args.workers).iniciar()
+    opciones = {"cascada": args.cascada, "reglas": args.reglas}
+
+    def al_cambiar(archivo: Path) -> None:
+        try:
+            resultado = procesar_archivo(archivo, cursos, cola, mapeo, opciones=opciones)
+        except Exception as e:
+            print(f"{archivo.name}: error {e}")
+            return
+        if resultado is None:
+            print(f"{archivo.name}: no sigue la convención <curso>{SEPARADOR}<consigna>.html, se ignora")
+        elif resultado["trabajo"]:
+            print(f"{archivo.name}: {len(resultado['nuevas'])} entregas nuevas, trabajo {resultado['trabajo']['id']}")
+        else:
+            print(f"{archivo.name}: sin entregas nuevas")
+
+    print(f"Vigilando {args.carpeta} ...")
+    try:
+        Vigilante(Path(args.carpeta), espera_s=args.espera).ejecutar(al_cambiar)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,55 @@
+import json
+import sys
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import analitica
+
+
+def _evaluacion(nombre, tarea, detalle, resolucion="codigo"):
+    return {"nombre": nombre, "tarea": tarea, "resolucion": resolucion,
+            "calificacion": {"total": sum(detalle), "detalle": detalle}, "comentarios": ""}
+
+
+def _escribir(tmp_path):
+    curso = tmp_path / "curso_a"
+    curso.mkdir()
+    (curso / "t1_evaluaciones.json").write_text(json.dumps([
+        _evaluacion("Ana", "t1", [8, 6, 6, 4]),
+        _evaluacion("Beto", "t1", [0, 0, 0, 0], "no realiza"),
+    ]))
+    (curso / "t2_evaluaciones.json").write_text(json.dumps([
+        _evaluacion("Ana", "t2", [4, 3, 3, 2]),
+        _evaluacion("Beto", "t2", [6, 4, 4, 2]),
+    ]))
+
+
+def test_resumenes(tmp_path):
+    _escribir(tmp_path)
+    df = analitica.cargar_evaluaciones(tmp_path, usar_cache=False)
+    assert len(df) == 4
+
+    estudiantes = analitica.resumen_estudiantes(df).set_index("nombre")
+    assert estudiantes.loc["Ana", "promedio"] == 18
+    assert estudiantes.loc["Beto", "entregas"] == 1
+
+    tareas = analitica.resumen_tareas(df).set_index("tarea")
+    assert tareas.loc["t1", "count"] == 1
+    assert tareas.loc["t1", "tasa_entrega"] == 0.5
+
+    criterios = analitica.resumen_criterios(df).set_index("criterio")
+    assert criterios.loc["comprension", "max"] == 8
+
+
+def test_cache_se_invalida_con_mtime(tmp_path):
+    _escribir(tmp_path)
+    df = analitica.cargar_evaluaciones(tmp_path)
+    assert list((tmp_path / ".cache").glob("*.parquet"))
+
+    archivo = tmp_path / "curso_a" / "t2_evaluaciones.json"
+    archivo.write_text(json.dumps([_evaluacion("Ana", "t2", [1, 1, 1, 1])]))
+    df = analitica.cargar_evaluaciones(tmp_path)
+    assert len(df) == 3
+    assert len(list((tmp_path / ".cache").glob("*.parquet"))) == 1
@@ -0,0 +1,58 @@
+import random
+import sys
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from carga import entregas_sinteticas, prueba_carga
+from openai_falso import crear_servidor_falso
+
+
+def _fallas_esperadas(tasa, semilla, exitos):
+    """Fallas que sortea el servidor falso (una sola tasa activa) hasta acumular ``exitos`` respuestas."""
+    azar = random.Random(semilla)
+    fallas = []
+    for _ in range(exitos):
+        fallas.append(0)
+        while azar.random() < tasa:
+            fallas[-1] += 1
+    return fallas
+
+
+def _cargar(concurrencias, **config):
+    servidor = crear_servidor_falso(distribucion="uniforme", latencia_media_s=0.01, **config)
+    try:
+        # Reintentos de sobra: ninguna entrega agota los suyos con los 429 de la semilla
+        return prueba_carga(entregas_sinteticas(20), servidor.url, concurrencias, max_reintentos=10), servidor
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_prueba_carga_absorbe_los_429_con_reintentos():
+    resultados, servidor = _cargar([1, 4], tasa_429=0.2, reintentar_en_ms=1, semilla=3)
+
+    rechazos = sum(_fallas_esperadas(0.2, 3, 40))
+    assert rechazos > 0
+    assert servidor.estadisticas == {"solicitudes": 40 + rechazos, "rechazadas_429": rechazos, "malformadas": 0}
+    assert [r["concurrencia"] for r in resultados] == [1, 4]
+    for r in resultados:
+        assert r["exitosas"] == 20 and r["errores"] == {}
+        assert r["llamadas"] == 20
+        assert 0 < r["p50_s"] <= r["p95_s"] <= r["p99_s"]
+        assert r["entregas_por_s"] > 0
+
+
+def test_prueba_carga_cuenta_las_respuestas_malformadas():
+    resultados, servidor = _cargar([1, 4], tasa_malformada=0.25, semilla=7)
+
+    # Cada solicitud sortea una vez: el primer nivel usa los 20 primeros sorteos y el segundo los siguientes
+    azar = random.Random(7)
+    malformadas = [sum(azar.random() < 0.25 for _ in range(20)) for _ in resultados]
+    assert 0 < sum(malformadas) < 40
+    assert servidor.estadisticas["malformadas"] == sum(malformadas)
+    for r, esperadas in zip(resultados, malformadas):
+        assert r["errores"] == {"JSONDecodeError": esperadas}
+        assert r["exitosas"] == 20 - esperadas
+        assert r["p50_s"] <= r["p95_s"] <= r["p99_s"]
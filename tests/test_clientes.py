@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import clientes
+
+
+@pytest.fixture(autouse=True)
+def registro_limpio(monkeypatch):
+    monkeypatch.setattr(clientes, "_entorno_cargado", True)
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    yield
+    clientes.cerrar_clientes()
+
+
+def test_reutiliza_cliente_por_configuracion(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    a = clientes.obtener_cliente()
+    assert clientes.obtener_cliente() is a
+    assert clientes.obtener_cliente(max_conexiones=5) is not a
+    assert clientes.obtener_cliente(base_url="http://127.0.0.1:9/v1") is not a
+
+
+def test_sin_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(ValueError):
+        clientes.obtener_cliente()
+    # Los servidores locales no requieren clave
+    assert clientes.obtener_cliente(base_url="http://127.0.0.1:9/v1")
+
+
+def test_calentar_solo_al_crear(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    llamadas = []
+    monkeypatch.setattr(clientes, "calentar", lambda client: llamadas.append(client))
+    a = clientes.obtener_cliente(calentar_conexion=True)
+    clientes.obtener_cliente(calentar_conexion=True)
+    assert llamadas == [a]
+
+
+def test_calentar_en_segundo_plano_no_bloquea(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    liberar = clientes.threading.Event()
+    llamadas = []
+
+    def calentar_lento(client):
+        liberar.wait(5)
+        llamadas.append(client.max_retries)
+
+    monkeypatch.setattr(clientes, "calentar", calentar_lento)
+    clientes.obtener_cliente(calentar_conexion=True, en_segundo_plano=True)
+    assert llamadas == []
+    liberar.set()
+    hilo = next(h for h in clientes.threading.enumerate() if h.name == "calentar-openai")
+    hilo.join(5)
+    assert llamadas == [0]
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from coincidencias import cargar_alias, confirmar_alias, normalizar, sugerir_coincidencias
+from scraper import asignar_entregas
+
+
+def test_normalizar_quita_tildes_parentesis_y_orden():
+    assert normalizar("NÉSTOR BENTABERRY (Néstor)") == normalizar("Bentaberry, Néstor")
+    assert normalizar("Micaela Benítez") == "BENITEZ MICAELA"
+
+
+def test_sugerir_coincidencias_asigna_sin_repetir():
+    autores = ["Nestor Bentaberry", "Romina Acosta", "Persona Desconocida"]
+    nombres = ["Romina Yanet ACOSTA CENTURIÓN", "NÉSTOR BENTABERRY (Néstor)", "MIRIAM CECILIA ALVES ALVEZ"]
+    sugerencias = {s["autor"]: s for s in sugerir_coincidencias(autores, nombres)}
+    assert sugerencias["Nestor Bentaberry"]["nombre_crea"] == "NÉSTOR BENTABERRY (Néstor)"
+    assert sugerencias["Romina Acosta"]["nombre_crea"] == "Romina Yanet ACOSTA CENTURIÓN"
+    assert sugerencias["Persona Desconocida"]["nombre_crea"] is None
+
+
+def test_alias_confirmados_se_usan_como_coincidencia_exacta(tmp_path):
+    ruta = tmp_path / "alias.json"
+    confirmar_alias("curso_a", {"Nestor Bentaberry": "NÉSTOR BENTABERRY (Néstor)"}, ruta)
+    alias = cargar_alias(ruta)["curso_a"]
+    entregas, sin_coincidencia = asignar_entregas(
+        {"Nestor Bentaberry": "hola", "Otro": "x"}, ["NÉSTOR BENTABERRY (Néstor)"], alias)
+    assert entregas == {"NÉSTOR BENTABERRY (Néstor)": "hola"}
+    assert sin_coincidencia == ["Otro"]
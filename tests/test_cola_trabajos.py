@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from cola_trabajos import ColaTrabajos
+
+
+def test_deduplica_y_reintenta_fallidos(tmp_path):
+    cola = ColaTrabajos(tmp_path / "cola.db")
+    a = cola.encolar("evaluar", {"archivo": "x.json"}, "ana")
+    b = cola.encolar("evaluar", {"archivo": "x.json"}, "beto")
+    assert b == {"id": a["id"], "estado": "pendiente", "duplicado": True}
+
+    trabajo = cola.tomar()
+    cola.terminar(trabajo["id"], error="falló")
+    c = cola.encolar("evaluar", {"archivo": "x.json"}, "ana")
+    assert c["id"] == a["id"] and not c["duplicado"]
+    assert cola.estado(a["id"])["estado"] == "pendiente"
+
+
+def test_reparto_justo_entre_usuarios(tmp_path):
+    cola = ColaTrabajos(tmp_path / "cola.db")
+    for i in range(3):
+        cola.encolar("evaluar", {"n": i}, "ana")
+    cola.encolar("evaluar", {"n": 99}, "beto")
+
+    primero = cola.tomar()
+    segundo = cola.tomar()
+    assert primero["usuario"] == "ana"
+    # Ana ya tiene un trabajo en curso: le toca a Beto aunque su trabajo sea más nuevo
+    assert segundo["usuario"] == "beto"
+
+
+def test_persistencia_reencola_en_curso(tmp_path):
+    ruta = tmp_path / "cola.db"
+    cola = ColaTrabajos(ruta)
+    id_trabajo = cola.encolar("scrap", {"html": "<p/>"})["id"]
+    cola.tomar()
+    cola.cerrar()
+
+    cola = ColaTrabajos(ruta)
+    assert cola.estado(id_trabajo)["estado"] == "pendiente"
+    cola.terminar(cola.tomar()["id"], {"ok": True})
+    assert cola.estado(id_trabajo, con_resultado=True)["resultado"] == {"ok": True}
+
+
+def test_lease_vencido_se_retoma_y_resultado_tardio_se_descarta(tmp_path):
+    cola = ColaTrabajos(tmp_path / "cola.db", max_intentos=2)
+    id_trabajo = cola.encolar("evaluar", {"n": 1})["id"]
+
+    primero = cola.tomar("w1", lease_s=0)
+    assert primero["intentos"] == 1
+    # w1 dejó de latir: el trabajo vuelve a estar disponible
+    segundo = cola.tomar("w2", lease_s=60)
+    assert segundo["id"] == id_trabajo and segundo["intentos"] == 2
+    assert not cola.renovar(id_trabajo, "w1")
+    assert cola.renovar(id_trabajo, "w2")
+
+    assert cola.terminar(id_trabajo, {"de": "w2"}, trabajador="w2")
+    assert not cola.terminar(id_trabajo, {"de": "w1"}, trabajador="w1")
+    assert cola.estado(id_trabajo, con_resultado=True)["resultado"] == {"de": "w2"}
+
+
+def test_agota_intentos_si_el_trabajador_muere_siempre(tmp_path):
+    cola = ColaTrabajos(tmp_path / "cola.db", max_intentos=2)
+    id_trabajo = cola.encolar("evaluar", {"n": 1})["id"]
+    cola.tomar("w1", lease_s=0)
+    cola.tomar("w2", lease_s=0)
+    assert cola.tomar("w3") is None
+    assert cola.estado(id_trabajo)["error"] == "Se agotaron los intentos"
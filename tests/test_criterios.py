@@ -0,0 +1,157 @@
+import copy
+import json
+import sys
+import threading
+import types
+from pathlib import Path
+
+import pytest
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import criterios
+from criterios import CacheCriterios, cargar_rubrica, evaluar_por_criterios
+import evaluar_chat
+from evaluar_chat import evaluar_entregas, nuevo_reporte
+from planificador import planificar
+
+ENTREGAS = [
+    {"nombre": "A", "enunciado": "Sumar dos números", "resolucion": "print(int(input()) + int(input()))"},
+    {"nombre": "B", "enunciado": "Sumar dos números", "resolucion": "print(2)"},
+]
+
+
+class ClienteCriterios:
+    """Responde a cada criterio con su máximo menos uno y registra qué criterios se pidieron."""
+
+    def __init__(self, rubrica, invalido=None):
+        self.rubrica = rubrica
+        self.invalido = invalido
+        self.pedidos = []
+        self._lock = threading.Lock()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        criterio = next(c for c in self.rubrica["criterios"] if f'"{c["nombre"]}"' in messages[0]["content"])
+        with self._lock:
+            self.pedidos.append(criterio["id"])
+        puntaje = 99 if criterio["id"] == self.invalido else criterio["maximo"] - 1
+        contenido = json.dumps({"puntaje": puntaje, "comentario": f"bien en {criterio['id']}"})
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=contenido))],
+            usage=types.SimpleNamespace(prompt_tokens=200, completion_tokens=20),
+        )
+
+
+def _usar_rubrica(monkeypatch, rubrica):
+    monkeypatch.setattr(criterios, "cargar_rubrica", lambda id_rubrica=None: rubrica)
+
+
+def test_evalua_cada_criterio_y_suma(tmp_path):
+    rubrica = cargar_rubrica()
+    client = ClienteCriterios(rubrica)
+    entregas = copy.deepcopy(ENTREGAS)
+    reporte = nuevo_reporte()
+    evaluar_entregas(entregas, client=client, reporte=reporte, por_criterio={"cache": tmp_path / "c.sqlite3"})
+
+    maximos = [c["maximo"] for c in rubrica["criterios"]]
+    assert entregas[0]["calificacion"] == {"total": sum(maximos) - 4, "detalle": [m - 1 for m in maximos]}
+    assert entregas[0]["comentarios"].splitlines()[0] == f"{rubrica['criterios'][0]['nombre']}: bien en comprension"
+    assert len(client.pedidos) == 8 and reporte["llamadas"] == 8
+    assert reporte["entregas"] == 2 and reporte["criterios_evaluados"] == 8
+
+
+def test_stream_avisa_cada_nota_por_criterio_una_vez(tmp_path):
+    avisos = []
+    entregas = copy.deepcopy(ENTREGAS)
+    evaluar_entregas(entregas, client=ClienteCriterios(cargar_rubrica()), reporte=nuevo_reporte(), stream=True,
+                     al_calificar=lambda nombre, calificacion: avisos.append((nombre, calificacion)),
+                     por_criterio={"cache": tmp_path / "c.sqlite3"})
+    assert avisos == [(e["nombre"], e["calificacion"]) for e in entregas]
+
+
+def test_plan_por_criterio_considera_los_trabajadores(tmp_path):
+    limites = {"rpm": 1_000_000, "tpm": 1_000_000_000}
+    planes = [planificar(ENTREGAS * 10, por_criterio={"cache": tmp_path / "c.sqlite3", "workers": w}, limites=limites)
+              for w in (1, 8)]
+    assert planes[0]["solicitudes"] == planes[1]["solicitudes"] == 80
+    assert planes[1]["segundos_estimados"] == pytest.approx(planes[0]["segundos_estimados"] / 8)
+
+
+def test_editar_un_criterio_solo_recalcula_ese(tmp_path, monkeypatch):
+    rubrica = copy.deepcopy(cargar_rubrica())
+    _usar_rubrica(monkeypatch, rubrica)
+    cache = CacheCriterios(tmp_path / "c.sqlite3")
+    config = {**criterios.POR_CRITERIO_POR_DEFECTO, "cache": cache}
+    evaluar_por_criterios(ClienteCriterios(rubrica), copy.deepcopy(ENTREGAS), config, nuevo_reporte())
+
+    rubrica["criterios"][3]["maximo"] = 10
+    client = ClienteCriterios(rubrica)
+    assert planificar(ENTREGAS, por_criterio=config)["criterios_desde_cache"] == 6
+    entregas = copy.deepcopy(ENTREGAS)
+    reporte = nuevo_reporte()
+    evaluar_por_criterios(client, entregas, config, reporte)
+
+    assert client.pedidos == ["estrategias", "estrategias"]
+    assert reporte["criterios_desde_cache"] == 6
+    assert entregas[1]["calificacion"]["detalle"][3] == 9
+    assert entregas[1]["calificacion"]["total"] == 7 + 5 + 5 + 9
+
+    # Cambiar la resolución invalida todos los criterios de esa entrega
+    entregas[1]["resolucion"] = "print(3)"
+    client = ClienteCriterios(rubrica)
+    evaluar_por_criterios(client, entregas, config, nuevo_reporte())
+    assert len(client.pedidos) == 4
+
+
+def test_puntaje_invalido_reintenta_con_prompt_completo(tmp_path, monkeypatch):
+    rubrica = cargar_rubrica()
+    client = ClienteCriterios(rubrica, invalido="estructura")
+    completos = []
+    monkeypatch.setattr(
+        "evaluar_chat.evaluar_con_chat",
+        lambda client, nombre, enunciado, resolucion: completos.append(nombre)
+        or {"calificacion": {"total": 3, "detalle": [1, 1, 1, 0]}, "comentarios": "ok"},
+    )
+    entregas = copy.deepcopy(ENTREGAS[:1])
+    reporte = nuevo_reporte()
+    evaluar_entregas(entregas, client=client, reporte=reporte, por_criterio={"cache": tmp_path / "c.sqlite3"})
+
+    assert completos == ["A"]
+    assert entregas[0]["calificacion"]["total"] == 3
+    assert reporte["reintentos_individuales"] == 1
+    # Los criterios válidos quedaron en caché; el inválido no
+    client = ClienteCriterios(rubrica)
+    evaluar_por_criterios(client, copy.deepcopy(ENTREGAS[:1]),
+                          {**criterios.POR_CRITERIO_POR_DEFECTO, "cache": tmp_path / "c.sqlite3"}, nuevo_reporte())
+    assert client.pedidos == ["estructura"]
+
+
+def test_prompt_completo_de_respaldo_usa_la_rubrica_elegida(tmp_path, monkeypatch):
+    rubrica = copy.deepcopy(cargar_rubrica())
+    rubrica["criterios"][2]["maximo"] = 10
+    rubrica["criterios"].append({"id": "documentacion", "nombre": "Documentación", "maximo": 2, "escala": []})
+    monkeypatch.setattr(criterios, "cargar_rubrica", lambda id_rubrica=None: rubrica)
+    monkeypatch.setattr(evaluar_chat, "cargar_rubrica", lambda id_rubrica=None: rubrica)
+    prompts = []
+
+    def completo(client, nombre, enunciado, resolucion, pruebas=None, rubrica=None):
+        prompts.append(evaluar_chat.mensajes_entrega(nombre, enunciado, resolucion, rubrica=rubrica)[0]["content"])
+        return {"calificacion": {"total": 11, "detalle": [4, 3, 2, 1, 1]}, "comentarios": "ok"}
+
+    monkeypatch.setattr(evaluar_chat, "evaluar_con_chat", completo)
+    entregas = copy.deepcopy(ENTREGAS[:1])
+    entregas[0]["pruebas"] = {"aprobadas": 1, "ejecutadas": 2, "total": 2, "casos": []}
+    evaluar_entregas(entregas, client=ClienteCriterios(rubrica, invalido="estructura"), reporte=nuevo_reporte(),
+                     por_criterio={"cache": tmp_path / "c.sqlite3", "rubrica": "otra"})
+
+    assert "3. Funcionalidad y Exactitud (máx. 10 puntos)" in prompts[0]
+    assert "5. Documentación (máx. 2 puntos)" in prompts[0] and '"maxItems": 5' in prompts[0]
+    # Las pruebas fijan la Funcionalidad con el máximo de esa rúbrica
+    assert entregas[0]["calificacion"] == {"total": 14, "detalle": [4, 3, 5, 1, 1]}
+    maximos = criterios.maximos_rubrica(rubrica)
+    assert evaluar_chat.validar_resultado({"calificacion": {"total": 19, "detalle": [8, 6, 2, 1, 2]},
+                                           "comentarios": ""}, maximos) == []
+    assert evaluar_chat.validar_resultado({"calificacion": {"total": 19, "detalle": [8, 6, 2, 1, 2]},
+                                           "comentarios": ""}) == ["detalle inválido"]
@@ -0,0 +1,52 @@
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import servicio
+from distribuido import TIPO_ENTREGA, ColaRemota, publicar_entregas, recolectar
+
+
+def _evaluar_falso(parametros):
+    entrega = parametros["entrega"]
+    return {"nombre": entrega["nombre"], "calificacion": {"total": len(entrega["resolucion"]), "detalle": []},
+            "comentarios": threading.current_thread().name}
+
+
+def test_trabajadores_remotos_evaluan_y_se_recolecta(tmp_path):
+    (tmp_path / "t1_entregas.json").write_text(json.dumps([
+        {"nombre": "A", "resolucion": "uno"},
+        {"nombre": "B", "resolucion": "no realiza"},
+        {"nombre": "C", "resolucion": "tres!"},
+    ]), encoding="utf-8")
+    manejadores = {TIPO_ENTREGA: _evaluar_falso}
+    servidor, local = servicio.crear_servicio(puerto=0, workers=0, db=tmp_path / "cola.db", manejadores=manejadores)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    remota = ColaRemota(f"http://127.0.0.1:{servidor.server_address[1]}")
+    remotos = [servicio.Trabajadores(remota, 2, manejadores, lease_s=5, tipos=[TIPO_ENTREGA]) for _ in range(2)]
+    try:
+        conteo = publicar_entregas(remota, "t1_entregas.json", salida_dir=tmp_path)
+        assert conteo == {"publicadas": 2, "duplicadas": 0, "sin_entrega": 1}
+        assert publicar_entregas(remota, "t1_entregas.json", salida_dir=tmp_path)["duplicadas"] == 2
+
+        for trabajadores in remotos:
+            trabajadores.iniciar()
+        for _ in range(100):
+            resumen = recolectar(servidor.cola, "t1_entregas.json", salida_dir=tmp_path)
+            if resumen["pendientes"] == 0:
+                break
+            time.sleep(0.05)
+    finally:
+        for trabajadores in remotos:
+            trabajadores.detener()
+        servidor.shutdown()
+        servidor.server_close()
+        local.detener()
+
+    assert resumen["evaluadas"] == 2 and resumen["errores"] == []
+    guardadas = json.loads((tmp_path / "t1_evaluaciones.json").read_text(encoding="utf-8"))
+    assert [e["calificacion"]["total"] if "calificacion" in e else None for e in guardadas] == [3, None, 5]
@@ -0,0 +1,62 @@
+import json
+import sys
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import ejecucion
+
+CASOS = [
+    {"nombre": "suma", "entrada": "2\n3\n", "salida_regex": r"\b5\b"},
+    {"nombre": "saludo", "entrada": "2\n3\n", "salida_regex": "hola"},
+]
+
+
+def test_url_codigo():
+    assert ejecucion.url_codigo("https://github.com/u/r/blob/main/a%20b.ipynb") == \
+        "https://raw.githubusercontent.com/u/r/main/a%20b.ipynb"
+    assert ejecucion.url_codigo("https://gitlab.com/g/p/-/blob/main/t.py") == "https://gitlab.com/g/p/-/raw/main/t.py"
+    assert ejecucion.url_codigo("https://gitlab.com/g/p/-/tree/main") is None
+
+
+def test_codigo_notebook_omite_magicos():
+    nb = {"cells": [
+        {"cell_type": "markdown", "source": ["# titulo"]},
+        {"cell_type": "code", "source": ["!pip install x\n", "print(1)\n"]},
+    ]}
+    assert ejecucion.codigo_notebook(json.dumps(nb)) == "print(1)"
+
+
+def test_ejecutar_pruebas():
+    codigo = "a = int(input())\nb = int(input())\nprint(a + b)\n"
+    programas = ejecucion.extraer_codigo(f"Mi solución:\n```python\n{codigo}```", descargar=False)
+    res = ejecucion.ejecutar_pruebas(programas, CASOS)
+    assert res["aprobadas"] == 1
+    assert [c["ok"] for c in res["casos"]] == [True, False]
+    assert ejecucion.pruebas_concluyentes(res)
+
+    # Un programa que pide más entradas de las que recibe no cuenta como ejecutado
+    res = ejecucion.ejecutar_pruebas(["a = input()\nb = input()\nc = input()\n"], CASOS)
+    assert res["ejecutadas"] == 0 and not ejecucion.pruebas_concluyentes(res)
+
+
+def test_salida_regex_abarca_varias_lineas():
+    caso = {"nombre": "orden", "entrada": "", "salida_regex": "apio.*brocoli.*cebolla"}
+    res = ejecucion.ejecutar_pruebas(["for p in ['apio', 'brocoli', 'cebolla']:\n    print(p)\n"], [caso])
+    assert res["aprobadas"] == 1
+
+
+def test_ejecutar_aislado_limita_tiempo():
+    res = ejecucion.ejecutar_aislado("while True: pass", limites={"cpu_s": 1, "tiempo_s": 5})
+    assert res["codigo_salida"] != 0
+    assert res["error"]
+
+
+def test_adjuntar_pruebas_sin_codigo():
+    datos = [{"nombre": "A", "resolucion": "lo subo mañana", "tarea": "t"},
+             {"nombre": "B", "resolucion": "no realiza", "tarea": "t"}]
+    ejecucion.adjuntar_pruebas(datos, casos={"t": CASOS}, descargar=False)
+    assert datos[0]["pruebas"]["aprobadas"] == 0
+    assert "error" in datos[0]["pruebas"]
+    assert "pruebas" not in datos[1]
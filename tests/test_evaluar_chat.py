@@ -35,3 +35,258 @@ def test_evaluar_entregas(monkeypatch, tmp_path):
     evaluar_chat.evaluate_file(input_file, output_file)
     saved = json.loads(output_file.read_text())
     assert saved[0]["calificacion"]["total"] == 5
+
+
+class FakeClient:
+    """Cliente mínimo que responde según el modelo solicitado."""
+
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.modelos = []
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        self.modelos.append(model)
+        contenido = self.respuestas[model]
+        if callable(contenido):
+            contenido = contenido(messages)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=contenido))],
+            usage=types.SimpleNamespace(prompt_tokens=1000, completion_tokens=100),
+        )
+
+
+def _respuesta(detalle, **extra):
+    return json.dumps({"nombre": "A", "calificacion": {"total": sum(detalle), "detalle": detalle},
+                       "comentarios": "ok", **extra})
+
+
+def test_cascada_no_escala_si_confia():
+    client = FakeClient({evaluar_chat.MODELO_RAPIDO: _respuesta([8, 6, 5, 4], confianza=0.9)})
+    datos = [{"nombre": "A", "resolucion": "https://github.com/a/b/blob/main/t.py", "tarea": "t"}]
+    reporte = evaluar_chat.nuevo_reporte()
+
+    res = evaluar_chat.evaluar_entregas(datos, client=client, cascada=True, reporte=reporte)
+
+    assert res[0]["calificacion"]["total"] == 23
+    assert "confianza" not in res[0]
+    assert client.modelos == [evaluar_chat.MODELO_RAPIDO]
+    assert reporte["escaladas"] == 0
+    assert evaluar_chat.resumir_reporte(reporte)["ahorro_usd"] > 0
+
+
+def test_cascada_escala_por_esquema_y_borde():
+    client = FakeClient({
+        evaluar_chat.MODELO_RAPIDO: lambda messages: (
+            "no es json" if "A1" in messages[1]["content"] else _respuesta([4, 3, 3, 2], confianza=0.95)
+        ),
+        evaluar_chat.MODELO_PRINCIPAL: _respuesta([8, 6, 6, 4]),
+    })
+    datos = [
+        {"nombre": "A1", "resolucion": "def f(): pass", "tarea": "t"},
+        {"nombre": "A2", "resolucion": "def g(): pass", "tarea": "t"},
+    ]
+    reporte = evaluar_chat.nuevo_reporte()
+
+    evaluar_chat.evaluar_entregas(datos, client=client, cascada=True, reporte=reporte)
+
+    assert reporte["escaladas"] == 2
+    assert reporte["motivos_escalado"] == {"respuesta no es JSON": 1, "total en el borde": 1}
+    assert all(d["calificacion"]["total"] == 24 for d in datos)
+    assert evaluar_chat.resumir_reporte(reporte)["tasa_escalado"] == 1.0
+
+
+def test_validar_resultado():
+    assert evaluar_chat.validar_resultado(json.loads(_respuesta([8, 6, 6, 4]))) == []
+    errores = evaluar_chat.validar_resultado({"calificacion": {"total": 30, "detalle": [9, 6, 6, 4]},
+                                              "comentarios": ""})
+    assert "puntaje fuera de rango" in errores
+    assert "total distinto de la suma del detalle" in errores
+
+
+def test_aplicar_pruebas_fija_funcionalidad():
+    calificacion = {"total": 20, "detalle": [8, 6, 2, 4]}
+    pruebas = {"aprobadas": 4, "ejecutadas": 4, "total": 4, "casos": []}
+    assert evaluar_chat.aplicar_pruebas(calificacion, pruebas) == {"total": 24, "detalle": [8, 6, 6, 4]}
+    # Si algún caso terminó con error (p. ej. EOFError al leer la entrada) decide el modelo
+    con_fallas = {"aprobadas": 1, "ejecutadas": 1, "total": 4, "casos": []}
+    assert evaluar_chat.aplicar_pruebas(calificacion, con_fallas) == calificacion
+    # Sin código ejecutable se respeta la nota del modelo
+    sin_codigo = {"aprobadas": 0, "total": 4, "casos": [], "error": "no se encontró código ejecutable"}
+    assert evaluar_chat.aplicar_pruebas(calificacion, sin_codigo) == calificacion
+
+
+def test_reglas_ahorran_llamadas(monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(evaluar_chat, "evaluar_con_chat",
+                        lambda client, nombre, enunciado, resolucion, **kw: llamadas.append(nombre) or
+                        {"calificacion": {"total": 5, "detalle": [2, 1, 1, 1]}, "comentarios": "ok"})
+    datos = [
+        {"nombre": "A", "resolucion": "Resolví los cuatro desafíos usando listas y sorted(). " * 2, "tarea": "t"},
+        {"nombre": "B", "resolucion": "ok", "tarea": "t"},
+        {"nombre": "C", "resolucion": "no realiza", "tarea": "t"},
+    ]
+    reporte = evaluar_chat.nuevo_reporte()
+    evaluar_chat.evaluar_entregas(datos, client="client", reporte=reporte,
+                                  reglas={"verificar_enlaces": False, "reglas_regex": []})
+
+    assert llamadas == ["A"]
+    assert datos[1]["regla"] == "vacia"
+    assert datos[1]["calificacion"]["total"] == 0
+    assert reporte["omitidas_por_reglas"] == 1
+    assert reporte["sin_entrega"] == 1
+
+
+def test_empaquetado_con_reintento_individual():
+    def responder(messages):
+        if messages[0]["content"] == evaluar_chat.SYSTEM_PROMPT_LOTE:
+            # El modelo omite a "C" y devuelve un resultado inválido para "B"
+            return json.dumps({"resultados": [
+                {"nombre": "A", "calificacion": {"total": 10, "detalle": [4, 3, 2, 1]}, "comentarios": "a"},
+                {"nombre": "B", "calificacion": {"total": 99, "detalle": [4, 3, 2, 1]}, "comentarios": "b"},
+            ]})
+        return _respuesta([1, 1, 1, 1])
+
+    client = FakeClient({evaluar_chat.MODELO_PRINCIPAL: responder})
+    datos = [{"nombre": n, "resolucion": f"respuesta corta de {n}", "tarea": "t"} for n in "ABC"]
+    datos.append({"nombre": "D", "resolucion": "x" * 4000, "tarea": "t"})
+    reporte = evaluar_chat.nuevo_reporte()
+
+    evaluar_chat.evaluar_entregas(datos, client=client, empaquetar=True, reporte=reporte)
+
+    assert [d["calificacion"]["total"] for d in datos] == [10, 4, 4, 4]
+    assert reporte["lotes"] == 1
+    assert reporte["entregas_en_lotes"] == 1
+    assert reporte["reintentos_individuales"] == 2
+    assert reporte["llamadas"] == 4
+
+
+def test_empaquetado_con_cascada_usa_el_modelo_rapido():
+    def lote_rapido(messages):
+        assert messages[0]["content"] == evaluar_chat.SYSTEM_PROMPT_LOTE
+        return json.dumps({"resultados": [
+            {"nombre": "A", "calificacion": {"total": 22, "detalle": [8, 6, 4, 4]}, "comentarios": "a",
+             "confianza": 0.9},
+            # Confianza baja: se escala directo al modelo principal
+            {"nombre": "B", "calificacion": {"total": 20, "detalle": [8, 6, 2, 4]}, "comentarios": "b",
+             "confianza": 0.2},
+        ]})
+
+    client = FakeClient({evaluar_chat.MODELO_RAPIDO: lote_rapido,
+                         evaluar_chat.MODELO_PRINCIPAL: _respuesta([8, 6, 6, 4])})
+    datos = [{"nombre": n, "resolucion": f"print('{n}')", "tarea": "t"} for n in "AB"]
+    reporte = evaluar_chat.nuevo_reporte()
+
+    evaluar_chat.evaluar_entregas(datos, client=client, cascada=True, empaquetar=True, reporte=reporte)
+
+    assert client.modelos == [evaluar_chat.MODELO_RAPIDO, evaluar_chat.MODELO_PRINCIPAL]
+    assert [d["calificacion"]["total"] for d in datos] == [22, 24]
+    assert reporte["escaladas"] == 1 and reporte["motivos_escalado"] == {"confianza baja": 1}
+    assert evaluar_chat.resumir_reporte(reporte)["tasa_escalado"] == 0.5
+
+
+def test_empaquetado_con_stream_notifica_cada_nota():
+    resultados = [{"nombre": n, "calificacion": {"total": 10, "detalle": [4, 3, 2, 1]}, "comentarios": n}
+                  for n in "AB"]
+    client = FakeClient({evaluar_chat.MODELO_PRINCIPAL: json.dumps({"resultados": resultados})})
+    datos = [{"nombre": n, "resolucion": f"respuesta corta de {n}", "tarea": "t"} for n in "AB"]
+    notas = []
+    evaluar_chat.evaluar_entregas(datos, client=client, empaquetar=True, stream=True,
+                                  al_calificar=lambda nombre, c: notas.append((nombre, c["total"])))
+    assert notas == [("A", 10), ("B", 10)]
+
+
+def test_armar_lotes_respeta_limites():
+    datos = [{"nombre": str(i), "resolucion": "corta", "tarea": "t"} for i in range(5)]
+    lotes = evaluar_chat.armar_lotes(datos, {**evaluar_chat.EMPAQUETADO_POR_DEFECTO, "max_por_lote": 2})
+    assert [len(l) for l in lotes] == [2, 2, 1]
+
+
+class FakeStreamClient:
+    """Cliente que devuelve la respuesta en fragmentos como la API en modo stream."""
+
+    def __init__(self, texto, tam=5):
+        self.texto = texto
+        self.tam = tam
+        self.leidos = 0
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        assert stream
+
+        def chunks():
+            for i in range(0, len(self.texto), self.tam):
+                self.leidos += 1
+                delta = types.SimpleNamespace(content=self.texto[i:i + self.tam])
+                yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+            yield types.SimpleNamespace(choices=[], usage=types.SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+
+        return chunks()
+
+
+def test_stream_emite_calificacion_y_registra_ttft():
+    client = FakeStreamClient(_respuesta([8, 6, 6, 4]))
+    notas = []
+    datos = [{"nombre": "A", "resolucion": "print(1)", "tarea": "t"}]
+    reporte = evaluar_chat.nuevo_reporte()
+
+    evaluar_chat.evaluar_entregas(datos, client=client, stream=True, reporte=reporte,
+                                  al_calificar=lambda nombre, c: notas.append((nombre, c["total"])))
+
+    assert notas == [("A", 24)]
+    assert datos[0]["calificacion"]["total"] == 24
+    assert len(reporte["ttft_s"]) == 1
+    assert reporte["prompt_tokens"] == 10
+
+
+def test_stream_con_texto_antes_del_json_se_evalua():
+    client = FakeStreamClient("Aquí tienes la evaluación:\n```json\n" + _respuesta([8, 6, 6, 4]) + "\n```")
+    notas = []
+    datos = [{"nombre": "A", "resolucion": "print(1)", "tarea": "t"}]
+    evaluar_chat.evaluar_entregas(datos, client=client, stream=True,
+                                  al_calificar=lambda nombre, c: notas.append((nombre, c["total"])))
+    assert datos[0]["calificacion"]["total"] == 24
+    assert notas == [("A", 24)]
+
+
+def test_stream_sin_json_reintenta_sin_streaming():
+    class Cliente(FakeStreamClient):
+        def _create(self, model, messages, stream=False, **kwargs):
+            if stream:
+                return super()._create(model, messages, stream=True)
+            return types.SimpleNamespace(
+                choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=_respuesta([4, 3, 3, 2])))],
+                usage=None,
+            )
+
+    client = Cliente("Claro, aquí tienes la evaluación detallada del estudiante... " * 20)
+    datos = [{"nombre": "A", "resolucion": "x", "tarea": "t"}]
+    reporte = evaluar_chat.nuevo_reporte()
+    evaluar_chat.evaluar_entregas(datos, client=client, stream=True, reporte=reporte)
+    assert datos[0]["calificacion"]["total"] == 12
+    # El streaming se cortó apenas se superó el texto tolerado antes del JSON
+    assert client.leidos < len(client.texto) // client.tam
+    # La solicitud cortada también se cuenta, con tokens estimados
+    mensajes = evaluar_chat.mensajes_entrega("A", "", "x")
+    recibido = client.texto[:client.leidos * client.tam]
+    prompt = sum(evaluar_chat.contar_tokens(m["content"]) for m in mensajes)
+    assert reporte["llamadas"] == 2 and len(reporte["latencias_por_modelo_s"][evaluar_chat.MODELO_PRINCIPAL]) == 2
+    assert reporte["prompt_tokens"] == prompt
+    assert reporte["completion_tokens"] == evaluar_chat.contar_tokens(recibido)
+    assert len(reporte["ttft_s"]) == 1 and reporte["costo_usd"] > 0
+
+
+def test_stream_con_cascada_avisa_una_sola_nota():
+    class Cliente:
+        def __init__(self):
+            self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+        def _create(self, model, messages, stream=False, **kwargs):
+            detalle = [4, 3, 3, 2] if model == evaluar_chat.MODELO_RAPIDO else [8, 6, 6, 4]
+            return FakeStreamClient(_respuesta(detalle, confianza=0.9))._create(model, messages, stream=True)
+
+    notas = []
+    datos = [{"nombre": "A", "resolucion": "print(1)", "tarea": "t"}]
+    evaluar_chat.evaluar_entregas(datos, client=Cliente(), cascada=True, stream=True,
+                                  al_calificar=lambda nombre, c: notas.append((nombre, c["total"])))
+    assert notas == [("A", 24)]
@@ -0,0 +1,83 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import evaluar_chat
+import flujo_entregas
+from flujo_entregas import EscritorEntregas, en_bloques, leer_entregas
+
+ENTREGAS = [{"nombre": "Ána", "nota": 1.5, "detalle": [1, 2]}, {"nombre": "Beto", "nota": 2}]
+
+
+def test_escritor_json_igual_a_json_dump(tmp_path):
+    for datos in (ENTREGAS, []):
+        ruta = tmp_path / "salida.json"
+        with EscritorEntregas(ruta) as escritor:
+            for entrega in datos:
+                escritor.escribir(entrega)
+        assert ruta.read_text(encoding="utf-8") == json.dumps(datos, ensure_ascii=False, indent=2)
+
+
+def test_lectura_jsonl_y_json_con_y_sin_ijson(tmp_path, monkeypatch):
+    jsonl = tmp_path / "e.jsonl"
+    jsonl.write_text("\n".join(json.dumps(e) for e in ENTREGAS) + "\n\n", encoding="utf-8")
+    arreglo = tmp_path / "e.json"
+    arreglo.write_text(json.dumps(ENTREGAS), encoding="utf-8")
+    assert list(leer_entregas(jsonl)) == ENTREGAS
+    assert list(leer_entregas(arreglo)) == ENTREGAS
+    monkeypatch.setattr(flujo_entregas, "ijson", None)
+    assert list(leer_entregas(arreglo)) == ENTREGAS
+    assert [len(b) for b in en_bloques(range(5), 2)] == [2, 2, 1]
+
+
+def test_evaluate_file_escribe_cada_entrega_al_evaluarla(tmp_path, monkeypatch):
+    entrada = tmp_path / "in.jsonl"
+    salida = tmp_path / "out.jsonl"
+    entrada.write_text("\n".join(json.dumps({"nombre": n, "resolucion": "x"}) for n in "ABC"), encoding="utf-8")
+    lineas_al_evaluar = []
+
+    def falso(client, nombre, enunciado, resolucion):
+        lineas_al_evaluar.append(len((tmp_path / ".out.tmp.jsonl").read_text(encoding="utf-8").splitlines()))
+        return {"calificacion": {"total": 1, "detalle": [1, 0, 0, 0]}, "comentarios": nombre}
+
+    monkeypatch.setattr(evaluar_chat, "_load_client", lambda: "client")
+    monkeypatch.setattr(evaluar_chat, "evaluar_con_chat", falso)
+    reporte = evaluar_chat.evaluate_file(entrada, salida)
+
+    assert lineas_al_evaluar == [0, 1, 2]
+    assert reporte["entregas"] == 3
+    assert [e["comentarios"] for e in leer_entregas(salida)] == ["A", "B", "C"]
+
+    # Sobrescribir la entrada no la trunca antes de leerla
+    evaluar_chat.evaluate_file(salida, salida)
+    assert len(list(leer_entregas(salida))) == 3
+
+
+@pytest.mark.parametrize("nombre", ["out.json", "out.jsonl"])
+def test_evaluate_file_con_error_conserva_la_salida_anterior(tmp_path, monkeypatch, nombre):
+    entrada = tmp_path / "in.json"
+    entrada.write_text(json.dumps([{"nombre": n, "resolucion": "x"} for n in "AB"]), encoding="utf-8")
+    salida = tmp_path / nombre
+    salida.write_text("anterior", encoding="utf-8")
+
+    def falso(client, nombre, enunciado, resolucion):
+        if nombre == "B":
+            raise RuntimeError("corte")
+        return {"calificacion": {"total": 1, "detalle": [1, 0, 0, 0]}, "comentarios": ""}
+
+    monkeypatch.setattr(evaluar_chat, "_load_client", lambda: "client")
+    monkeypatch.setattr(evaluar_chat, "evaluar_con_chat", falso)
+    with pytest.raises(RuntimeError):
+        evaluar_chat.evaluate_file(entrada, salida)
+    assert salida.read_text(encoding="utf-8") == "anterior"
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(["in.json", nombre])
+
+    # Sobrescribiendo la entrada, un error tampoco la deja truncada
+    with pytest.raises(RuntimeError):
+        evaluar_chat.evaluate_file(entrada, entrada)
+    assert len(json.loads(entrada.read_text(encoding="utf-8"))) == 2
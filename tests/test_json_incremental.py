@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from json_incremental import FueraDeEsquema, ParserJSONIncremental
+
+
+def test_emite_calificacion_antes_del_final():
+    texto = ('```json\n{"nombre": "A {x}", "calificacion": {"total": 5, "detalle": [1, 2, 1, 1]}, '
+             '"comentarios": "dijo \\"bien\\", ok"}\n```')
+    parser = ParserJSONIncremental(claves=["calificacion"])
+    emitidas = []
+    for i in range(0, len(texto), 4):
+        nuevas = parser.alimentar(texto[i:i + 4])
+        if nuevas:
+            emitidas.append((i, nuevas))
+
+    assert emitidas[0][1] == {"calificacion": {"total": 5, "detalle": [1, 2, 1, 1]}}
+    assert emitidas[0][0] < texto.index("comentarios")
+    assert parser.completo
+    assert parser.resultado()["comentarios"] == 'dijo "bien", ok'
+
+
+def test_saltea_texto_antes_del_json():
+    parser = ParserJSONIncremental(claves=["calificacion"])
+    assert parser.alimentar("Claro, aquí está la evaluación:\n```json\n") == {}
+    nuevas = parser.alimentar('{"calificacion": {"total": 24, "detalle": [8, 6, 6, 4]}}\n```')
+    assert nuevas["calificacion"]["total"] == 24
+    assert parser.completo
+
+
+def test_texto_sin_json_corta():
+    parser = ParserJSONIncremental(max_prosa=50)
+    assert parser.alimentar("Claro, ") == {}
+    with pytest.raises(FueraDeEsquema):
+        parser.alimentar("aquí tienes una evaluación detallada del estudiante, sin ningún JSON")
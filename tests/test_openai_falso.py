@@ -0,0 +1,60 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import openai
+from clientes import obtener_cliente
+from evaluar_chat import evaluar_con_chat
+from openai_falso import crear_servidor_falso
+
+
+@pytest.fixture
+def servidor():
+    servidor = crear_servidor_falso(distribucion="fija", latencia_media_s=0.0, semilla=1)
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_respuesta_normal_y_en_streaming(servidor):
+    client = obtener_cliente(servidor.url, max_reintentos=0)
+    normal = evaluar_con_chat(client, "Ana", "enunciado", "print(1)")
+    en_stream = evaluar_con_chat(client, "Ana", "enunciado", "print(1)", stream=True)
+    assert normal["calificacion"] == en_stream["calificacion"]
+    assert normal["_uso"]["prompt_tokens"] > 0
+    assert en_stream["_uso"]["ttft_s"] is not None
+
+
+def test_inyeccion_de_429_y_salida_malformada(servidor):
+    client = obtener_cliente(servidor.url, max_reintentos=0)
+    servidor.config["tasa_429"] = 1.0
+    with pytest.raises(openai.RateLimitError):
+        evaluar_con_chat(client, "Ana", "enunciado", "x")
+    servidor.config.update(tasa_429=0.0, tasa_malformada=1.0)
+    with pytest.raises(json.JSONDecodeError):
+        evaluar_con_chat(client, "Ana", "enunciado", "x")
+    assert servidor.estadisticas == {"solicitudes": 2, "rechazadas_429": 1, "malformadas": 1}
+
+
+def test_grabar_y_reproducir(servidor, tmp_path):
+    grabaciones = tmp_path / "grabaciones.jsonl"
+    grabador = crear_servidor_falso(latencia_media_s=0.0, modo="grabar", upstream=servidor.url,
+                                    grabaciones=grabaciones)
+    reproductor = None
+    try:
+        original = evaluar_con_chat(obtener_cliente(grabador.url, max_reintentos=0), "Ana", "e", "print(2)")
+        reproductor = crear_servidor_falso(latencia_media_s=0.0, modo="reproducir", grabaciones=grabaciones)
+        client = obtener_cliente(reproductor.url, max_reintentos=0)
+        assert evaluar_con_chat(client, "Ana", "e", "print(2)")["calificacion"] == original["calificacion"]
+        with pytest.raises(openai.NotFoundError):
+            evaluar_con_chat(client, "Ana", "e", "otra entrega")
+    finally:
+        for s in (grabador, reproductor):
+            if s is not None:
+                s.shutdown()
+                s.server_close()
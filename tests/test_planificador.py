@@ -0,0 +1,61 @@
+import json
+import sys
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import evaluar_chat
+import planificador
+from evaluar_chat import MODELO_PRINCIPAL, MODELO_RAPIDO, contar_tokens, mensajes_entrega
+from planificador import planificar, planificar_archivos
+
+ENTREGAS = [
+    {"nombre": "A", "resolucion": "n = int(input())\nprint(n * 2)\n" * 3, "tarea": "t1"},
+    {"nombre": "B", "resolucion": "no realiza", "tarea": "t1"},
+    {"nombre": "C", "resolucion": "ok", "tarea": "t1"},
+]
+
+
+def test_cuenta_los_mismos_mensajes_que_se_enviarian(monkeypatch):
+    llamado = []
+    monkeypatch.setattr(evaluar_chat, "_load_client", lambda: llamado.append(1))
+    plan = planificar(ENTREGAS)
+    esperados = sum(contar_tokens(m["content"]) for e in (ENTREGAS[0], ENTREGAS[2])
+                    for m in mensajes_entrega(e["nombre"], "", e["resolucion"]))
+    assert plan["prompt_tokens"] == esperados
+    assert plan["sin_entrega"] == 1 and plan["solicitudes"] == 2
+    assert plan["costo_usd"] > 0 and plan["segundos_estimados"] > 0
+    assert llamado == []
+
+
+def test_reglas_cascada_y_concurrencia():
+    plan = planificar(ENTREGAS, reglas={"verificar_enlaces": True}, cascada=True, tasa_escalado=1.0)
+    # "ok" es una entrega vacía según las reglas: no genera solicitudes
+    assert plan["omitidas_por_reglas"] == 1
+    assert plan["solicitudes_por_modelo"] == {MODELO_RAPIDO: 1, MODELO_PRINCIPAL: 1}
+
+    secuencial = planificar(ENTREGAS * 20)
+    paralelo = planificar(ENTREGAS * 20, concurrencia=8, limites={"rpm": 10_000, "tpm": 10_000_000})
+    assert paralelo["segundos_estimados"] < secuencial["segundos_estimados"]
+    limitado = planificar(ENTREGAS * 20, concurrencia=8, limites={"rpm": 1})
+    assert limitado["limitante"] == f"rpm {MODELO_PRINCIPAL}"
+
+
+def test_prefijo_compartido_largo_cuenta_como_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(planificador, "MIN_TOKENS_CACHE", 10)
+    enunciado = "Enunciado largo. " * 50
+    entregas = [{"nombre": "A", "enunciado": enunciado, "resolucion": r} for r in ("x = 1", "y = 2")]
+    ruta = tmp_path / "t1_entregas.json"
+    ruta.write_text(json.dumps(entregas), encoding="utf-8")
+    plan = planificar_archivos([ruta])
+    assert plan["archivos"] == 1
+    assert plan["solicitudes_con_cache"] == 1
+    assert 0 < plan["prompt_tokens_cacheados"] < plan["prompt_tokens"]
+
+
+def test_empaquetado_con_cascada_va_al_modelo_rapido():
+    entregas = [{"nombre": n, "resolucion": f"respuesta corta de {n}", "tarea": "t"} for n in "ABCD"]
+    plan = planificar(entregas, cascada=True, empaquetar=True, tasa_escalado=0.5)
+    assert plan["lotes"] == 1
+    assert plan["solicitudes_por_modelo"] == {MODELO_RAPIDO: 1, MODELO_PRINCIPAL: 2}
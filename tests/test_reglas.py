@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import reglas
+
+ENUNCIADO = "Administra el inventario de una verdulería usando listas en Python y responde las preguntas."
+CONFIG = {**reglas.REGLAS_POR_DEFECTO, "reglas_regex": [
+    {"id": "pendiente", "patron": r"lo subo (más tarde|mañana)", "accion": "calificar", "comentario": "pendiente"},
+    {"id": "acceso", "patron": r"no pude subir", "accion": "marcar"},
+]}
+
+
+def test_reglas_basicas(monkeypatch):
+    monkeypatch.setattr(reglas, "enlace_accesible", lambda url, timeout=5: "roto" not in url)
+
+    def decision(resolucion):
+        d = reglas.evaluar_reglas({"resolucion": resolucion}, CONFIG, ENUNCIADO)
+        return d and (d["regla"], d["accion"])
+
+    assert decision("Profe, lo subo mañana") == ("pendiente", "calificar")
+    assert decision("ok") == ("vacia", "calificar")
+    assert decision(ENUNCIADO.upper()) == ("copia_enunciado", "calificar")
+    assert decision("Adjuntos:\nhttps://github.com/roto/x") == ("enlaces_inaccesibles", "calificar")
+    assert decision("Adjuntos:\nhttps://github.com/bien/x") is None
+    assert decision("no pude subir el archivo, pego el código: print(len(inventario))") == ("acceso", "marcar")
+    # Citar la consigna no anula una solución enlazada
+    assert decision(ENUNCIADO + "\nhttps://github.com/bien/x") is None
+    assert decision(ENUNCIADO + "\nhttps://github.com/roto/x") == ("copia_enunciado", "calificar")
+    # Una marca no impide calificar localmente una entrega vacía
+    assert decision("no pude subir") == ("vacia", "calificar")
+
+
+def test_entrega_pendiente_de_config_solo_marca():
+    config = reglas.cargar_reglas()
+    resolucion = "La parte 2 la subo mañana.\n```python\ninventario = ['papas']\nprint(len(inventario))\n```"
+    d = reglas.evaluar_reglas({"resolucion": resolucion}, config, ENUNCIADO)
+    assert (d["regla"], d["accion"]) == ("entrega_pendiente", "marcar")
+
+
+def test_clasificar_usa_consignas_por_tarea():
+    datos = [
+        {"resolucion": ENUNCIADO, "tarea": "t1"},
+        {"resolucion": "no realiza", "tarea": "t1"},
+    ]
+    decisiones = reglas.clasificar(datos, CONFIG, consignas={"t1": ENUNCIADO})
+    assert decisiones[0]["regla"] == "copia_enunciado"
+    assert decisiones[1] is None
@@ -0,0 +1,49 @@
+import json
+import sys
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from scrap_masivo import scrap_lote, resolver_destino
+
+
+def _card(autor, texto):
+    return (f"<div class='discussion-card'><span class='comment-author'>{autor}</span>"
+            f"<div class='comment-body-wrapper'><p>{texto}</p></div></div>")
+
+
+CURSOS = [{
+    "id": 1,
+    "slug": "curso_a",
+    "estudiantes": [{"nombre": "A", "nombre_crea": "Ana Uno"}, {"nombre": "B", "nombre_crea": "Beto Dos"}],
+}]
+
+
+def test_resolver_destino():
+    mapeo = {"a_*.html": {"curso": "curso_a", "consigna": "t1"}}
+    assert resolver_destino(Path("a_parte1.html"), mapeo) == ("curso_a", "t1")
+    assert resolver_destino(Path("otro.html"), mapeo) is None
+
+
+def test_scrap_lote_fusiona_por_curso(tmp_path):
+    entrada = tmp_path / "in"
+    entrada.mkdir()
+    (entrada / "a_1.html").write_text(_card("Ana Uno", "hola"), encoding="utf-8")
+    (entrada / "a_2.html").write_text(_card("BETO DOS", "chau"), encoding="utf-8")
+    (entrada / "ignorado.html").write_text(_card("Ana Uno", "x"), encoding="utf-8")
+    mapeo = {"a_*.html": {"curso": "1", "consigna": "t1"}}
+
+    salida = tmp_path / "out"
+    escritos = scrap_lote(entrada, mapeo, CURSOS, workers=2, salida_dir=salida)
+
+    archivo = salida / "curso_a" / "t1_entregas.json"
+    assert list(escritos) == [archivo]
+    data = json.loads(archivo.read_text(encoding="utf-8"))
+    assert [e["resolucion"] for e in data] == ["hola", "chau"]
+
+    # Una exportación posterior sin Beto no borra su entrega previa
+    (entrada / "a_2.html").unlink()
+    scrap_lote(entrada, mapeo, CURSOS, workers=1, salida_dir=salida)
+    data = json.loads(archivo.read_text(encoding="utf-8"))
+    assert data[1]["resolucion"] == "chau"
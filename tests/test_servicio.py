@@ -0,0 +1,146 @@
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+import servicio
+from scraper import construir_evaluaciones
+from vigilar import entregas_nuevas
+
+
+def _pedir(url, datos=None):
+    cuerpo = json.dumps(datos).encode() if datos is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=cuerpo)) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_flujo_encolar_consultar_resultado(tmp_path):
+    ejecutados = []
+    manejadores = {"evaluar": lambda p: ejecutados.append(p) or {"total": p["n"] * 2}}
+    servidor, trabajadores = servicio.crear_servicio(puerto=0, workers=2, db=tmp_path / "cola.db",
+                                                     manejadores=manejadores)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    try:
+        estado, enviado = _pedir(f"{base}/trabajos", {"tipo": "evaluar", "usuario": "ana", "parametros": {"n": 21}})
+        assert estado == 202
+        estado, repetido = _pedir(f"{base}/trabajos", {"tipo": "evaluar", "parametros": {"n": 21}})
+        assert estado == 200 and repetido["id"] == enviado["id"]
+
+        for _ in range(50):
+            estado, datos = _pedir(f"{base}/trabajos/{enviado['id']}/resultado")
+            if estado == 200:
+                break
+            time.sleep(0.05)
+        assert datos["resultado"] == {"total": 42}
+        assert len(ejecutados) == 1
+
+        assert _pedir(f"{base}/trabajos", {"tipo": "otro", "parametros": {}})[0] == 400
+        con_ejecucion = {"tipo": "evaluar", "parametros": {"n": 1, "opciones": {"ejecutar_codigo": True}}}
+        assert _pedir(f"{base}/trabajos", con_ejecucion)[0] == 400
+        assert _pedir(f"{base}/trabajos/999")[0] == 404
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        trabajadores.detener()
+
+
+def test_trabajo_evaluar_solo_conserva_evaluaciones_previas(tmp_path, monkeypatch):
+    import evaluar_chat
+
+    monkeypatch.setattr(servicio, "DATA_OUTPUT", tmp_path)
+    evaluados = []
+
+    def falso_evaluar(evaluaciones, reporte=None, **opciones):
+        for e in evaluaciones:
+            evaluados.append(e["nombre"])
+            e["comentarios"] = "nuevo"
+
+    monkeypatch.setattr(evaluar_chat, "evaluar_entregas", falso_evaluar)
+    (tmp_path / "t1_entregas.json").write_text(json.dumps(
+        [{"nombre": "A", "resolucion": "a"}, {"nombre": "B", "resolucion": "b"}]), encoding="utf-8")
+    (tmp_path / "t1_evaluaciones.json").write_text(json.dumps(
+        [{"nombre": "A", "resolucion": "a", "comentarios": "previo"}]), encoding="utf-8")
+
+    servicio.trabajo_evaluar({"archivo": "t1_entregas.json", "solo": ["B"]})
+    assert evaluados == ["B"]
+    guardadas = json.loads((tmp_path / "t1_evaluaciones.json").read_text(encoding="utf-8"))
+    assert [e["comentarios"] for e in guardadas] == ["previo", "nuevo"]
+
+
+def test_trabajo_evaluar_no_acepta_entregas_en_linea():
+    with pytest.raises(ValueError):
+        servicio.trabajo_evaluar({"entregas": [{"nombre": "A", "resolucion": "print(1)"}]})
+    assert servicio._opciones_evaluacion({"opciones": {"ejecutar_codigo": True, "cascada": True}}) == {"cascada": True}
+
+
+@pytest.mark.parametrize("consigna", ["../../../escapado/x", "sub/x", "..", ""])
+def test_trabajo_scrap_rechaza_consignas_con_rutas(tmp_path, monkeypatch, consigna):
+    salida = tmp_path / "data" / "output"
+    monkeypatch.setattr(servicio, "DATA_OUTPUT", salida)
+    with pytest.raises(ValueError):
+        servicio.trabajo_scrap({"curso": "1", "consigna": consigna, "html": "<div></div>"})
+    assert list(tmp_path.rglob("*_entregas.json")) == []
+    resultado = servicio.trabajo_scrap({"curso": "1", "consigna": "t1", "html": "<div></div>"})
+    assert (salida / resultado["archivo"]).exists()
+
+
+def test_trabajos_evaluar_simultaneos_no_pierden_resultados(tmp_path, monkeypatch):
+    import evaluar_chat
+
+    monkeypatch.setattr(servicio, "DATA_OUTPUT", tmp_path)
+
+    def falso_evaluar(evaluaciones, reporte=None, **opciones):
+        time.sleep(0.2)  # ambos trabajos leerían el archivo antes de que el otro escriba
+        for e in evaluaciones:
+            e["calificacion"] = {"total": 10, "detalle": [4, 3, 2, 1]}
+
+    monkeypatch.setattr(evaluar_chat, "evaluar_entregas", falso_evaluar)
+    (tmp_path / "t1_entregas.json").write_text(json.dumps(
+        [{"nombre": "A", "resolucion": "a"}, {"nombre": "B", "resolucion": "b"}]), encoding="utf-8")
+
+    hilos = [threading.Thread(target=servicio.trabajo_evaluar, args=({"archivo": "t1_entregas.json", "solo": [n]},))
+             for n in "AB"]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    guardadas = json.loads((tmp_path / "t1_evaluaciones.json").read_text(encoding="utf-8"))
+    assert all("calificacion" in e for e in guardadas)
+
+
+def test_trabajo_evaluar_solo_no_guarda_calificaciones_provisorias(tmp_path, monkeypatch):
+    import evaluar_chat
+
+    monkeypatch.setattr(servicio, "DATA_OUTPUT", tmp_path)
+    estudiantes = [{"nombre_crea": n} for n in ("Ana Uno", "Beto Dos", "Caro Tres")]
+    entregas = construir_evaluaciones(estudiantes, {"Ana Uno": "print(1)", "Beto Dos": "print(2)"}, "t1")
+    (tmp_path / "t1_entregas.json").write_text(json.dumps(entregas), encoding="utf-8")
+
+    def falso_evaluar(evaluaciones, reporte=None, **opciones):
+        for e in evaluaciones:
+            if e["nombre"] == "Beto Dos":
+                raise RuntimeError("falla de la API")
+            e["calificacion"] = {"total": 20, "detalle": [8, 6, 4, 2]}
+
+    monkeypatch.setattr(evaluar_chat, "evaluar_entregas", falso_evaluar)
+    servicio.trabajo_evaluar({"archivo": "t1_entregas.json", "solo": ["Ana Uno"]})
+    # El trabajo de Beto falla: su entrada sigue sin calificación y vuelve a encolarse
+    with pytest.raises(RuntimeError):
+        servicio.trabajo_evaluar({"archivo": "t1_entregas.json", "solo": ["Beto Dos"]})
+
+    guardadas = json.loads((tmp_path / "t1_evaluaciones.json").read_text(encoding="utf-8"))
+    assert "calificacion" not in guardadas[1]
+    assert guardadas[2]["calificacion"]["total"] == 0  # no entregó: el 0 es definitivo
+    assert entregas_nuevas(entregas, guardadas) == ["Beto Dos"]
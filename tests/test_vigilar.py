@@ -0,0 +1,85 @@
+import json
+import sys
+from pathlib import Path
+
+# Añadir carpeta src al path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from cola_trabajos import ColaTrabajos
+from vigilar import Vigilante, destino_por_nombre, entregas_nuevas, procesar_archivo
+
+
+def _card(autor, texto):
+    return (f"<div class='discussion-card'><span class='comment-author'>{autor}</span>"
+            f"<div class='comment-body-wrapper'><p>{texto}</p></div></div>")
+
+
+CURSOS = [{
+    "id": 1,
+    "slug": "curso_a",
+    "estudiantes": [{"nombre": "A", "nombre_crea": "Ana Uno"}, {"nombre": "B", "nombre_crea": "Beto Dos"}],
+}]
+
+
+def test_destino_por_nombre():
+    assert destino_por_nombre(Path("curso_a__3_7_tarea1.html")) == ("curso_a", "3_7_tarea1")
+    assert destino_por_nombre(Path("export.html")) is None
+    mapeo = {"export*.html": {"curso": "1", "consigna": "t1"}}
+    assert destino_por_nombre(Path("export.html"), mapeo) == ("1", "t1")
+
+
+def test_vigilante_espera_que_el_archivo_se_estabilice(tmp_path):
+    archivo = tmp_path / "curso_a__t1.html"
+    archivo.write_text("parcial", encoding="utf-8")
+    vigilante = Vigilante(tmp_path, espera_s=2)
+    assert vigilante.revisar(ahora=0) == []
+    assert vigilante.revisar(ahora=1) == []
+    assert vigilante.revisar(ahora=2.5) == [archivo]
+    # Sin cambios no se vuelve a procesar
+    assert vigilante.revisar(ahora=10) == []
+
+
+def test_entregas_nuevas_ignora_las_ya_evaluadas():
+    entregas = [{"nombre": "A", "resolucion": "v2"}, {"nombre": "B", "resolucion": "x"},
+                {"nombre": "C", "resolucion": "no realiza"}]
+    evaluadas = [{"nombre": "A", "resolucion": "v1", "calificacion": {"total": 3}},
+                 {"nombre": "B", "resolucion": "x", "calificacion": {"total": 5}}]
+    assert entregas_nuevas(entregas, evaluadas) == ["A"]
+    # Una entrada guardada sin calificación (p. ej. un resultado perdido) vuelve a encolarse
+    evaluadas[1].pop("calificacion")
+    assert entregas_nuevas(entregas, evaluadas) == ["A", "B"]
+
+
+def test_procesar_archivo_encola_solo_lo_nuevo(tmp_path):
+    salida = tmp_path / "out"
+    archivo = tmp_path / "curso_a__t1.html"
+    archivo.write_text(_card("Ana Uno", "hola"), encoding="utf-8")
+    cola = ColaTrabajos(tmp_path / "cola.db")
+
+    resultado = procesar_archivo(archivo, CURSOS, cola, salida_dir=salida)
+    assert resultado["nuevas"] == ["Ana Uno"]
+    trabajo = cola.tomar()
+    assert trabajo["parametros"]["solo"] == ["Ana Uno"]
+    assert trabajo["parametros"]["archivo"] == str(Path("curso_a") / "t1_entregas.json")
+
+    # A ya fue evaluada; el nuevo export agrega la entrega de B
+    with (salida / "curso_a" / "t1_evaluaciones.json").open("w", encoding="utf-8") as f:
+        json.dump([{"nombre": "Ana Uno", "resolucion": "hola", "calificacion": {"total": 20}}], f)
+    archivo.write_text(_card("Ana Uno", "hola") + _card("Beto Dos", "chau"), encoding="utf-8")
+    resultado = procesar_archivo(archivo, CURSOS, cola, salida_dir=salida)
+    assert resultado["nuevas"] == ["Beto Dos"]
+    assert cola.tomar()["parametros"]["solo"] == ["Beto Dos"]
+
+
+def test_procesar_archivo_no_repite_alumnos_de_trabajos_pendientes(tmp_path):
+    salida = tmp_path / "out"
+    archivo = tmp_path / "curso_a__t1.html"
+    archivo.write_text(_card("Ana Uno", "hola"), encoding="utf-8")
+    cola = ColaTrabajos(tmp_path / "cola.db")
+    assert procesar_archivo(archivo, CURSOS, cola, salida_dir=salida)["nuevas"] == ["Ana Uno"]
+
+    # Segundo export con el primer trabajo todavía pendiente: Ana ya está en cola
+    archivo.write_text(_card("Ana Uno", "hola v2") + _card("Beto Dos", "chau"), encoding="utf-8")
+    resultado = procesar_archivo(archivo, CURSOS, cola, salida_dir=salida)
+    assert resultado["nuevas"] == ["Beto Dos"]
+    assert [cola.tomar()["parametros"]["solo"] for _ in range(2)] == [["Ana Uno"], ["Beto Dos"]]